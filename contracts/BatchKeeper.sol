@@ -0,0 +1,137 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+pragma experimental ABIEncoderV2;
+
+import {IStrategy} from "./interfaces/IStrategy.sol";
+
+/********************
+ *   Keeper for a fleet of CompV3LenderBorrower clones. Checks each strategy's triggers on chain and harvests or tends
+ *      the ones that need it in a single transaction. A revert in one strategy is caught so it does not sink the batch.
+ *      This contract needs to be set as the keeper on every strategy it works.
+ *   https://github.com/Schlagonia/CompoundV3-Lender-Borrower
+ *
+ ********************* */
+
+contract BatchKeeper {
+    enum Action {
+        NONE,
+        HARVEST,
+        TEND
+    }
+
+    address public governance;
+
+    // Addresses allowed to call `work`
+    mapping(address => bool) public keepers;
+
+    event Worked(address indexed strategy, Action action, bool success);
+    event UpdatedKeeper(address indexed keeper, bool allowed);
+    event UpdatedGovernance(address governance);
+
+    modifier onlyGovernance() {
+        checkGovernance();
+        _;
+    }
+
+    modifier onlyKeepers() {
+        checkKeepers();
+        _;
+    }
+
+    function checkGovernance() internal view {
+        require(msg.sender == governance, "!authorized");
+    }
+
+    function checkKeepers() internal view {
+        require(keepers[msg.sender] || msg.sender == governance, "!authorized");
+    }
+
+    constructor() {
+        governance = msg.sender;
+    }
+
+    function setGovernance(address _governance) external onlyGovernance {
+        require(_governance != address(0));
+        governance = _governance;
+        emit UpdatedGovernance(_governance);
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyGovernance {
+        keepers[_keeper] = _allowed;
+        emit UpdatedKeeper(_keeper, _allowed);
+    }
+
+    /*
+    * Check and work a list of strategies in order
+    * @param _strategies The strategies to check. This contract must be their keeper
+    * @param _callCostInWei The call cost passed to each strategy's triggers
+    * @param _minGasLeft Stop before checking the next strategy once gasleft() drops under this
+    * @return worked The amount of strategies successfully harvested or tended
+    * @return checked The amount of strategies looked at. Anything past this index should be sent in the next batch
+    */
+    function work(
+        address[] calldata _strategies,
+        uint256 _callCostInWei,
+        uint256 _minGasLeft
+    ) external onlyKeepers returns (uint256 worked, uint256 checked) {
+        uint256 length = _strategies.length;
+        for (; checked < length; ++checked) {
+            // Keep enough gas to finish the transaction
+            if (gasleft() < _minGasLeft) break;
+
+            address _strategy = _strategies[checked];
+            Action action = _workable(_strategy, _callCostInWei);
+            if (action == Action.NONE) continue;
+
+            bool success = _work(_strategy, action);
+            if (success) ++worked;
+
+            emit Worked(_strategy, action, success);
+        }
+    }
+
+    /*
+    * View of what `work` would do for each strategy
+    */
+    function workable(
+        address[] calldata _strategies,
+        uint256 _callCostInWei
+    ) external view returns (Action[] memory actions) {
+        uint256 length = _strategies.length;
+        actions = new Action[](length);
+        for (uint256 i; i < length; ++i) {
+            actions[i] = _workable(_strategies[i], _callCostInWei);
+        }
+    }
+
+    function _workable(address _strategy, uint256 _callCostInWei) internal view returns (Action) {
+        // harvest takes priority. tendTrigger returns false if harvestTrigger is true
+        try IStrategy(_strategy).harvestTrigger(_callCostInWei) returns (bool harvestNeeded) {
+            if (harvestNeeded) return Action.HARVEST;
+        } catch {
+            return Action.NONE;
+        }
+
+        try IStrategy(_strategy).tendTrigger(_callCostInWei) returns (bool tendNeeded) {
+            if (tendNeeded) return Action.TEND;
+        } catch {}
+
+        return Action.NONE;
+    }
+
+    function _work(address _strategy, Action _action) internal returns (bool) {
+        if (_action == Action.HARVEST) {
+            try IStrategy(_strategy).harvest() {
+                return true;
+            } catch {
+                return false;
+            }
+        }
+
+        try IStrategy(_strategy).tend() {
+            return true;
+        } catch {
+            return false;
+        }
+    }
+}
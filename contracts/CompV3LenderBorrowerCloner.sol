@@ -4,6 +4,8 @@ pragma experimental ABIEncoderV2;
 
 import "./Depositer.sol";
 import "./Strategy.sol";
+import "./SharedDepositer.sol";
+import {ClonesWithImmutableArgs} from "./libraries/ClonesWithImmutableArgs.sol";
 
 contract CompV3LenderBorrowerCloner {
     address public immutable originalDepositer;
@@ -55,6 +57,56 @@ contract CompV3LenderBorrowerCloner {
         string memory _strategyName
     ) external returns (address newDepositer, address newStrategy) {
         newDepositer = Depositer(originalDepositer).cloneDepositer(_comet);
+        newStrategy = _cloneStrategy();
+
+        _initializeClone(newDepositer, newStrategy, _vault, _strategist, _rewards, _keeper, _comet, _ethToWantFee, _strategyName);
+    }
+
+    /*
+    * Same as `cloneCompV3LenderBorrower` but the clones append comet, baseToken and depositer 
+    * to the calldata of every call instead of loading them from storage.
+    */
+    function cloneCompV3LenderBorrowerWithImmutableArgs(
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _comet,
+        uint24 _ethToWantFee,
+        string memory _strategyName
+    ) external returns (address newDepositer, address newStrategy) {
+        newDepositer = Depositer(originalDepositer).cloneDepositerWithImmutableArgs(_comet);
+        newStrategy = ClonesWithImmutableArgs.clone(
+            originalStrategy,
+            abi.encodePacked(_comet, Comet(_comet).baseToken(), newDepositer)
+        );
+
+        _initializeClone(newDepositer, newStrategy, _vault, _strategist, _rewards, _keeper, _comet, _ethToWantFee, _strategyName);
+    }
+
+    /*
+    * Clones only the strategy and has it use an existing `SharedDepositer` on the same comet,
+    * so every strategy on a market supplies its base token from one account. Only the shared depositer's
+    * governance can add strategies to it.
+    */
+    function cloneCompV3LenderBorrowerWithDepositer(
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _comet,
+        uint24 _ethToWantFee,
+        string memory _strategyName,
+        address _depositer
+    ) external returns (address newStrategy) {
+        require(msg.sender == SharedDepositer(_depositer).governance(), "!governance");
+        require(address(Depositer(_depositer).comet()) == _comet, "!comet");
+        newStrategy = _cloneStrategy();
+
+        _initializeClone(_depositer, newStrategy, _vault, _strategist, _rewards, _keeper, _comet, _ethToWantFee, _strategyName);
+    }
+
+    function _cloneStrategy() internal returns (address newStrategy) {
         // Copied from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
         bytes20 addressBytes = bytes20(originalStrategy);
         assembly {
@@ -71,7 +123,19 @@ contract CompV3LenderBorrowerCloner {
             )
             newStrategy := create(0, clone_code, 0x37)
         }
+    }
 
+    function _initializeClone(
+        address newDepositer,
+        address newStrategy,
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address _comet,
+        uint24 _ethToWantFee,
+        string memory _strategyName
+    ) internal {
         Strategy(newStrategy).initialize(_vault, _comet, _ethToWantFee, newDepositer, _strategyName);
 
         Depositer(newDepositer).setStrategy(newStrategy);
@@ -13,6 +13,8 @@ import {CometStructs} from "./interfaces/CompoundV3/CompoundV3.sol";
 import {Comet} from "./interfaces/CompoundV3/CompoundV3.sol";
 import {CometRewards} from "./interfaces/CompoundV3/CompoundV3.sol";
 
+import {ClonesWithImmutableArgs} from "./libraries/ClonesWithImmutableArgs.sol";
+
 /********************
  *  Depositer contract for the Compound V3 lender borrower. The same address cannot both borrow and lend the base token, so
  *      the base strategy will supply collateral and borrow the base token, then this contract will deposit that token back into compound.
@@ -27,6 +29,8 @@ contract Depositer {
 
     //Used for cloning
     bool public original = true;
+    // Timestamp comet last accrued this account at. See accruedCometBalance
+    uint40 internal lastAccrual;
 
     //Used for Comp apr calculations
     uint64 internal constant DAYS_PER_YEAR = 365;
@@ -41,15 +45,48 @@ contract Depositer {
     uint256 internal SCALER;
     
     // This is the address of the main V3 pool
-    Comet public comet;
+    // Read through `comet()`. Immutable args clones keep it in their code instead
+    Comet internal storedComet;
     // This is the token we will be borrowing/supplying
-    IERC20 public baseToken;
+    // Read through `baseToken()`. Immutable args clones keep it in their code instead
+    IERC20 internal storedBaseToken;
+    // Number of addresses an immutable args clone appends to the calldata: comet, baseToken
+    uint256 internal constant IMMUTABLE_ARGS = 2;
     // The contract to get Comp rewards from
     CometRewards public constant rewardsContract = 
         CometRewards(0x1B0e765F6224C21223AeA2af16c1C46E38885a40); 
 
     IStrategy public strategy;
 
+    // APRs scaled by 1e18 at every point of a curve. See getAprCurve
+    struct AprCurve {
+        uint256[] utilizations;
+        uint256[] supplyAprs;
+        uint256[] borrowAprs;
+        uint256[] supplyRewardAprs;
+        uint256[] borrowRewardAprs;
+        // supply APR plus both reward APRs minus the borrow APR
+        int256[] netAprs;
+    }
+
+    // Everything a curve needs from comet and the price feeds, read once per call
+    struct Market {
+        uint256 totalSupply;
+        uint256 totalBorrow;
+        uint256 supplyKink;
+        uint256 supplySlopeLow;
+        uint256 supplySlopeHigh;
+        uint256 supplyBase;
+        uint256 borrowKink;
+        uint256 borrowSlopeLow;
+        uint256 borrowSlopeHigh;
+        uint256 borrowBase;
+        uint256 rewardToSuppliersPerDay;
+        uint256 rewardToBorrowersPerDay;
+        uint256 rewardPrice;
+        uint256 basePrice;
+    }
+
     //The reward Token
     address internal constant comp = 
         0xc00e94Cb662C3520282E6f5717214004A7f26888;
@@ -64,12 +101,12 @@ contract Depositer {
         _;
     }
 
-    function checkGovernance() internal view {
+    function checkGovernance() internal view virtual {
         require(msg.sender == strategy.vault().governance(), "!authorized");
     }
 
 
-    function checkStrategy() internal view {
+    function checkStrategy() internal view virtual {
         require(msg.sender == address(strategy), "!authorized");
     }
 
@@ -107,80 +144,122 @@ contract Depositer {
         _initialize(_comet);
     }
 
+    function cloneDepositerWithImmutableArgs(
+        address _comet
+    ) external returns (address newDepositer) {
+        require(original, "!original");
+        newDepositer = ClonesWithImmutableArgs.clone(
+            address(this), 
+            abi.encodePacked(_comet, Comet(_comet).baseToken())
+        );
+
+        Depositer(newDepositer).initialize(_comet);
+        emit Cloned(newDepositer);
+    }
+
     function _initialize(address _comet) internal {
-        require(address(comet) == address(0), "!initiliazd");
-        comet = Comet(_comet);
-        baseToken = IERC20(comet.baseToken());
+        require(SCALER == 0, "!initiliazd");
+        // Immutable args clones already have these in their code
+        if (!ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            storedComet = Comet(_comet);
+            storedBaseToken = IERC20(Comet(_comet).baseToken());
+        }
 
-        baseToken.safeApprove(_comet, type(uint256).max);
+        baseToken().safeApprove(_comet, type(uint256).max);
 
         //For APR calculations
-        uint256 BASE_MANTISSA = comet.baseScale();
-        uint256 BASE_INDEX_SCALE = comet.baseIndexScale();
+        uint256 BASE_MANTISSA = Comet(_comet).baseScale();
+        uint256 BASE_INDEX_SCALE = Comet(_comet).baseIndexScale();
         
         // this is needed for reward apr calculations based on decimals of want
         // we scale rewards per second to the base token decimals and diff between comp decimals and the index scale
         SCALER = BASE_MANTISSA * 1e18 / BASE_INDEX_SCALE;
 
         // default to the base token feed given
-        baseTokenPriceFeed = comet.baseTokenPriceFeed();
+        baseTokenPriceFeed = Comet(_comet).baseTokenPriceFeed();
         // default to the COMP/USD feed
         rewardTokenPriceFeed = 0xdbd020CAeF83eFd542f4De03e3cF0C28A4428bd5;
     }
 
-    function setStrategy(address _strategy) external {
+    // Immutable args clones never store the addresses, so the mode is checked before any storage read.
+    // The code size of this contract is a warm 100 gas read, an empty slot would be a cold 2100
+    function comet() public view returns (Comet) {
+        if (ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            return Comet(ClonesWithImmutableArgs.getAddressArg(0, IMMUTABLE_ARGS));
+        }
+        return storedComet;
+    }
+
+    function baseToken() public view returns (IERC20) {
+        if (ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            return IERC20(ClonesWithImmutableArgs.getAddressArg(1, IMMUTABLE_ARGS));
+        }
+        return storedBaseToken;
+    }
+
+    function setStrategy(address _strategy) external virtual {
         // Can only set the strategy once
         require(address(strategy) == address(0), "set");
 
         strategy = IStrategy(_strategy);
 
         // make sure it has the same base token
-        require(address(baseToken) == strategy.baseToken(), "!base");
+        require(address(baseToken()) == strategy.baseToken(), "!base");
         // Make sure this contract is set as the depositer
         require(address(this) == address(strategy.depositer()), "!depositer");
     }
 
     function setPriceFeeds(address _baseTokenPriceFeed, address _rewardTokenPriceFeed) external onlyGovernance {
         // just check the call doesnt revert. We dont care about the amount returned 
-        comet.getPrice(_baseTokenPriceFeed);
-        comet.getPrice(_rewardTokenPriceFeed);
+        Comet _comet = comet();
+        _comet.getPrice(_baseTokenPriceFeed);
+        _comet.getPrice(_rewardTokenPriceFeed);
         baseTokenPriceFeed = _baseTokenPriceFeed;
         rewardTokenPriceFeed = _rewardTokenPriceFeed;
     }
     
-    function cometBalance() external view returns (uint256){
-        return comet.balanceOf(address(this));
+    function cometBalance() external view virtual returns (uint256){
+        return comet().balanceOf(address(this));
     }
 
     // Non-view function to accrue account for the most accurate accounting
-    function accruedCometBalance() public returns(uint256) {
-        comet.accrueAccount(address(this));
-        return comet.balanceOf(address(this));
+    // Comet's indexes only move when the timestamp does so the account is only accrued once per timestamp
+    function accruedCometBalance() public virtual returns(uint256) {
+        Comet _comet = comet();
+        if (_markAccrued()) _comet.accrueAccount(address(this));
+        return _comet.balanceOf(address(this));
+    }
+
+    // Returns true, and records it, if the account was not accrued yet at this timestamp
+    function _markAccrued() internal returns (bool) {
+        if (lastAccrual == block.timestamp) return false;
+        lastAccrual = uint40(block.timestamp);
+        return true;
     }
 
-    function withdraw(uint256 _amount) external onlyStrategy {
+    function withdraw(uint256 _amount) external virtual onlyStrategy {
         if (_amount == 0) return;
-        IERC20 _baseToken = baseToken;
+        IERC20 _baseToken = baseToken();
 
-        comet.withdraw(address(_baseToken), _amount);
+        comet().withdraw(address(_baseToken), _amount);
 
         uint256 balance = _baseToken.balanceOf(address(this));
         require(balance >= _amount, "!bal");
         _baseToken.safeTransfer(address(strategy), balance);
     }
 
-    function deposit() external onlyStrategy {
-        IERC20 _baseToken = baseToken;
+    function deposit() external virtual onlyStrategy {
+        IERC20 _baseToken = baseToken();
         // msg.sender has been checked to be strategy
         uint256 _amount = _baseToken.balanceOf(msg.sender);
         if (_amount == 0) return;
         
         _baseToken.safeTransferFrom(msg.sender, address(this), _amount);
-        comet.supply(address(_baseToken), _amount);
+        comet().supply(address(_baseToken), _amount);
     }
 
-    function claimRewards() external onlyStrategy {
-        rewardsContract.claim(address(comet), address(this), true);
+    function claimRewards() external virtual onlyStrategy {
+        rewardsContract.claim(address(comet()), address(this), _markAccrued());
 
         uint256 compBal = IERC20(comp).balanceOf(address(this));
 
@@ -196,23 +275,34 @@ contract Depositer {
     /*
     * Gets the amount of reward tokens due to this contract and the base strategy
     */
-    function getRewardsOwed() external view returns (uint256) {
-        CometStructs.RewardConfig memory config = rewardsContract.rewardConfig(address(comet));
-        uint256 accrued = comet.baseTrackingAccrued(address(this)) + comet.baseTrackingAccrued(address(strategy));
-        if (config.shouldUpscale) {
-            accrued *= config.rescaleFactor;
-        } else {
-            accrued /= config.rescaleFactor;
-        }
+    function getRewardsOwed() external view virtual returns (uint256) {
+        return getRewardsOwedFor(address(strategy));
+    }
+
+    /*
+    * Gets the amount of reward tokens due to `_strategy` and its part of this contract's.
+    * This contract only has the one strategy so all of its rewards are counted
+    */
+    function getRewardsOwedFor(address _strategy) public view virtual returns (uint256) {
+        Comet _comet = comet();
+        uint256 accrued = 
+            _toRewards(_comet.baseTrackingAccrued(address(this)) + _comet.baseTrackingAccrued(_strategy));
         uint256 claimed = 
-            rewardsContract.rewardsClaimed(address(comet), address(this)) + 
-                rewardsContract.rewardsClaimed(address(comet), address(strategy));
+            rewardsContract.rewardsClaimed(address(_comet), address(this)) + 
+                rewardsContract.rewardsClaimed(address(_comet), _strategy);
 
         return accrued > claimed ? accrued - claimed : 0;
     }
 
+    // Converts comet's tracking units to reward tokens the way the rewards contract does
+    function _toRewards(uint256 _tracking) internal view returns (uint256) {
+        CometStructs.RewardConfig memory config = rewardsContract.rewardConfig(address(comet()));
+        return config.shouldUpscale ? _tracking * config.rescaleFactor : _tracking / config.rescaleFactor;
+    }
+
     function getNetBorrowApr(uint256 newAmount) public view returns(uint256 netApr) {
-        uint256 newUtilization = (comet.totalBorrow() + newAmount) * 1e18 / (comet.totalSupply() + newAmount);
+        Comet _comet = comet();
+        uint256 newUtilization = (_comet.totalBorrow() + newAmount) * 1e18 / (_comet.totalSupply() + newAmount);
         uint256 borrowApr = getBorrowApr(newUtilization);
         uint256 supplyApr = getSupplyApr(newUtilization);
         // supply rate can be higher than borrow when utilization is very high
@@ -224,7 +314,7 @@ contract Depositer {
     */
     function getSupplyApr(uint256 newUtilization) public view returns (uint) {
         unchecked {   
-            return comet.getSupplyRate(
+            return comet().getSupplyRate(
                      newUtilization // New utilization 
                         ) * SECONDS_PER_YEAR;
         }
@@ -235,7 +325,7 @@ contract Depositer {
     */
     function getBorrowApr(uint256 newUtilization) public view returns (uint256) {
         unchecked {
-            return comet.getBorrowRate(
+            return comet().getBorrowRate(
                      newUtilization // New utilization
                             ) * SECONDS_PER_YEAR;  
         }
@@ -246,6 +336,24 @@ contract Depositer {
             return getRewardAprForBorrowBase(newAmount) + getRewardAprForSupplyBase(newAmount);
         }
     }
+
+    /*
+    * Get the net rewards, in base token, from borrowing and supplying `newAmount` more for `window` seconds
+    * @return 0 if borrowing it would cost more than it earns
+    */
+    function getLeverageGain(uint256 newAmount, uint256 window) external view returns (uint256) {
+        uint256 rewardApr = getNetRewardApr(newAmount);
+        uint256 borrowApr = getNetBorrowApr(newAmount);
+        if (rewardApr <= borrowApr) return 0;
+        return newAmount * (rewardApr - borrowApr) / 1e18 * window / SECONDS_PER_YEAR;
+    }
+
+    /*
+    * Get the rewards, in base token, a year of borrowing `_debt` and supplying `_supplied` earns at the current rates
+    */
+    function getRewardsPerYear(uint256 _debt, uint256 _supplied) external view returns (uint256) {
+        return (getRewardAprForBorrowBase(0) * _debt + getRewardAprForSupplyBase(0) * _supplied) / 1e18;
+    }
     
     /*
     * Get the current reward for supplying APR in Compound III
@@ -253,7 +361,7 @@ contract Depositer {
     * @return The reward APR in USD as a decimal scaled up by 1e18
     */
     function getRewardAprForSupplyBase(uint256 newAmount) public view returns (uint) {
-        Comet _comet = comet;
+        Comet _comet = comet();
         unchecked {
             uint256 rewardToSuppliersPerDay =  _comet.baseTrackingSupplySpeed() * SECONDS_PER_DAY * SCALER;
             if(rewardToSuppliersPerDay == 0) return 0;
@@ -272,7 +380,7 @@ contract Depositer {
     */
     function getRewardAprForBorrowBase(uint256 newAmount) public view returns (uint256) {
         // borrowBaseRewardApr = (rewardTokenPriceInUsd * rewardToBorrowersPerDay / (baseTokenTotalBorrow * baseTokenPriceInUsd)) * DAYS_PER_YEAR;
-        Comet _comet = comet;
+        Comet _comet = comet();
         unchecked {
             uint256 rewardToBorrowersPerDay =  _comet.baseTrackingBorrowSpeed() * SECONDS_PER_DAY * SCALER;
             if(rewardToBorrowersPerDay == 0) return 0;
@@ -284,13 +392,106 @@ contract Depositer {
         }
     }
 
-    function manualWithdraw() external onlyGovernance {
+    /*
+    * Get the APRs after borrowing and supplying each of `newAmounts` more base token,
+    *   the same points getNetBorrowApr and getNetRewardApr use, in a single call
+    */
+    function getAprCurve(uint256[] calldata newAmounts) external view returns (AprCurve memory curve) {
+        Market memory market = _readMarket();
+        curve = _newCurve(newAmounts.length);
+        for (uint256 i; i < newAmounts.length; ++i) {
+            _fillCurve(market, curve, i, market.totalSupply + newAmounts[i], market.totalBorrow + newAmounts[i]);
+        }
+    }
+
+    /*
+    * Get the APRs at each of `utilizations` (scaled by 1e18), moving the total borrows against the current total supply
+    */
+    function getAprCurveAtUtilizations(uint256[] calldata utilizations) external view returns (AprCurve memory curve) {
+        Market memory market = _readMarket();
+        curve = _newCurve(utilizations.length);
+        for (uint256 i; i < utilizations.length; ++i) {
+            _fillCurve(market, curve, i, market.totalSupply, market.totalSupply * utilizations[i] / 1e18);
+        }
+    }
+
+    function _readMarket() internal view returns (Market memory market) {
+        Comet _comet = comet();
+        market.totalSupply = _comet.totalSupply();
+        market.totalBorrow = _comet.totalBorrow();
+        market.supplyKink = _comet.supplyKink();
+        market.supplySlopeLow = _comet.supplyPerSecondInterestRateSlopeLow();
+        market.supplySlopeHigh = _comet.supplyPerSecondInterestRateSlopeHigh();
+        market.supplyBase = _comet.supplyPerSecondInterestRateBase();
+        market.borrowKink = _comet.borrowKink();
+        market.borrowSlopeLow = _comet.borrowPerSecondInterestRateSlopeLow();
+        market.borrowSlopeHigh = _comet.borrowPerSecondInterestRateSlopeHigh();
+        market.borrowBase = _comet.borrowPerSecondInterestRateBase();
+        market.rewardToSuppliersPerDay = _comet.baseTrackingSupplySpeed() * SECONDS_PER_DAY * SCALER;
+        market.rewardToBorrowersPerDay = _comet.baseTrackingBorrowSpeed() * SECONDS_PER_DAY * SCALER;
+        market.rewardPrice = _comet.getPrice(rewardTokenPriceFeed);
+        market.basePrice = _comet.getPrice(baseTokenPriceFeed);
+    }
+
+    function _newCurve(uint256 _points) internal pure returns (AprCurve memory curve) {
+        curve.utilizations = new uint256[](_points);
+        curve.supplyAprs = new uint256[](_points);
+        curve.borrowAprs = new uint256[](_points);
+        curve.supplyRewardAprs = new uint256[](_points);
+        curve.borrowRewardAprs = new uint256[](_points);
+        curve.netAprs = new int256[](_points);
+    }
+
+    function _fillCurve(
+        Market memory market,
+        AprCurve memory curve,
+        uint256 i,
+        uint256 _totalSupply,
+        uint256 _totalBorrow
+    ) internal pure {
+        uint256 utilization = _totalSupply == 0 ? 0 : _totalBorrow * 1e18 / _totalSupply;
+        curve.utilizations[i] = utilization;
+        curve.supplyAprs[i] = _rate(
+            utilization, market.supplyKink, market.supplyBase, market.supplySlopeLow, market.supplySlopeHigh
+        ) * SECONDS_PER_YEAR;
+        curve.borrowAprs[i] = _rate(
+            utilization, market.borrowKink, market.borrowBase, market.borrowSlopeLow, market.borrowSlopeHigh
+        ) * SECONDS_PER_YEAR;
+        curve.supplyRewardAprs[i] = _rewardApr(market, market.rewardToSuppliersPerDay, _totalSupply);
+        curve.borrowRewardAprs[i] = _rewardApr(market, market.rewardToBorrowersPerDay, _totalBorrow);
+        curve.netAprs[i] = 
+            int256(curve.supplyAprs[i] + curve.supplyRewardAprs[i] + curve.borrowRewardAprs[i]) - 
+                int256(curve.borrowAprs[i]);
+    }
+
+    // Same piecewise linear per second rate as comet.getSupplyRate and comet.getBorrowRate
+    function _rate(
+        uint256 _utilization,
+        uint256 _kink,
+        uint256 _base,
+        uint256 _slopeLow,
+        uint256 _slopeHigh
+    ) internal pure returns (uint256) {
+        if (_utilization <= _kink) {
+            return _base + _slopeLow * _utilization / 1e18;
+        }
+        return _base + _slopeLow * _kink / 1e18 + _slopeHigh * (_utilization - _kink) / 1e18;
+    }
+
+    // Same math as getRewardAprForSupplyBase and getRewardAprForBorrowBase
+    function _rewardApr(Market memory market, uint256 _rewardPerDay, uint256 _total) internal pure returns (uint256) {
+        if (_rewardPerDay == 0 || _total == 0) return 0;
+        return (market.rewardPrice * _rewardPerDay / (_total * market.basePrice)) * DAYS_PER_YEAR;
+    }
+
+    function manualWithdraw() external virtual onlyGovernance {
         // Withdraw everything we have
-        comet.withdraw(address(baseToken), accruedCometBalance());
+        IERC20 _baseToken = baseToken();
+        comet().withdraw(address(_baseToken), accruedCometBalance());
         // Transfer the full balance to Gov
-        baseToken.safeTransfer(
+        _baseToken.safeTransfer(
             strategy.vault().governance(), 
-            baseToken.balanceOf(address(this))
+            _baseToken.balanceOf(address(this))
         );
     }
 }
\ No newline at end of file
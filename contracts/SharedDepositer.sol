@@ -0,0 +1,245 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+pragma experimental ABIEncoderV2;
+
+import "./Depositer.sol";
+
+import {Math} from "@openzeppelin/contracts/utils/math/Math.sol";
+
+/********************
+ *  Depositer that any number of strategies on the same comet can share. The base token they supply sits in one
+ *      comet account, so it is accrued once per timestamp and its rewards are claimed once for all of them.
+ *   Each strategy owns shares of the account and can only deposit to and withdraw from its own shares.
+ *   Rewards are split by shares using comet's reward tracking of the account, so no claim is needed to account for them.
+ *   Strategies can only be added by the cloner, when this contract's governance clones them onto it.
+ *
+ ********************* */
+
+contract SharedDepositer is Depositer {
+    using SafeERC20 for IERC20;
+
+    // The only address that can add strategies
+    address public immutable cloner;
+    // Clones strategies onto this contract and can withdraw everything. Fixed so no strategy's vault decides it
+    address public immutable governance;
+
+    // Every strategy that set this as its depositer. `strategy` is the first one
+    address[] public strategies;
+    // Bounds the loop in manualWithdraw
+    uint256 public constant MAX_STRATEGIES = 20;
+    mapping(address => bool) public isStrategy;
+
+    // Shares of this contract's comet balance
+    mapping(address => uint256) public shares;
+    uint256 public totalShares;
+    // Shares the first deposit locks in address(0) so the share price can't be inflated while the supply is tiny
+    uint256 public constant DEAD_SHARES = 1_000;
+
+    // Comet's reward tracking of this account per share, scaled by TRACKING_SCALE
+    uint256 public trackingPerShare;
+    // Shares are in base token units, so 1e18 alone would round the tracking of a large supply down to nothing
+    uint256 internal constant TRACKING_SCALE = 1e36;
+    // baseTrackingAccrued when trackingPerShare was last updated
+    uint64 internal lastTracked;
+    // trackingPerShare * shares when each strategy's tracking was last settled
+    mapping(address => uint256) internal trackingDebt;
+    // Settled tracking not paid out yet
+    mapping(address => uint256) internal trackingOwed;
+
+    event StrategyAdded(address indexed strategy);
+
+    constructor(address _comet, address _cloner, address _governance) Depositer(_comet) {
+        cloner = _cloner;
+        governance = _governance;
+    }
+
+    function checkGovernance() internal view override {
+        require(msg.sender == governance, "!authorized");
+    }
+
+    function checkStrategy() internal view override {
+        require(isStrategy[msg.sender], "!authorized");
+    }
+
+    function setStrategy(address _strategy) external override {
+        require(msg.sender == cloner, "!cloner");
+        require(!isStrategy[_strategy], "set");
+        require(strategies.length < MAX_STRATEGIES, "!max");
+
+        // make sure it has the same base token
+        require(address(baseToken()) == IStrategy(_strategy).baseToken(), "!base");
+        // Make sure this contract is set as the depositer
+        require(address(this) == address(IStrategy(_strategy).depositer()), "!depositer");
+
+        if (address(strategy) == address(0)) strategy = IStrategy(_strategy);
+        strategies.push(_strategy);
+        isStrategy[_strategy] = true;
+        emit StrategyAdded(_strategy);
+    }
+
+    function strategiesLength() external view returns (uint256) {
+        return strategies.length;
+    }
+
+    // ----------------- SHARE ACCOUNTING -----------------
+
+    function balanceOfStrategy(address _strategy) public view returns (uint256) {
+        uint256 _totalShares = totalShares;
+        if (_totalShares == 0) return 0;
+        return comet().balanceOf(address(this)) * shares[_strategy] / _totalShares;
+    }
+
+    // The caller's part of the comet balance. Depends on msg.sender so it is only meant for the strategies,
+    // anyone else should read balanceOfStrategy
+    function cometBalance() external view override returns (uint256) {
+        return balanceOfStrategy(msg.sender);
+    }
+
+    function accruedCometBalance() public override returns (uint256) {
+        uint256 _totalShares = totalShares;
+        if (_totalShares == 0) return 0;
+        return _checkpoint() * shares[msg.sender] / _totalShares;
+    }
+
+    // Accrues the account once per timestamp, moves the reward tracking it accrued onto the shares
+    // and returns the comet balance. Every share change is checkpointed first so tracking is
+    // always split by the shares that earned it
+    function _checkpoint() internal returns (uint256) {
+        Comet _comet = comet();
+        if (_markAccrued()) {
+            _comet.accrueAccount(address(this));
+            uint64 tracked = _comet.baseTrackingAccrued(address(this));
+            uint256 _totalShares = totalShares;
+            if (_totalShares > 0) {
+                trackingPerShare += uint256(tracked - lastTracked) * TRACKING_SCALE / _totalShares;
+            }
+            lastTracked = tracked;
+        }
+        return _comet.balanceOf(address(this));
+    }
+
+    function _settle(address _strategy) internal {
+        trackingOwed[_strategy] += shares[_strategy] * trackingPerShare / TRACKING_SCALE - trackingDebt[_strategy];
+    }
+
+    function _setShares(address _strategy, uint256 _shares) internal {
+        totalShares = totalShares - shares[_strategy] + _shares;
+        shares[_strategy] = _shares;
+        trackingDebt[_strategy] = _shares * trackingPerShare / TRACKING_SCALE;
+    }
+
+    function deposit() external override onlyStrategy {
+        IERC20 _baseToken = baseToken();
+        // msg.sender has been checked to be a strategy
+        uint256 _amount = _baseToken.balanceOf(msg.sender);
+        if (_amount == 0) return;
+
+        uint256 balance = _checkpoint();
+        _settle(msg.sender);
+        uint256 _totalShares = totalShares;
+        uint256 newShares;
+        if (_totalShares == 0) {
+            // nothing to settle on them, the checkpoint above had no shares to move tracking onto
+            shares[address(0)] = DEAD_SHARES;
+            totalShares = DEAD_SHARES;
+            newShares = _amount > DEAD_SHARES ? _amount - DEAD_SHARES : 0;
+        } else {
+            newShares = _amount * _totalShares / balance;
+        }
+        // a deposit rounded down to no shares would go to the others
+        require(newShares > 0, "!shares");
+        _setShares(msg.sender, shares[msg.sender] + newShares);
+
+        _baseToken.safeTransferFrom(msg.sender, address(this), _amount);
+        comet().supply(address(_baseToken), _amount);
+    }
+
+    function withdraw(uint256 _amount) external override onlyStrategy {
+        if (_amount == 0) return;
+        IERC20 _baseToken = baseToken();
+
+        uint256 balance = _checkpoint();
+        _settle(msg.sender);
+        uint256 owned = shares[msg.sender];
+        // round the shares burnt up so the others never pay for it
+        uint256 burnt = (_amount * totalShares + balance - 1) / balance;
+        require(burnt <= owned, "!bal");
+        _setShares(msg.sender, owned - burnt);
+
+        comet().withdraw(address(_baseToken), _amount);
+        _baseToken.safeTransfer(msg.sender, _amount);
+    }
+
+    // ----------------- REWARDS -----------------
+
+    // Pays the caller its rewards. Only claims from comet when what was claimed before does not cover them
+    function claimRewards() external override onlyStrategy {
+        _checkpoint();
+        _settle(msg.sender);
+        trackingDebt[msg.sender] = shares[msg.sender] * trackingPerShare / TRACKING_SCALE;
+
+        uint256 owed = _toRewards(trackingOwed[msg.sender]);
+        if (owed == 0) return;
+
+        uint256 compBal = IERC20(comp).balanceOf(address(this));
+        if (compBal < owed) {
+            // accrued in the checkpoint
+            rewardsContract.claim(address(comet()), address(this), false);
+            compBal = IERC20(comp).balanceOf(address(this));
+        }
+        // only what is paid leaves the owed tracking, the rest is paid on a later claim. Rounded to
+        // whole tracking units so a partial payout never pays for tracking it didn't take off
+        uint256 tracking = _toTracking(Math.min(owed, compBal));
+        uint256 paid = _toRewards(tracking);
+        if (paid == 0) return;
+        trackingOwed[msg.sender] -= tracking;
+        IERC20(comp).safeTransfer(msg.sender, paid);
+    }
+
+    // Rewards owed to the caller. Depends on msg.sender so it is only meant for the strategies,
+    // anyone else should read getRewardsOwedFor
+    function getRewardsOwed() external view override returns (uint256) {
+        return getRewardsOwedFor(msg.sender);
+    }
+
+    // Rewards owed to `_strategy` from its own borrowing and its shares of this contract
+    function getRewardsOwedFor(address _strategy) public view override returns (uint256) {
+        Comet _comet = comet();
+        uint256 perShare = trackingPerShare;
+        uint256 _totalShares = totalShares;
+        if (_totalShares > 0) {
+            perShare += uint256(_comet.baseTrackingAccrued(address(this)) - lastTracked) * TRACKING_SCALE / _totalShares;
+        }
+        uint256 tracking = trackingOwed[_strategy] + shares[_strategy] * perShare / TRACKING_SCALE - trackingDebt[_strategy];
+
+        uint256 accrued = _toRewards(_comet.baseTrackingAccrued(_strategy));
+        uint256 claimed = rewardsContract.rewardsClaimed(address(_comet), _strategy);
+        return _toRewards(tracking) + (accrued > claimed ? accrued - claimed : 0);
+    }
+
+    function _toTracking(uint256 _rewards) internal view returns (uint256) {
+        CometStructs.RewardConfig memory config = rewardsContract.rewardConfig(address(comet()));
+        return config.shouldUpscale ? _rewards / config.rescaleFactor : _rewards * config.rescaleFactor;
+    }
+
+    // Withdraws everything to governance and zeroes every strategy's shares. Only reads storage in the loop
+    // so no strategy or vault can block it
+    function manualWithdraw() external override onlyGovernance {
+        IERC20 _baseToken = baseToken();
+        uint256 balance = _checkpoint();
+        comet().withdraw(address(_baseToken), balance);
+
+        uint256 length = strategies.length;
+        for (uint256 i; i < length; ++i) {
+            address _strategy = strategies[i];
+            if (shares[_strategy] == 0) continue;
+            _settle(_strategy);
+            _setShares(_strategy, 0);
+        }
+        // the account is empty, the next deposit starts over with new dead shares
+        shares[address(0)] = 0;
+        totalShares = 0;
+
+        _baseToken.safeTransfer(governance, _baseToken.balanceOf(address(this)));
+    }
+}
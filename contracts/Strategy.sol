@@ -15,6 +15,9 @@ import {CometStructs} from "./interfaces/CompoundV3/CompoundV3.sol";
 import {Comet} from "./interfaces/CompoundV3/CompoundV3.sol";
 import {CometRewards} from "./interfaces/CompoundV3/CompoundV3.sol";
 import {ISwapRouter} from "./interfaces/UniswapV3/ISwapRouter.sol";
+import {ITradeFactory} from "./interfaces/ySwaps/ITradeFactory.sol";
+
+import {ClonesWithImmutableArgs} from "./libraries/ClonesWithImmutableArgs.sol";
 
 interface IBaseFeeGlobal {
     function basefee_global() external view returns (uint256);
@@ -28,6 +31,8 @@ interface IDepositer{
     function accruedCometBalance() external returns (uint256);
     function getNetBorrowApr(uint256) external view returns (uint256);
     function getNetRewardApr(uint256) external view returns(uint256);
+    function getLeverageGain(uint256, uint256) external view returns(uint256);
+    function getRewardsPerYear(uint256, uint256) external view returns(uint256);
     function withdraw(uint256 _amount) external;
     function baseToken() external view returns(IERC20);
     function cometBalance() external view returns(uint256);
@@ -49,15 +54,20 @@ contract Strategy is BaseStrategy {
     bool public leaveDebtBehind;
 
     // This is the address of the main V3 pool
-    Comet public comet;
+    // Read through `comet()`. Immutable args clones keep it in their code instead
+    Comet internal storedComet;
     // This is the token we will be borrowing/supplying
-    address public baseToken;
+    // Read through `baseToken()`. Immutable args clones keep it in their code instead
+    address internal storedBaseToken;
     // The contract to get Comp rewards from
     CometRewards public constant rewardsContract = 
         CometRewards(0x1B0e765F6224C21223AeA2af16c1C46E38885a40); 
     
     // The Contract that will deposit the baseToken back into Compound
-    IDepositer public depositer;
+    // Read through `depositer()`. Immutable args clones keep it in their code instead
+    IDepositer internal storedDepositer;
+    // Number of addresses an immutable args clone appends to the calldata: comet, baseToken, depositer
+    uint256 internal constant IMMUTABLE_ARGS = 3;
 
     // The reward Token
     address internal constant comp = 
@@ -69,6 +79,9 @@ contract Strategy is BaseStrategy {
     // Uniswap v3 router
     ISwapRouter internal constant router =
         ISwapRouter(0xE592427A0AEce92De3Edee1F18E0157C05861564);
+    // ySwaps trade factory. When set, harvests leave claimed COMP for it to sell to want asynchronously
+    address public tradeFactory;
+
     // Fees for the Uni V3 pools
     mapping (address => mapping (address => uint24)) public uniFees;
 
@@ -82,8 +95,30 @@ contract Strategy is BaseStrategy {
     // Warning LTV: ratio at which we will repay
     uint16 public warningLTVMultiplier = 8_000; // 80% of liquidation LTV
 
+    // Share of our assets kept as loose want so small withdrawals don't need to touch comet
+    uint16 public idleBufferBps;
+
+    // Seconds the extra rewards from re-levering have to pay back a tend's callCost in.
+    // 0 re-levers on a fixed 10p.p. LTV band instead
+    uint32 public tendPaybackWindow;
+
+    // Timestamp comet last accrued our account at. Packed with the LTV multipliers, which every
+    // harvest and tend reads, so checking it is a warm read
+    uint40 internal lastAccrual;
+
+    // Seconds rewardsInWant extrapolates the rewards snapshot for before recomputing them. 0 always recomputes.
+    // Selling COMP drops the snapshot, and none is taken while a trade factory can pull COMP at any time
+    uint32 public rewardsSnapshotWindow;
+
+    // Rewards in want at the last harvest or tend and how much they grow in a year at that position,
+    // so the hot views don't read comet, the rewards contract and the price feeds every time
+    uint128 internal rewardsSnapshot;
+    uint88 internal rewardsPerYear;
+    uint40 internal rewardsSnapshotTime;
+
     // support
     uint16 internal constant MAX_BPS = 10_000; // 100%
+    uint256 internal constant SECONDS_PER_YEAR = 365 days;
     //Thresholds
     uint256 internal minThreshold;
     uint256 public minToSell;
@@ -91,6 +126,27 @@ contract Strategy is BaseStrategy {
     
     string internal strategyName;
 
+    // Explains what adjustPosition and liquidatePosition did. Decoded by scripts/decisions.py
+    // action: regime (8 bits) | caps hit (8) | LTV before (64) | LTV after (64) | amount borrowed or repaid (112)
+    // LTVs are 0 for WITHDRAW and SELL so vault withdrawals don't pay for the price reads
+    // aprs: net borrow APR (128) | net reward APR (128) that were compared
+    // Every field is capped at its largest value instead of wrapping
+    event Decision(uint256 action, uint256 aprs);
+
+    // Regimes
+    uint256 internal constant HOLD = 0;
+    uint256 internal constant BORROW = 1;
+    uint256 internal constant REPAY = 2;
+    uint256 internal constant DELEVERAGE = 3;
+    uint256 internal constant WITHDRAW = 4;
+    uint256 internal constant SELL = 5;
+    // Caps that limited the action, as bit flags
+    uint256 internal constant SUPPLY_CAP = 1;
+    uint256 internal constant PROTOCOL_LIQUIDITY = 2;
+    uint256 internal constant BORROW_APR = 4;
+    uint256 internal constant MIN_BORROW = 8;
+    uint256 internal constant MAX_WITHDRAWAL = 16;
+
     constructor(
         address _vault,
         address _comet,
@@ -107,6 +163,29 @@ contract Strategy is BaseStrategy {
         return strategyName;
     }
 
+    // Immutable args clones never store the addresses, so the mode is checked before any storage read.
+    // The code size of this contract is a warm 100 gas read, an empty slot would be a cold 2100
+    function comet() public view returns (Comet) {
+        if (ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            return Comet(ClonesWithImmutableArgs.getAddressArg(0, IMMUTABLE_ARGS));
+        }
+        return storedComet;
+    }
+
+    function baseToken() public view returns (address) {
+        if (ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            return ClonesWithImmutableArgs.getAddressArg(1, IMMUTABLE_ARGS);
+        }
+        return storedBaseToken;
+    }
+
+    function depositer() public view returns (IDepositer) {
+        if (ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            return IDepositer(ClonesWithImmutableArgs.getAddressArg(2, IMMUTABLE_ARGS));
+        }
+        return storedDepositer;
+    }
+
     // ----------------- SETTERS -----------------
     // we put all together to save contract bytecode (!)
     function setStrategyParams(
@@ -127,9 +206,45 @@ contract Strategy is BaseStrategy {
         maxGasPriceToTend = _maxGasPriceToTend;
     }
 
+    function setIdleBuffer(uint16 _idleBufferBps) external onlyAuthorized {
+        require(_idleBufferBps <= MAX_BPS);
+        idleBufferBps = _idleBufferBps;
+    }
+
+    function setTendPaybackWindow(uint32 _tendPaybackWindow) external onlyAuthorized {
+        tendPaybackWindow = _tendPaybackWindow;
+    }
+
+    function setRewardsSnapshotWindow(uint32 _rewardsSnapshotWindow) external onlyAuthorized {
+        rewardsSnapshotWindow = _rewardsSnapshotWindow;
+    }
+
+    function setTradeFactory(address _tradeFactory) external onlyGovernance {
+        if (tradeFactory != address(0)) {
+            _removeTradeFactoryPermissions();
+        }
+
+        IERC20(comp).safeApprove(_tradeFactory, type(uint256).max);
+        ITradeFactory(_tradeFactory).enable(comp, address(want));
+        tradeFactory = _tradeFactory;
+        rewardsSnapshotTime = 0;
+    }
+
+    function removeTradeFactoryPermissions() external onlyEmergencyAuthorized {
+        _removeTradeFactoryPermissions();
+    }
+
+    function _removeTradeFactoryPermissions() internal {
+        address _tradeFactory = tradeFactory;
+        if (_tradeFactory == address(0)) return;
+        IERC20(comp).safeApprove(_tradeFactory, 0);
+        ITradeFactory(_tradeFactory).disable(comp, address(want));
+        tradeFactory = address(0);
+    }
+
     function setPriceFeed(address token, address priceFeed) external onlyAuthorized {
         // just check it doesnt revert
-        comet.getPrice(priceFeed);
+        comet().getPrice(priceFeed);
         priceFeeds[token] = priceFeed;
     }
 
@@ -153,8 +268,8 @@ contract Strategy is BaseStrategy {
         uniFees[comp][_weth] = _compToEthFee;
         uniFees[_weth][comp] = _compToEthFee;
 
-        uniFees[baseToken][_weth] = _ethToBaseFee;
-        uniFees[_weth][baseToken] = _ethToBaseFee;
+        uniFees[baseToken()][_weth] = _ethToBaseFee;
+        uniFees[_weth][baseToken()] = _ethToBaseFee;
     }
 
     function _initializeThis(
@@ -163,23 +278,27 @@ contract Strategy is BaseStrategy {
         address _depositer,
         string memory _strategyName
     ) internal {
-        // Make sure we only initialize one time
-        require(address(comet) == address(0));
-        comet = Comet(_comet);
+        // Make sure we only initialize one time. Clones are also guarded by BaseStrategy's initialize
+        require(address(storedComet) == address(0));
 
         //Get the baseToken we wil borrow and the min
-        baseToken = comet.baseToken();
-        minThreshold = comet.baseBorrowMin();
-
-        depositer = IDepositer(_depositer);
-        require(baseToken == address(depositer.baseToken()), "!base");
+        address _baseToken = Comet(_comet).baseToken();
+        minThreshold = Comet(_comet).baseBorrowMin();
+        require(_baseToken == address(IDepositer(_depositer).baseToken()), "!base");
+
+        // Immutable args clones already have these in their code
+        if (!ClonesWithImmutableArgs.isClone(IMMUTABLE_ARGS)) {
+            storedComet = Comet(_comet);
+            storedBaseToken = _baseToken;
+            storedDepositer = IDepositer(_depositer);
+        }
 
         // to supply want as collateral
         want.safeApprove(_comet, type(uint256).max);
         // to repay debt
-        IERC20(baseToken).safeApprove(_comet, type(uint256).max);
+        IERC20(_baseToken).safeApprove(_comet, type(uint256).max);
         // for depositer to pull funds to deposit
-        IERC20(baseToken).safeApprove(_depositer, type(uint256).max);
+        IERC20(_baseToken).safeApprove(_depositer, type(uint256).max);
         // to sell reward tokens
         IERC20(comp).safeApprove(address(router), type(uint256).max);
 
@@ -187,11 +306,11 @@ contract Strategy is BaseStrategy {
         _setFees(3000, 500, _ethToWantFee);
 
         // set default price feeds
-        priceFeeds[baseToken] = comet.baseTokenPriceFeed();
+        priceFeeds[_baseToken] = Comet(_comet).baseTokenPriceFeed();
         // default to COMP/USD
         priceFeeds[comp] = 0xdbd020CAeF83eFd542f4De03e3cF0C28A4428bd5;
         // default to given feed for want
-        priceFeeds[address(want)] = comet.getAssetInfoByAddress(address(want)).priceFeed;
+        priceFeeds[address(want)] = Comet(_comet).getAssetInfoByAddress(address(want)).priceFeed;
 
         strategyName = _strategyName;
 
@@ -236,6 +355,8 @@ contract Strategy is BaseStrategy {
 
         // 1. claim rewards, 2. even baseToken deposits and borrows 3. sell remainder of rewards to want.
         // This will accrue this account as well as the depositer so all future calls are accurate
+        // With a trade factory only the COMP needed to cover base token owed is sold here, the rest is
+        // left for it to sell to want and counted next harvest
         _claimAndSellRewards();
  
         //base token owed should be 0 here but we count it just in case
@@ -260,35 +381,53 @@ contract Strategy is BaseStrategy {
     }
 
     function adjustPosition(uint256 _debtOutstanding) internal override {
+        _adjustPosition(_debtOutstanding);
+        _snapshotRewards();
+    }
+
+    function _adjustPosition(uint256 _debtOutstanding) internal {
         // cache comet for all future calls
-        Comet _comet = comet;
+        Comet _comet = comet();
         // Accrue account for accurate balances for tend calls
-        _comet.accrueAccount(address(this));
+        _accrueAccount();
 
+        uint256 borrowApr = getNetBorrowApr(0);
+        uint256 rewardApr = getNetRewardApr(0);
         // If the cost to borrow > rewards rate we will pull out all funds to not report a loss
-        if(getNetBorrowApr(0) > getNetRewardApr(0)) {
-            // Liquidate everything so not to report a loss
-            liquidatePosition(balanceOfCollateral() + balanceOfWant());
+        if(borrowApr > rewardApr) {
+            uint256 ltvBefore = getCurrentLTV();
+            uint256 debtBefore = balanceOfDebt();
+            // Liquidate everything so not to report a loss. Logged once below as DELEVERAGE
+            _liquidatePosition(balanceOfCollateral() + balanceOfWant(), false);
+            _logDecision(DELEVERAGE, 0, ltvBefore, debtBefore - balanceOfDebt(), borrowApr, rewardApr);
             // Return since we dont want to do anything else
             return;
         }
 
-        uint256 wantBalance = balanceOfWant();
-        address _want = address(want);
-        // if we have enough want to deposit more, we do
-        // NOTE: we do not skip the rest of the function if we don't as it may need to repay or take on more debt
-        if (wantBalance > _debtOutstanding) {
-            _supply(
-                _want,
-                Math.min(
-                    wantBalance - _debtOutstanding, 
-                    //Check supply cap wont be reached for want
-                    uint256(_comet.getAssetInfoByAddress(_want).supplyCap) - uint256(_comet.totalsCollateral(_want).totalSupplyAsset)
-            ));
+        uint256 caps;
+        {
+            uint256 wantBalance = balanceOfWant();
+            address _want = address(want);
+            // want we keep loose on top of the debt outstanding
+            uint256 buffer = idleBufferBps == 0 ? 0 : (wantBalance + balanceOfCollateral()) * idleBufferBps / MAX_BPS;
+            // if we have enough want to deposit more, we do
+            // NOTE: we do not skip the rest of the function if we don't as it may need to repay or take on more debt
+            if (wantBalance > _debtOutstanding + buffer) {
+                //Check supply cap wont be reached for want
+                uint256 room = uint256(_comet.getAssetInfoByAddress(_want).supplyCap) - uint256(_comet.totalsCollateral(_want).totalSupplyAsset);
+                if (wantBalance - _debtOutstanding - buffer > room) caps = SUPPLY_CAP;
+                _supply(_want, Math.min(wantBalance - _debtOutstanding - buffer, room));
+            } else if (wantBalance < buffer) {
+                // top the buffer back up, repaying the debt it backs first the same way liquidatePosition does
+                uint256 topUp = buffer - wantBalance;
+                _withdrawFromDepositer(_calculateAmountToRepay(topUp));
+                _repayTokenDebt();
+                _withdraw(_want, Math.min(topUp, _maxWithdrawal()));
+            }
         }
 
         // NOTE: debt + collateral calcs are done in USD
-        uint256 collateralInUsd = _toUsd(balanceOfCollateral(), _want);
+        uint256 collateralInUsd = _toUsd(balanceOfCollateral(), address(want));
 
         // if there is no want deposited into compound, don't do anything
         // this means no debt is borrowed from compound too
@@ -297,7 +436,7 @@ contract Strategy is BaseStrategy {
         }
         
         // cache baseToken to save a couple of sLoads in normal behavior
-        address _baseToken = baseToken;
+        address _baseToken = baseToken();
 
         // convert debt to USD
         uint256 debtInUsd = _toUsd(balanceOfDebt(), _baseToken);
@@ -315,49 +454,58 @@ contract Strategy is BaseStrategy {
             // SUBOPTIMAL RATIO: our current Loan-to-Value is lower than what we want
             // AND costs are lower than our max acceptable costs
 
-            // we need to take on more debt
-            uint256 targetDebtUsd =
-                collateralInUsd * targetLTV / 1e18;
-
-            uint256 amountToBorrowUsd = targetDebtUsd - debtInUsd; // safe bc we checked ratios
+            // we need to take on more debt, safe bc we checked ratios
             // convert to BaseToken
-            uint256 amountToBorrowBT = _fromUsd(amountToBorrowUsd, _baseToken);
-
-            uint256 currentProtocolDebt = _comet.totalBorrow();
-            uint256 maxProtocolDebt = _comet.totalSupply();
-            // cap the amount of debt we are taking according to what is available from Compound
-            if (currentProtocolDebt + amountToBorrowBT > maxProtocolDebt) {
-                // Can't underflow because it's checked in the previous if condition
-                amountToBorrowUsd = _toUsd(maxProtocolDebt - currentProtocolDebt, _baseToken);
+            uint256 amountToBorrowBT = _fromUsd(collateralInUsd * targetLTV / 1e18 - debtInUsd, _baseToken);
+
+            {
+                uint256 currentProtocolDebt = _comet.totalBorrow();
+                uint256 maxProtocolDebt = _comet.totalSupply();
+                // cap the amount of debt we are taking according to what is available from Compound
+                if (currentProtocolDebt + amountToBorrowBT > maxProtocolDebt) {
+                    // Can't underflow because it's checked in the previous if condition
+                    amountToBorrowBT = maxProtocolDebt - currentProtocolDebt;
+                    caps |= PROTOCOL_LIQUIDITY;
+                }
             }
 
             // We want to make sure that the reward apr > borrow apr so we dont reprot a loss
             // Borrowing will cause the borrow apr to go up and the rewards apr to go down
-            if(
-                getNetBorrowApr(amountToBorrowBT) > 
-                getNetRewardApr(amountToBorrowBT)
-            ) {
+            borrowApr = getNetBorrowApr(amountToBorrowBT);
+            rewardApr = getNetRewardApr(amountToBorrowBT);
+            if(borrowApr > rewardApr) {
                 // If we would push it over the limit dont borrow anything
                 amountToBorrowBT = 0;
+                caps |= BORROW_APR;
             }
 
             // Need to have at least the min set by comet
             if (balanceOfDebt() + amountToBorrowBT > minThreshold) {
-                _withdraw(baseToken, amountToBorrowBT);
+                _withdraw(_baseToken, amountToBorrowBT);
+            } else if (amountToBorrowBT > 0) {
+                amountToBorrowBT = 0;
+                caps |= MIN_BORROW;
             }
 
+            _logDecision(BORROW, caps, currentLTV, amountToBorrowBT, borrowApr, rewardApr);
+
         } else if (currentLTV > _getWarningLTV()) {
             // UNHEALTHY RATIO
             // we repay debt to set it to targetLTV
+            uint256 debtBefore = balanceOfDebt();
             uint256 targetDebtUsd = targetLTV * collateralInUsd / 1e18;
             
             // Withdraw the difference from the Depositer
             _withdrawFromDepositer(_fromUsd(debtInUsd - targetDebtUsd, _baseToken)); // we withdraw from BaseToken depositer
             _repayTokenDebt(); // we repay the BaseToken debt with compound
+
+            _logDecision(REPAY, caps, currentLTV, debtBefore - balanceOfDebt(), borrowApr, rewardApr);
+        } else {
+            _logDecision(HOLD, caps, currentLTV, 0, borrowApr, rewardApr);
         }
 
         if (balanceOfBaseToken() > 0) {
-            depositer.deposit();
+            depositer().deposit();
         }
     }
 
@@ -373,6 +521,13 @@ contract Strategy is BaseStrategy {
         internal
         override
         returns (uint256 _liquidatedAmount, uint256 _loss)
+    {
+        return _liquidatePosition(_amountNeeded, true);
+    }
+
+    function _liquidatePosition(uint256 _amountNeeded, bool _log)
+        internal
+        returns (uint256 _liquidatedAmount, uint256 _loss)
     {
         uint256 balance = balanceOfWant();
         // if we have enough want to take care of the liquidatePosition without actually liquidating positons
@@ -385,13 +540,15 @@ contract Strategy is BaseStrategy {
 
         uint256 needed = _amountNeeded - balance;
         // Accrue account for accurate balances
-        comet.accrueAccount(address(this));
+        _accrueAccount();
         // We first repay whatever we need to repay to keep healthy ratios
         _withdrawFromDepositer(_calculateAmountToRepay(needed)); 
         // we repay the BaseToken debt with the amount withdrawn from the vault
-        _repayTokenDebt();
+        uint256 repaid = _repayTokenDebt();
         // Withdraw as much as we can up to the amount needed while maintaning a health ltv
-        _withdraw(address(want), Math.min(needed, _maxWithdrawal()));
+        uint256 maxWithdrawal = _maxWithdrawal();
+        _withdraw(address(want), Math.min(needed, maxWithdrawal));
+        uint256 regime = WITHDRAW;
         // it will return the free amount of want
         balance = balanceOfWant();
         // we check if we withdrew less than expected, we have not more baseToken left AND should harvest or buy BaseToken with want (potentially realising losses)
@@ -405,10 +562,11 @@ contract Strategy is BaseStrategy {
             // This should only occur when depleting the strategy so we want to swap the full amount of our debt
             // we buy BaseToken first with available rewards then with Want
             _buyBaseToken();
+            regime = SELL;
 
             // we repay debt to actually unlock collateral
             // after this, balanceOfDebt should be 0
-            _repayTokenDebt();
+            repaid += _repayTokenDebt();
 
             // then we try withdraw once more
             // still withdraw with target LTV since management can potentially save any left over manually 
@@ -417,6 +575,13 @@ contract Strategy is BaseStrategy {
             balance = balanceOfWant();
         }
 
+        if (_log) {
+            _logDecision(regime, needed > maxWithdrawal ? MAX_WITHDRAWAL : 0, 0, repaid, 0, 0);
+            // the position shrank so the snapshot rate is stale. Withdrawals only drop it, the next
+            // adjustPosition takes a new one. It already snapshots after its own deleverage
+            rewardsSnapshotTime = 0;
+        }
+
         if (_amountNeeded > balance) {
             _liquidatedAmount = balance;
             _loss = _amountNeeded - balance;
@@ -425,15 +590,28 @@ contract Strategy is BaseStrategy {
         }
     }
 
-    // manualWithdrawAndRepayDebt should be called previous to migration in order
-    // to pay back any outstanding debt before migration
+    // Hands the position over inside comet instead of unwinding it. The debt is repaid with what the
+    // depositer holds and the collateral is transferred to the new strategy's account, so nothing is swapped.
+    // Any debt the depositer can't cover should be repaid first, or only the collateral over the target LTV moves
     function prepareMigration(address _newStrategy) internal override {
-        // still check max withdraw in case of dust borrow balances
-        _withdraw(address(want), _maxWithdrawal());
+        _withdrawFromDepositer(type(uint256).max);
+        _repayTokenDebt();
+
+        uint256 collateral = _maxWithdrawal();
+        if(collateral > 0) {
+            // Only a strategy on the same comet can use collateral in our account
+            try Strategy(_newStrategy).comet() returns (Comet newComet) {
+                if(address(newComet) == address(comet())) {
+                    comet().transferAsset(_newStrategy, address(want), collateral);
+                    collateral = 0;
+                }
+            } catch {}
+            if(collateral > 0) _withdraw(address(want), collateral);
+        }
         
         uint256 baseBalance = balanceOfBaseToken();
         if(baseBalance > 0) {
-            IERC20(baseToken).safeTransfer(_newStrategy, baseBalance);
+            IERC20(baseToken()).safeTransfer(_newStrategy, baseBalance);
         }
     }
 
@@ -444,17 +622,25 @@ contract Strategy is BaseStrategy {
         }
     
         // if we are in danger of being liquidated tend no matter what
-        if(comet.isLiquidatable(address(this))) return true;
+        if(comet().isLiquidatable(address(this))) return true;
 
         // we adjust position if:
         // 1. LTV ratios are not in the HEALTHY range (either we take on more debt or repay debt)
         // 2. costs are acceptable
-        uint256 collateralInUsd = _toUsd(balanceOfCollateral(), address(want));
+        uint256 collateral = balanceOfCollateral();
+        uint256 collateralInUsd = _toUsd(collateral, address(want));
 
         // Nothing to rebalance if we do not have collateral locked
         if (collateralInUsd == 0) return false;
 
-        uint256 currentLTV = _toUsd(balanceOfDebt(), baseToken) * 1e18 / collateralInUsd;
+        // Refill the idle buffer once withdrawals drained it below half, until then they go through comet again
+        uint256 bufferBps = idleBufferBps;
+        if (bufferBps != 0) {
+            uint256 wantBalance = balanceOfWant();
+            if (wantBalance * MAX_BPS * 2 < (wantBalance + collateral) * bufferBps) return isBaseFeeAcceptable();
+        }
+
+        uint256 currentLTV = _toUsd(balanceOfDebt(), baseToken()) * 1e18 / collateralInUsd;
         uint256 targetLTV = _getTargetLTV();
         
         // Check if we are over our warning LTV
@@ -464,10 +650,24 @@ contract Strategy is BaseStrategy {
                         .basefee_global() <= maxGasPriceToTend;
         }
         
-        if (// WE NEED TO TAKE ON MORE DEBT (we need a 10p.p (1000bps) difference)
-            (currentLTV < targetLTV && targetLTV - currentLTV > 1e17) || 
-                (getNetBorrowApr(0) > getNetRewardApr(0)) // UNHEALTHY BORROWING COSTS
-        ) {
+        // WE NEED TO TAKE ON MORE DEBT
+        if (currentLTV < targetLTV) {
+            uint256 window = tendPaybackWindow;
+            if (window == 0) {
+                // we need a 10p.p (1000bps) difference
+                if (targetLTV - currentLTV > 1e17) return isBaseFeeAcceptable();
+            } else {
+                // the rewards on the extra debt over the window need to pay for the tend
+                uint256 gain = depositer().getLeverageGain(
+                    _fromUsd((targetLTV - currentLTV) * collateralInUsd / 1e18, baseToken()),
+                    window
+                );
+                if (_toUsd(gain, baseToken()) > _toUsd(callCost, weth)) return isBaseFeeAcceptable();
+            }
+        }
+
+        // UNHEALTHY BORROWING COSTS
+        if (getNetBorrowApr(0) > getNetRewardApr(0)) {
             return isBaseFeeAcceptable();
         }
 
@@ -476,6 +676,21 @@ contract Strategy is BaseStrategy {
 
     // ----------------- INTERNAL FUNCTIONS SUPPORT -----------------
 
+    /*
+    * Comet's indexes only move when the timestamp does and it updates our tracking index every time our
+    * principal changes, so once accrued our account stays accrued until the next timestamp
+    */
+    function _accrueAccount() internal {
+        if(_markAccrued()) comet().accrueAccount(address(this));
+    }
+
+    // Returns true, and records it, if our account was not accrued yet at this timestamp
+    function _markAccrued() internal returns (bool) {
+        if(lastAccrual == block.timestamp) return false;
+        lastAccrual = uint40(block.timestamp);
+        return true;
+    }
+
     function _withdrawFromDepositer(uint256 _amountBT) internal {
         uint256 balancePrior = balanceOfBaseToken();
         // Only withdraw what we dont already have free
@@ -486,16 +701,16 @@ contract Strategy is BaseStrategy {
         _amountBT =
             Math.min(
                 _amountBT,
-                depositer.accruedCometBalance()
+                depositer().accruedCometBalance()
             );
         // need to check liquidity of the comet
         _amountBT =
             Math.min(
                 _amountBT,
-                IERC20(baseToken).balanceOf(address(comet))
+                IERC20(baseToken()).balanceOf(address(comet()))
             );
 
-        depositer.withdraw(_amountBT);
+        depositer().withdraw(_amountBT);
     }
 
     /*
@@ -504,7 +719,7 @@ contract Strategy is BaseStrategy {
     */
     function _supply(address asset, uint256 amount) internal {
         if (amount == 0) return;
-        comet.supply(asset, amount);
+        comet().supply(asset, amount);
     }
 
     /*
@@ -513,17 +728,18 @@ contract Strategy is BaseStrategy {
     */
     function _withdraw(address asset, uint256 amount) internal {
         if (amount == 0) return;
-        comet.withdraw(asset, amount);
+        comet().withdraw(asset, amount);
     }
 
-    function _repayTokenDebt() internal {
+    function _repayTokenDebt() internal returns (uint256 repaid) {
         // we cannot pay more than loose balance or more than we owe
-        _supply(baseToken, Math.min(balanceOfBaseToken(), balanceOfDebt()));
+        repaid = Math.min(balanceOfBaseToken(), balanceOfDebt());
+        _supply(baseToken(), repaid);
     }
 
     function _maxWithdrawal() internal view returns (uint256) {
         uint256 collateralInUsd = _toUsd(balanceOfCollateral(), address(want));
-        uint256 debtInUsd = _toUsd(balanceOfDebt(), baseToken);
+        uint256 debtInUsd = _toUsd(balanceOfDebt(), baseToken());
 
         // If there is no debt we can withdraw everything
         if(debtInUsd == 0) return balanceOfCollateral();
@@ -553,7 +769,7 @@ contract Strategy is BaseStrategy {
         uint256 newCollateralUsd = _toUsd(collateral - amount, address(want));
 
         uint256 targetDebtUsd = newCollateralUsd * _getTargetLTV() / 1e18;
-        uint256 targetDebt = _fromUsd(targetDebtUsd, baseToken);
+        uint256 targetDebt = _fromUsd(targetDebtUsd, baseToken());
         uint256 currentDebt = balanceOfDebt();
         // Repay only if our target debt is lower than our current debt
         return targetDebt < currentDebt ? currentDebt - targetDebt : 0;
@@ -583,19 +799,19 @@ contract Strategy is BaseStrategy {
     }
 
     function balanceOfCollateral() public view returns (uint256) {
-        return uint256(comet.userCollateral(address(this), address(want)).balance);
+        return uint256(comet().userCollateral(address(this), address(want)).balance);
     }
 
     function balanceOfBaseToken() public view returns(uint256) {
-        return IERC20(baseToken).balanceOf(address(this));
+        return IERC20(baseToken()).balanceOf(address(this));
     }
 
     function balanceOfDepositer() public view returns(uint256) {
-        return depositer.cometBalance();
+        return depositer().cometBalance();
     }
 
     function balanceOfDebt() public view returns (uint256) {
-        return comet.borrowBalanceOf(address(this));
+        return comet().borrowBalanceOf(address(this));
     }
 
     // Returns the negative position of base token. i.e. borrowed - supplied
@@ -614,28 +830,54 @@ contract Strategy is BaseStrategy {
     }
 
     function baseTokenOwedInWant() internal view returns(uint256) {
-        return _fromUsd(_toUsd(baseTokenOwedBalance(), baseToken), address(want));
+        return _fromUsd(_toUsd(baseTokenOwedBalance(), baseToken()), address(want));
     }
 
     function rewardsInWant() public view returns(uint256) {
-        // underreport by 10% for safety
-        return _fromUsd(_toUsd(depositer.getRewardsOwed(), comp), address(want)) * 9_000 / MAX_BPS;
+        uint256 snapshotTime = rewardsSnapshotTime;
+        // 0 before the first snapshot and once it was dropped
+        if (snapshotTime != 0 && block.timestamp - snapshotTime <= rewardsSnapshotWindow) {
+            return rewardsSnapshot + uint256(rewardsPerYear) * (block.timestamp - snapshotTime) / SECONDS_PER_YEAR;
+        }
+        return _rewardsInWant();
+    }
+
+    // Records the rewards and their rate at the position we just adjusted to
+    function _snapshotRewards() internal {
+        if (rewardsSnapshotWindow == 0 || tradeFactory != address(0)) return;
+        rewardsSnapshot = uint128(_rewardsInWant());
+        rewardsPerYear = uint88(Math.min(
+            _fromUsd(
+                _toUsd(depositer().getRewardsPerYear(balanceOfDebt(), balanceOfDepositer()), baseToken()),
+                address(want)
+            ) * 9_000 / MAX_BPS,
+            type(uint88).max
+        ));
+        rewardsSnapshotTime = uint40(block.timestamp);
+    }
+
+    function _rewardsInWant() internal view returns(uint256) {
+        // Includes claimed COMP waiting to be sold. underreport by 10% for safety
+        return _fromUsd(
+            _toUsd(depositer().getRewardsOwed() + IERC20(comp).balanceOf(address(this)), comp),
+            address(want)
+        ) * 9_000 / MAX_BPS;
     }
 
     // We put the logic for these APR functions in the depositer contract to save byte code in the main strategy \\
     function getNetBorrowApr(uint256 newAmount) public view returns(uint256) {
-        return depositer.getNetBorrowApr(newAmount);
+        return depositer().getNetBorrowApr(newAmount);
     }
 
     function getNetRewardApr(uint256 newAmount) public view returns (uint256) {
-        return depositer.getNetRewardApr(newAmount);
+        return depositer().getNetRewardApr(newAmount);
     }
 
     /*
     * Get the liquidation collateral factor for an asset
     */
     function getLiquidateCollateralFactor() public view returns (uint256) {
-        return uint256(comet.getAssetInfoByAddress(address(want)).liquidateCollateralFactor);
+        return uint256(comet().getAssetInfoByAddress(address(want)).liquidateCollateralFactor);
     }
 
     /*
@@ -644,7 +886,7 @@ contract Strategy is BaseStrategy {
     function getPriceFeedAddress(address asset) internal view returns (address priceFeed) {
         priceFeed = priceFeeds[asset];
         if(priceFeed == address(0)) {
-            priceFeed = comet.getAssetInfoByAddress(asset).priceFeed;
+            priceFeed = comet().getAssetInfoByAddress(asset).priceFeed;
         }
     }
 
@@ -652,18 +894,35 @@ contract Strategy is BaseStrategy {
     * Get the current price of an asset from the protocol's persepctive
     */
     function getCompoundPrice(address asset) internal view returns (uint256 price) {
-        price = comet.getPrice(getPriceFeedAddress(asset));
+        price = comet().getPrice(getPriceFeedAddress(asset));
         // If weth is base token we need to scale response to e18
         if(price == 1e8 && asset == weth) price = 1e18; 
     }
 
-    // External function used to easisly calculate the current LTV of the strat
-    function getCurrentLTV() external view returns(uint256) {
+    // External function used to easisly calculate the current LTV of the strat, 0 without collateral
+    function getCurrentLTV() public view returns(uint256) {
+        uint256 collateralInUsd = _toUsd(balanceOfCollateral(), address(want));
+        if (collateralInUsd == 0) return 0;
         unchecked {
-            return _toUsd(balanceOfDebt(), baseToken) * 1e18 / _toUsd(balanceOfCollateral(), address(want));
+            return _toUsd(balanceOfDebt(), baseToken()) * 1e18 / collateralInUsd;
         }
     }
 
+    function _logDecision(
+        uint256 _regime,
+        uint256 _caps,
+        uint256 _ltvBefore,
+        uint256 _amount,
+        uint256 _borrowApr,
+        uint256 _rewardApr
+    ) internal virtual {
+        uint256 ltvAfter = _regime < WITHDRAW ? getCurrentLTV() : 0;
+        emit Decision(
+            _regime | (_caps << 8) | (Math.min(_ltvBefore, type(uint64).max) << 16) | (Math.min(ltvAfter, type(uint64).max) << 80) | (Math.min(_amount, type(uint112).max) << 144),
+            Math.min(_borrowApr, type(uint128).max) | (Math.min(_rewardApr, type(uint128).max) << 128)
+        );
+    }
+
     function _getTargetLTV()
         internal
         view
@@ -693,9 +952,10 @@ contract Strategy is BaseStrategy {
     }
 
     function _claimRewards() internal {
-        rewardsContract.claim(address(comet), address(this), true);
+        // Only let the claim accrue us if nothing did yet at this timestamp
+        rewardsContract.claim(address(comet()), address(this), _markAccrued());
         // Pull rewards from depositer even if not incentivised to accrue the account
-        depositer.claimRewards();   
+        depositer().claimRewards();   
     }
 
     function _claimAndSellRewards() internal {
@@ -706,11 +966,13 @@ contract Strategy is BaseStrategy {
         uint256 compBalance = IERC20(_comp).balanceOf(address(this));
 
         if(compBalance <= minToSell) return;
+        // the COMP sold here is in the rewards snapshot, the next adjust or liquidate takes a new one
+        rewardsSnapshotTime = 0;
 
         uint256 baseNeeded = baseTokenOwedBalance();
 
         if(baseNeeded > 0) {
-            address _baseToken = baseToken;
+            address _baseToken = baseToken();
             // We estimate how much we will need in order to get the amount of base
             // Accounts for slippage and diff from oracle price, just to assure no horrible sandwhich
             uint256 maxComp = _fromUsd(_toUsd(baseNeeded, _baseToken), _comp) * 10_500 / MAX_BPS;
@@ -723,6 +985,9 @@ contract Strategy is BaseStrategy {
             }
         }
         
+        // the trade factory sells what is left
+        if(tradeFactory != address(0)) return;
+
         compBalance = IERC20(_comp).balanceOf(address(this));
         // Anything over the amount to cover debt is profit
         if(compBalance > minToSell) {
@@ -743,14 +1008,14 @@ contract Strategy is BaseStrategy {
         if(baseStillOwed > 0) {
             // Need to account for both slippage and diff in the oracle price.
             // Should be only swapping very small amounts so its just to make sure there is no massive sandwhich
-            uint256 maxWantBalance = _fromUsd(_toUsd(baseStillOwed, baseToken), address(want)) * 10_500 / MAX_BPS;
+            uint256 maxWantBalance = _fromUsd(_toUsd(baseStillOwed, baseToken()), address(want)) * 10_500 / MAX_BPS;
             // Under 10 can cause rounding errors from token conversions, no need to swap that small amount  
             if (maxWantBalance <= 10) return;
 
             // This should rarely if ever happen so we approve only what is needed
             IERC20(address(want)).safeApprove(address(router), 0);
             IERC20(address(want)).safeApprove(address(router), maxWantBalance);
-            _swapFrom(address(want), baseToken, baseStillOwed, maxWantBalance);   
+            _swapFrom(address(want), baseToken(), baseStillOwed, maxWantBalance);   
         }
     }
 
@@ -856,7 +1121,7 @@ contract Strategy is BaseStrategy {
     //Manual function available to management to withdraw from vault and repay debt
     function manualWithdrawAndRepayDebt(uint256 _amount) external onlyAuthorized {
         if(_amount > 0) {
-            depositer.withdraw(_amount);
+            depositer().withdraw(_amount);
         }
         _repayTokenDebt();
     }
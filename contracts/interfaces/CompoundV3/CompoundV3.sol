@@ -62,10 +62,20 @@ interface Comet is IERC20 {
   function supply(address asset, uint amount) external;
   function supplyTo(address to, address asset, uint amount) external;
   function withdraw(address asset, uint amount) external;
+  function transferAsset(address dst, address asset, uint amount) external;
 
   function getSupplyRate(uint utilization) external view returns (uint);
   function getBorrowRate(uint utilization) external view returns (uint);
 
+  function supplyKink() external view returns (uint);
+  function supplyPerSecondInterestRateSlopeLow() external view returns (uint);
+  function supplyPerSecondInterestRateSlopeHigh() external view returns (uint);
+  function supplyPerSecondInterestRateBase() external view returns (uint);
+  function borrowKink() external view returns (uint);
+  function borrowPerSecondInterestRateSlopeLow() external view returns (uint);
+  function borrowPerSecondInterestRateSlopeHigh() external view returns (uint);
+  function borrowPerSecondInterestRateBase() external view returns (uint);
+
   function getAssetInfoByAddress(address asset) external view returns (CometStructs.AssetInfo memory);
   function getAssetInfo(uint8 i) external view returns (CometStructs.AssetInfo memory);
 
@@ -90,6 +100,8 @@ interface Comet is IERC20 {
   function totalBorrow() external view returns (uint256);
 
   function baseIndexScale() external pure returns (uint64);
+  function trackingIndexScale() external view returns (uint64);
+  function baseAccrualScale() external pure returns (uint64);
   function baseTrackingAccrued(address account) external view returns (uint64);
 
   function totalsCollateral(address asset) external view returns (CometStructs.TotalsCollateral memory);
@@ -20,4 +20,12 @@ interface IStrategy {
     function baseToken() external view returns (address);
 
     function estimatedTotalAssets() external view returns (uint256);
-}
\ No newline at end of file
+
+    function harvestTrigger(uint256 callCostInWei) external view returns (bool);
+
+    function tendTrigger(uint256 callCostInWei) external view returns (bool);
+
+    function harvest() external;
+
+    function tend() external;
+}
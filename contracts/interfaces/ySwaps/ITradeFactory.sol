@@ -5,6 +5,8 @@ pragma solidity ^0.8.12;
 interface ITradeFactory {
     function enable(address, address) external;
 
+    function disable(address, address) external;
+
     function grantRole(bytes32 role, address account) external;
 
     function STRATEGY() external view returns (bytes32);
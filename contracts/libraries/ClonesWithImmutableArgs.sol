@@ -0,0 +1,59 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+
+/********************
+ *  EIP-1167 style minimal proxy that appends a fixed list of addresses to the calldata of every call it forwards.
+ *      The implementation reads them back with `getAddressArg` instead of loading them from storage.
+ *   Based on https://github.com/wighawag/clones-with-immutable-args
+ *
+ ********************* */
+
+library ClonesWithImmutableArgs {
+    // Runtime size of the proxy before the appended addresses
+    uint256 internal constant PROXY_SIZE = 54;
+
+    function clone(address _implementation, bytes memory _args) internal returns (address instance) {
+        uint256 runtimeSize = PROXY_SIZE + _args.length;
+        require(runtimeSize < 256 && _args.length % 20 == 0, "!args");
+
+        bytes memory code = abi.encodePacked(
+            // creation code: codecopy(0, 10, runtimeSize) return(0, runtimeSize)
+            hex"3d60", uint8(runtimeSize), hex"80600a3d3981f3",
+            // calldatacopy(0, 0, calldatasize())
+            hex"363d3d37",
+            // codecopy(calldatasize(), PROXY_SIZE, argsLength)
+            hex"60", uint8(_args.length), hex"603636", hex"39",
+            // delegatecall(gas(), implementation, 0, add(calldatasize(), argsLength), 0, 0)
+            hex"3d3d3d60", uint8(_args.length), hex"36013d73", _implementation, hex"5af4",
+            // return or revert with the return data, same as EIP-1167
+            hex"3d82803e903d91603457fd5bf3",
+            _args
+        );
+
+        assembly {
+            instance := create(0, add(code, 0x20), mload(code))
+        }
+        require(instance != address(0), "!clone");
+    }
+
+    /*
+    * Whether the running contract is a proxy from `clone` with `_count` appended addresses.
+    * Reads the proxy's own code size so the original and EIP-1167 clones never trust the calldata.
+    */
+    function isClone(uint256 _count) internal view returns (bool result) {
+        uint256 size = PROXY_SIZE + _count * 20;
+        assembly {
+            result := eq(extcodesize(address()), size)
+        }
+    }
+
+    /*
+    * Reads the address at `_index` of the `_count` addresses appended to the calldata.
+    * Only valid when `isClone(_count)` is true.
+    */
+    function getAddressArg(uint256 _index, uint256 _count) internal pure returns (address arg) {
+        assembly {
+            arg := shr(96, calldataload(sub(calldatasize(), mul(sub(_count, _index), 20))))
+        }
+    }
+}
@@ -0,0 +1,40 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+
+/********************
+ *   Chainlink style price feed with a settable answer. Used in tests to move the prices
+ *      the strategy reads through comet.getPrice(priceFeed). Its code is put at live feed
+ *      addresses so comet's own prices move with it.
+ ********************* */
+
+contract MockPriceFeed {
+    uint8 public immutable decimals;
+    int256 public answer;
+    uint80 public roundId;
+    uint256 public updatedAt;
+
+    constructor(uint8 _decimals, int256 _answer) {
+        decimals = _decimals;
+        setAnswer(_answer);
+    }
+
+    function setAnswer(int256 _answer) public {
+        answer = _answer;
+        updatedAt = block.timestamp;
+        ++roundId;
+    }
+
+    function latestRoundData()
+        external
+        view
+        returns (
+            uint80,
+            int256,
+            uint256,
+            uint256,
+            uint80
+        )
+    {
+        return (roundId, answer, updatedAt, updatedAt, roundId);
+    }
+}
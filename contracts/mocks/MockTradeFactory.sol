@@ -0,0 +1,50 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import {SafeERC20} from "@openzeppelin/contracts/token/ERC20/utils/SafeERC20.sol";
+
+/********************
+ *   Stand in for the ySwaps TradeFactory. Strategies enable token pairs the same way,
+ *      then `execute` sells the enabled balance of a batch of strategies at a fixed rate
+ *      and pays them from tokens the test funded it with.
+ ********************* */
+
+contract MockTradeFactory {
+    using SafeERC20 for IERC20;
+
+    bytes32 public constant STRATEGY = keccak256("STRATEGY");
+
+    // strategy => tokenIn => tokenOut => enabled
+    mapping(address => mapping(address => mapping(address => bool))) public enabled;
+
+    function grantRole(bytes32, address) external {}
+
+    function enable(address _tokenIn, address _tokenOut) external {
+        enabled[msg.sender][_tokenIn][_tokenOut] = true;
+    }
+
+    function disable(address _tokenIn, address _tokenOut) external {
+        enabled[msg.sender][_tokenIn][_tokenOut] = false;
+    }
+
+    /*
+    * Pull the whole `_tokenIn` balance of every strategy and pay each `_rate` (scaled by 1e18) of `_tokenOut` for it.
+    */
+    function execute(
+        address[] calldata _strategies,
+        address _tokenIn,
+        address _tokenOut,
+        uint256 _rate
+    ) external {
+        for (uint256 i; i < _strategies.length; ++i) {
+            address strategy = _strategies[i];
+            require(enabled[strategy][_tokenIn][_tokenOut], "!enabled");
+
+            uint256 amountIn = IERC20(_tokenIn).balanceOf(strategy);
+            if (amountIn == 0) continue;
+            IERC20(_tokenIn).safeTransferFrom(strategy, address(this), amountIn);
+            IERC20(_tokenOut).safeTransfer(strategy, amountIn * _rate / 1e18);
+        }
+    }
+}
@@ -0,0 +1,28 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity >=0.8.15;
+pragma experimental ABIEncoderV2;
+
+import "../Strategy.sol";
+
+/********************
+ *   Strategy that emits no Decision events. Used in tests to measure what logging them costs.
+ ********************* */
+
+contract StrategyWithoutDecisions is Strategy {
+    constructor(
+        address _vault,
+        address _comet,
+        uint24 _ethToWantFee,
+        address _depositer,
+        string memory _strategyName
+    ) Strategy(_vault, _comet, _ethToWantFee, _depositer, _strategyName) {}
+
+    function _logDecision(
+        uint256,
+        uint256,
+        uint256,
+        uint256,
+        uint256,
+        uint256
+    ) internal override {}
+}
@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import Depositer, multicall
+
+from scripts.fleet import unwrap
+
+APR_SCALE = 10 ** 18
+# Field order of Depositer.AprCurve
+FIELDS = [
+    "utilizations",
+    "supply_aprs",
+    "borrow_aprs",
+    "supply_reward_aprs",
+    "borrow_reward_aprs",
+    "net_aprs",
+]
+
+
+@dataclass
+class AprCurve:
+    """A Depositer.AprCurve as float arrays. Utilizations and APRs as fractions."""
+
+    depositer: str
+    # the new amounts or utilizations that were asked for, as given
+    points: np.ndarray
+    utilizations: np.ndarray
+    supply_aprs: np.ndarray
+    borrow_aprs: np.ndarray
+    supply_reward_aprs: np.ndarray
+    borrow_reward_aprs: np.ndarray
+    net_aprs: np.ndarray
+
+    @classmethod
+    def decode(cls, depositer, points, result):
+        values = unwrap(result)
+        return cls(
+            depositer=str(depositer),
+            points=np.asarray(points),
+            **{
+                name: np.array([int(v) for v in value], dtype=np.float64) / APR_SCALE
+                for name, value in zip(FIELDS, values)
+            },
+        )
+
+    def breakeven(self):
+        """First point where borrowing to supply stops paying, None if it pays on the whole curve."""
+        losing = np.flatnonzero(self.net_aprs <= 0)
+        return self.points[losing[0]] if losing.size else None
+
+    def rows(self):
+        """One dict per point, for `print_report`."""
+        return [
+            {"point": point, **{name: float(getattr(self, name)[i]) for name in FIELDS}}
+            for i, point in enumerate(self.points.tolist())
+        ]
+
+
+def utilization_grid(points=101, low=0.0, high=1.0):
+    """Utilizations scaled by 1e18, for `getAprCurveAtUtilizations`."""
+    return [int(u * APR_SCALE) for u in np.linspace(low, high, points)]
+
+
+def get_curves(depositers, points, by="utilization", block_identifier=None):
+    """
+    Read the curve of every depositer in one multicall.
+    `by` is "utilization" for a utilization grid or "amount" for new base token amounts.
+    """
+    depositers = [d if hasattr(d, "getAprCurve") else Depositer.at(d) for d in depositers]
+    points = [int(p) for p in points]
+    with multicall(block_identifier=block_identifier):
+        if by == "utilization":
+            results = [d.getAprCurveAtUtilizations(points) for d in depositers]
+        else:
+            results = [d.getAprCurve(points) for d in depositers]
+    return [AprCurve.decode(d.address, points, r) for d, r in zip(depositers, results)]
+
+
+def get_curve(depositer, points, by="utilization", block_identifier=None):
+    return get_curves([depositer], points, by, block_identifier)[0]
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from brownie import web3
+
+# Everything a prepared chain is built from. A change to any of them rebuilds it
+SOURCES = ["contracts/**/*.sol", "brownie-config.yml", "tests/conftest.py"]
+
+
+def content_key(root=".", *extra):
+    """
+    Hash of the contract sources, the config and the fixtures that build the chain, plus
+    `extra` values such as the markets and the block the fork starts at.
+    """
+    root = Path(root)
+    digest = hashlib.sha256()
+    paths = sorted({path for pattern in SOURCES for path in root.glob(pattern)})
+    for path in paths:
+        digest.update(path.relative_to(root).as_posix().encode() + b"\0")
+        digest.update(path.read_bytes() + b"\0")
+    for value in extra:
+        digest.update(str(value).encode() + b"\0")
+    return digest.hexdigest()
+
+
+def pinned_block(cmd_settings):
+    """
+    Block the fork in a network's `cmd_settings` is pinned to, from `fork_block` or a `url@block`
+    fork such as the rpc cache's. None when the fork follows the upstream's latest block.
+    """
+    if cmd_settings.get("fork_block") is not None:
+        return int(cmd_settings["fork_block"])
+    block = str(cmd_settings.get("fork", "")).rpartition("@")[2]
+    return int(block) if block.isdigit() else None
+
+
+def fork_point(block):
+    """Chain id and hash of the pinned `block`, a dump only fits a fork from it."""
+    block = web3.eth.get_block(block)
+    return web3.eth.chain_id, block["number"], block["hash"].hex()
+
+
+def can_dump():
+    """Only anvil has the methods to dump and load its state."""
+    return web3.clientVersion.lower().startswith("anvil")
+
+
+def _request(method, params):
+    response = web3.provider.make_request(method, params)
+    if "error" in response:
+        return None
+    return response["result"]
+
+
+class ChainState:
+    """
+    Node state of a prepared chain and the addresses deployed in it, in one file.
+
+    The state comes from `anvil_dumpState` (already gzipped by the node) and is put back with
+    `anvil_loadState` in a single request. Check `can_dump` first, other nodes can't dump or
+    load, so the chain has to be built every session.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self, key):
+        """Restore the chain and return its addresses, None if the file is missing or stale."""
+        if not self.path.exists():
+            return None
+        with open(self.path) as f:
+            data = json.load(f)
+        if data["key"] != key:
+            return None
+        if not _request("anvil_loadState", [data["state"]]):
+            return None
+        return data["addresses"]
+
+    def dump(self, key, addresses):
+        """Write the current chain. False if the node can't dump its state."""
+        state = _request("anvil_dumpState", [])
+        if state is None:
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # xdist workers build the same chain at the same time, the last one to finish wins
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+        with open(temporary, "w") as f:
+            json.dump({"key": key, "addresses": addresses, "state": state}, f)
+        os.replace(temporary, self.path)
+        return True
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+from brownie import web3
+from eth_abi import decode_abi
+from hexbytes import HexBytes
+
+# Same values as the constants in Strategy.sol
+REGIMES = {
+    0: "hold",
+    1: "borrow",
+    2: "repay",
+    3: "deleverage",
+    4: "withdraw",
+    5: "sell",
+}
+CAPS = {
+    1: "supply cap",
+    2: "protocol liquidity",
+    4: "borrow apr",
+    8: "min borrow",
+    16: "max withdrawal",
+}
+
+DECISION_TOPIC = web3.keccak(text="Decision(uint256,uint256)").hex()
+if not DECISION_TOPIC.startswith("0x"):
+    DECISION_TOPIC = "0x" + DECISION_TOPIC
+
+# LTVs and APRs are scaled by 1e18
+SCALE = 10 ** 18
+# Regimes of vault withdrawals, which don't log LTVs
+NO_LTV = ("withdraw", "sell")
+# gas for a LOG1 with two words of data, without memory expansion
+LOG_GAS = 375 + 375 + 8 * 64
+
+
+def _bits(value, offset, size):
+    return (value >> offset) & ((1 << size) - 1)
+
+
+@dataclass
+class Decision:
+    regime: str
+    caps: list
+    # None for withdraw and sell
+    ltv_before: int
+    ltv_after: int
+    # base token borrowed for "borrow", repaid otherwise
+    amount: int
+    borrow_apr: int
+    reward_apr: int
+    strategy: str = None
+    block: int = None
+    txid: str = None
+
+    def explain(self):
+        text = f"{self.regime} {self.amount:,}"
+        if self.ltv_before is not None:
+            text += f" at LTV {self.ltv_before / SCALE:.2%} -> {self.ltv_after / SCALE:.2%}"
+        if self.regime in ("hold", "borrow", "repay", "deleverage"):
+            text += f", borrow APR {self.borrow_apr / SCALE:.2%} vs reward APR {self.reward_apr / SCALE:.2%}"
+        if self.caps:
+            text += f", limited by {', '.join(self.caps)}"
+        return text
+
+
+def decode(action, aprs, **kwargs):
+    """Unpack the two words of a `Decision` event."""
+    action, aprs = int(action), int(aprs)
+    caps = _bits(action, 8, 8)
+    regime = REGIMES.get(_bits(action, 0, 8), "unknown")
+    logged = regime not in NO_LTV
+    return Decision(
+        regime=regime,
+        caps=[name for flag, name in CAPS.items() if caps & flag],
+        ltv_before=_bits(action, 16, 64) if logged else None,
+        ltv_after=_bits(action, 80, 64) if logged else None,
+        amount=_bits(action, 144, 112),
+        borrow_apr=_bits(aprs, 0, 128),
+        reward_apr=_bits(aprs, 128, 128),
+        **kwargs,
+    )
+
+
+def from_tx(tx):
+    """Decisions emitted in a brownie transaction, in order."""
+    if "Decision" not in tx.events:
+        return []
+    return [
+        decode(event["action"], event["aprs"], strategy=event.address, block=tx.block_number, txid=tx.txid)
+        for event in tx.events["Decision"]
+    ]
+
+
+def get_decisions(strategies, from_block, to_block="latest"):
+    """Decisions of `strategies` from raw logs, for indexers that do not have the ABI loaded."""
+    logs = web3.eth.get_logs(
+        {
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": [str(s) for s in strategies],
+            "topics": [DECISION_TOPIC],
+        }
+    )
+    result = []
+    for log in logs:
+        action, aprs = decode_abi(["uint256", "uint256"], HexBytes(log["data"]))
+        result.append(
+            decode(
+                action,
+                aprs,
+                strategy=log["address"],
+                block=log["blockNumber"],
+                txid=log["transactionHash"].hex(),
+            )
+        )
+    return result
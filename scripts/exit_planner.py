@@ -0,0 +1,197 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import click
+from brownie import Strategy, accounts, interface, multicall, network
+from brownie.exceptions import VirtualMachineError
+from brownie.network import rpc
+
+from scripts.fleet import LTV_SCALE, load_strategies, read_health, unwrap
+from scripts.report import print_report
+from scripts.scenario import mark, rewind
+
+# headroom on the estimates for the gas limit of each transaction
+GAS_BUFFER = 1.2
+
+
+@dataclass
+class ExitPlan:
+    strategy: str
+    # warning LTV minus current LTV, scaled by 1e18
+    headroom: int
+    ltv: int
+    assets: int
+    debt: int
+    depositer: int
+    # estimatedTotalAssets without the unsold rewards, in want
+    expected_freed: int
+    exit_gas: int = None
+    harvest_gas: int = None
+    # the depositers ranked before this one, and this one, need more base token than comet holds
+    liquidity_short: bool = False
+    error: str = None
+
+    @property
+    def rank_key(self):
+        # closest to liquidation first, then the largest
+        return (self.headroom, -self.assets)
+
+    def row(self):
+        return {
+            "strategy": self.strategy,
+            "headroom": self.headroom / LTV_SCALE,
+            "ltv": self.ltv / LTV_SCALE,
+            "assets": self.assets,
+            "expected freed": self.expected_freed,
+            "gas": (self.exit_gas or 0) + (self.harvest_gas or 0),
+            "liquidity short": self.liquidity_short,
+            "error": self.error,
+        }
+
+
+def discover(cloner, from_block=0):
+    """Strategies deployed or cloned by a `CompV3LenderBorrowerCloner`."""
+    found = []
+    for event_type in ("Deployed", "Cloned"):
+        for event in cloner.events.get_sequence(from_block, event_type=event_type):
+            found.append(event.args["strategy"])
+    return found
+
+
+def on_comet(comet, strategies):
+    """The strategies that lend and borrow on `comet`, read in one multicall."""
+    strategies = load_strategies(strategies)
+    with multicall():
+        calls = [(strategy, strategy.comet()) for strategy in strategies]
+    return [s for s, c in calls if str(unwrap(c, "")).lower() == str(comet).lower()]
+
+
+def _estimate(function, sender):
+    try:
+        return function.estimate_gas({"from": sender}), None
+    except Exception as e:
+        return None, repr(e)
+
+
+def _estimate_all(functions, sender, workers):
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(lambda f: _estimate(f, sender), functions))
+
+
+def plan(strategies, sender, workers=8):
+    """
+    Rank `strategies`, all on the same comet, for an emergency exit and simulate every exit.
+
+    Balances are read in one multicall. On a local chain every strategy is put in emergency
+    exit, then each `harvest` is estimated with its own `eth_call`, run in parallel. The exits
+    are undone with `chain.undo` before returning, so brownie's history and the test isolation
+    snapshot stay in step with the node. On live networks only `setEmergencyExit` is estimated.
+    """
+    strategies = load_strategies(strategies)
+    healths = {h.strategy: h for h in read_health(strategies)}
+    with multicall():
+        calls = [
+            (
+                strategy,
+                strategy.estimatedTotalAssets(),
+                strategy.rewardsInWant(),
+                strategy.balanceOfDepositer(),
+            )
+            for strategy in strategies
+        ]
+
+    plans = []
+    for strategy, assets, rewards, depositer in calls:
+        health = healths[strategy.address]
+        assets = int(unwrap(assets))
+        plans.append(
+            ExitPlan(
+                strategy=strategy.address,
+                headroom=health.headroom,
+                ltv=health.ltv,
+                assets=assets,
+                debt=health.debt,
+                depositer=int(unwrap(depositer)),
+                expected_freed=max(0, assets - int(unwrap(rewards))),
+            )
+        )
+    plans.sort(key=lambda p: p.rank_key)
+
+    # repaying the debt withdraws from the depositers so they share comet's cash, in exit order
+    if plans:
+        comet = interface.Comet(strategies[0].comet())
+        cash = interface.IERC20(comet.baseToken()).balanceOf(comet)
+        needed = 0
+        for p in plans:
+            needed += min(p.debt, p.depositer)
+            p.liquidity_short = needed > cash
+
+    by_address = {s.address: s for s in strategies}
+    exits = _estimate_all([by_address[p.strategy].setEmergencyExit for p in plans], sender, workers)
+    for p, (gas, error) in zip(plans, exits):
+        p.exit_gas, p.error = gas, error
+
+    if not rpc.is_active():
+        # live networks can't undo, the harvests are estimated when they are sent
+        return plans
+    before = mark()
+    try:
+        for p in plans:
+            if p.error is None:
+                try:
+                    by_address[p.strategy].setEmergencyExit({"from": sender})
+                except VirtualMachineError as e:
+                    p.error = repr(e)
+        harvests = _estimate_all([by_address[p.strategy].harvest for p in plans], sender, workers)
+        for p, (gas, error) in zip(plans, harvests):
+            p.harvest_gas = gas
+            p.error = p.error or error
+    finally:
+        rewind(before)
+    return plans
+
+
+def execute(plans, sender, gas_buffer=GAS_BUFFER):
+    """
+    Send `setEmergencyExit` then `harvest` for every plan without an error, in rank order.
+
+    Nonces are assigned up front so every transaction is broadcast without waiting for the
+    previous one to be mined. Returns [(plan, exit tx, harvest tx)] once all are mined.
+    """
+    nonce = sender.nonce
+    sent = []
+    for p in plans:
+        if p.error is not None:
+            continue
+        strategy = Strategy.at(p.strategy)
+        txs = []
+        for function, gas in ((strategy.setEmergencyExit, p.exit_gas), (strategy.harvest, p.harvest_gas)):
+            params = {"from": sender, "nonce": nonce, "required_confs": 0}
+            if gas is not None:
+                params["gas_limit"] = int(gas * gas_buffer)
+            txs.append(function(params))
+            nonce += 1
+        sent.append((p, *txs))
+
+    for _, *txs in sent:
+        for tx in txs:
+            tx.wait(1)
+    return sent
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    sender = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    comet = click.prompt("Comet")
+    addresses = click.prompt("Strategies (comma separated)").split(",")
+
+    strategies = on_comet(comet, [a.strip() for a in addresses])
+    plans = plan(strategies, sender)
+    print_report(f"Exit plan for {len(plans)} strategies on {comet}", [p.row() for p in plans])
+    if not click.confirm("Send the exits?"):
+        return
+
+    start = time.time()
+    sent = execute(plans, sender)
+    print(f"{len(sent)} strategies exited in {time.time() - start:.0f}s")
@@ -0,0 +1,227 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+from brownie import interface, multicall, network, web3
+
+from scripts.fleet import LTV_SCALE, load_strategies, read_health, read_triggers, read_yield, unwrap
+
+APR_SCALE = 10 ** 18
+
+# name: (type, help)
+METRICS = {
+    "compv3_strategy_ltv": ("gauge", "Current LTV of the strategy"),
+    "compv3_strategy_target_ltv": ("gauge", "LTV the strategy borrows up to"),
+    "compv3_strategy_warning_ltv": ("gauge", "LTV at which the strategy repays debt"),
+    "compv3_strategy_liquidation_ltv": ("gauge", "Liquidate collateral factor of want"),
+    "compv3_strategy_estimated_total_assets": ("gauge", "estimatedTotalAssets in want"),
+    "compv3_strategy_debt": ("gauge", "balanceOfDebt in base token"),
+    "compv3_strategy_depositer_balance": ("gauge", "balanceOfDepositer in base token"),
+    "compv3_strategy_rewards_in_want": ("gauge", "rewardsInWant in want"),
+    "compv3_strategy_net_borrow_apr": ("gauge", "getNetBorrowApr(0)"),
+    "compv3_strategy_net_reward_apr": ("gauge", "getNetRewardApr(0)"),
+    "compv3_strategy_harvest_trigger": ("gauge", "harvestTrigger, 1 if true"),
+    "compv3_strategy_tend_trigger": ("gauge", "tendTrigger, 1 if true"),
+    "compv3_exporter_block": ("gauge", "Block the metrics were read at"),
+    "compv3_exporter_refresh_seconds": ("gauge", "Time the last refresh took"),
+    "compv3_exporter_refreshes_total": ("counter", "Refreshes since start"),
+    "compv3_exporter_scrapes_total": ("counter", "Scrapes served since start"),
+}
+
+
+def format_metrics(samples):
+    """
+    Format {name: [(labels, value), ...]} in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, values in samples.items():
+        kind, description = METRICS[name]
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in values:
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def parse_metrics(text):
+    """Parse the exporter's own output back into {(name, strategy or None): value}."""
+    result = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, value = line.rsplit(" ", 1)
+        name, _, labels = series.partition("{")
+        strategy = None
+        if labels:
+            strategy = dict(
+                label.split("=", 1) for label in labels.rstrip("}").split(",")
+            ).get("strategy", "").strip('"')
+        result[(name, strategy)] = float(value)
+    return result
+
+
+class MetricsExporter:
+    """
+    Serves the health and yield of a set of strategies as Prometheus metrics.
+
+    A single refresh loop reads every strategy in batched multicalls once per new block.
+    Scrapes are served from that cache so any number of scrapers costs no extra node calls.
+    """
+
+    def __init__(self, strategies, call_cost=0, host="127.0.0.1", port=9120, poll_interval=1.0):
+        self.strategies = load_strategies(strategies)
+        self.call_cost = call_cost
+        self.poll_interval = poll_interval
+
+        self.block = None
+        self.refreshes = 0
+        self.scrapes = 0
+        self.refresh_seconds = 0.0
+        self._text = ""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._labels, self._decimals = self._read_static()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _read_static(self):
+        # names and decimals don't change so they are read once
+        with multicall():
+            calls = [
+                (strategy, strategy.name(), strategy.want(), strategy.baseToken())
+                for strategy in self.strategies
+            ]
+        tokens = {unwrap(t) for _, _, want, base in calls for t in (want, base)}
+        with multicall():
+            decimals = {token: interface.IERC20Extended(token).decimals() for token in tokens}
+
+        labels = {}
+        scales = {}
+        for strategy, name, want, base in calls:
+            labels[strategy.address] = {"strategy": strategy.address, "name": unwrap(name, "")}
+            scales[strategy.address] = (
+                10 ** int(decimals[unwrap(want)]),
+                10 ** int(decimals[unwrap(base)]),
+            )
+        return labels, scales
+
+    # ----------------- REFRESH -----------------
+
+    def refresh(self, block=None):
+        """Read every strategy at `block` (default latest) and replace the cached metrics."""
+        block = web3.eth.block_number if block is None else block
+        start = time.perf_counter()
+        healths = read_health(self.strategies, block)
+        triggers = read_triggers(self.strategies, self.call_cost, block)
+        yields = read_yield(self.strategies, block)
+        elapsed = time.perf_counter() - start
+
+        samples = {name: [] for name in METRICS}
+        for health in healths:
+            address = health.strategy
+            labels = self._labels[address]
+            want_scale, base_scale = self._decimals[address]
+            harvest, tend = triggers[address]
+            values = yields[address]
+            for name, value in [
+                ("compv3_strategy_ltv", health.ltv / LTV_SCALE),
+                ("compv3_strategy_target_ltv", health.target_ltv / LTV_SCALE),
+                ("compv3_strategy_warning_ltv", health.warning_ltv / LTV_SCALE),
+                ("compv3_strategy_liquidation_ltv", health.liquidation_ltv / LTV_SCALE),
+                ("compv3_strategy_estimated_total_assets", values["estimatedTotalAssets"] / want_scale),
+                ("compv3_strategy_debt", health.debt / base_scale),
+                ("compv3_strategy_depositer_balance", values["balanceOfDepositer"] / base_scale),
+                ("compv3_strategy_rewards_in_want", values["rewardsInWant"] / want_scale),
+                ("compv3_strategy_net_borrow_apr", values["netBorrowApr"] / APR_SCALE),
+                ("compv3_strategy_net_reward_apr", values["netRewardApr"] / APR_SCALE),
+                ("compv3_strategy_harvest_trigger", int(harvest)),
+                ("compv3_strategy_tend_trigger", int(tend)),
+            ]:
+                samples[name].append((labels, value))
+
+        with self._lock:
+            self.block = block
+            self.refreshes += 1
+            self.refresh_seconds = elapsed
+            samples["compv3_exporter_block"] = [({}, block)]
+            samples["compv3_exporter_refresh_seconds"] = [({}, elapsed)]
+            samples["compv3_exporter_refreshes_total"] = [({}, self.refreshes)]
+            # filled in per scrape
+            samples.pop("compv3_exporter_scrapes_total")
+            self._text = format_metrics(samples)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                block = web3.eth.block_number
+                if block != self.block:
+                    self.refresh(block)
+            except Exception as e:
+                print(f"[exporter] refresh failed: {e!r}")
+            self._stop.wait(self.poll_interval)
+
+    # ----------------- SERVING -----------------
+
+    def render(self):
+        with self._lock:
+            self.scrapes += 1
+            return self._text + format_metrics(
+                {"compv3_exporter_scrapes_total": [({}, self.scrapes)]}
+            )
+
+    def _handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Refresh once, then serve and keep refreshing from background threads."""
+        self.refresh()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    addresses = click.prompt("Strategies (comma separated)").split(",")
+    port = click.prompt("Port", default=9120, type=int)
+
+    exporter = MetricsExporter([a.strip() for a in addresses], port=port)
+    exporter.start()
+    print(f"Serving {len(exporter.strategies)} strategies on {exporter.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        exporter.stop()
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+
+from brownie import Strategy, multicall
+
+MAX_BPS = 10_000
+# LTV numbers and collateral factors are scaled by 1e18
+LTV_SCALE = 10 ** 18
+
+
+@dataclass
+class Health:
+    strategy: str
+    block: int
+    collateral: int
+    debt: int
+    ltv: int
+    liquidation_ltv: int
+    target_ltv: int
+    warning_ltv: int
+
+    @property
+    def headroom(self):
+        """Distance to the warning LTV, negative once over it."""
+        return self.warning_ltv - self.ltv
+
+    @property
+    def liquidation_headroom(self):
+        return self.liquidation_ltv - self.ltv
+
+
+def unwrap(result, default=0):
+    # multicall results are lazy proxies that wrap None when the call reverted
+    value = getattr(result, "__wrapped__", result)
+    return default if value is None else value
+
+
+def load_strategies(addresses):
+    return [a if hasattr(a, "harvestTrigger") else Strategy.at(a) for a in addresses]
+
+
+def read_health(strategies, block_identifier=None):
+    """
+    Read the LTV numbers of every strategy in a single multicall.
+    Reverting calls come back as 0.
+    """
+    with multicall(block_identifier=block_identifier):
+        calls = [
+            (
+                strategy,
+                strategy.balanceOfCollateral(),
+                strategy.balanceOfDebt(),
+                strategy.getCurrentLTV(),
+                strategy.getLiquidateCollateralFactor(),
+                strategy.targetLTVMultiplier(),
+                strategy.warningLTVMultiplier(),
+            )
+            for strategy in strategies
+        ]
+
+    block = block_identifier if isinstance(block_identifier, int) else None
+    result = []
+    for strategy, collateral, debt, ltv, lcf, target, warning in calls:
+        lcf = int(unwrap(lcf))
+        result.append(
+            Health(
+                strategy=strategy.address,
+                block=block,
+                collateral=int(unwrap(collateral)),
+                debt=int(unwrap(debt)),
+                ltv=int(unwrap(ltv)),
+                liquidation_ltv=lcf,
+                target_ltv=lcf * int(unwrap(target)) // MAX_BPS,
+                warning_ltv=lcf * int(unwrap(warning)) // MAX_BPS,
+            )
+        )
+    return result
+
+
+def read_triggers(strategies, call_cost=0, block_identifier=None):
+    """
+    Returns {address: (harvestTrigger, tendTrigger)} read in a single multicall.
+    A reverting trigger is reported as False.
+    """
+    with multicall(block_identifier=block_identifier):
+        calls = [
+            (strategy, strategy.harvestTrigger(call_cost), strategy.tendTrigger(call_cost))
+            for strategy in strategies
+        ]
+    return {
+        strategy.address: (bool(unwrap(harvest, False)), bool(unwrap(tend, False)))
+        for strategy, harvest, tend in calls
+    }
+
+
+def read_yield(strategies, block_identifier=None):
+    """
+    Returns {address: {...}} with the assets, balances and APRs of every strategy
+    read in a single multicall. Reverting calls are reported as 0.
+    """
+    with multicall(block_identifier=block_identifier):
+        calls = [
+            (
+                strategy,
+                strategy.estimatedTotalAssets(),
+                strategy.balanceOfDepositer(),
+                strategy.rewardsInWant(),
+                strategy.getNetBorrowApr(0),
+                strategy.getNetRewardApr(0),
+            )
+            for strategy in strategies
+        ]
+    return {
+        strategy.address: {
+            "estimatedTotalAssets": int(unwrap(assets)),
+            "balanceOfDepositer": int(unwrap(depositer)),
+            "rewardsInWant": int(unwrap(rewards)),
+            "netBorrowApr": int(unwrap(borrow_apr)),
+            "netRewardApr": int(unwrap(reward_apr)),
+        }
+        for strategy, assets, depositer, rewards, borrow_apr, reward_apr in calls
+    }
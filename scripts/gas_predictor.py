@@ -0,0 +1,391 @@
+import json
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from brownie import Contract, Depositer, chain, interface, multicall, web3
+
+from scripts.decisions import from_tx
+from scripts.fleet import MAX_BPS, load_strategies, unwrap
+
+COMP = "0xc00e94Cb662C3520282E6f5717214004A7f26888"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+STRATEGY_PARAMS = [
+    "performanceFee",
+    "activation",
+    "debtRatio",
+    "minDebtPerHarvest",
+    "maxDebtPerHarvest",
+    "lastReport",
+    "totalDebt",
+    "totalGain",
+    "totalLoss",
+]
+# The vault views the prediction needs
+VAULT_ABI = [
+    {
+        "name": "strategies",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "strategy", "type": "address"}],
+        "outputs": [{"name": name, "type": "uint256"} for name in STRATEGY_PARAMS],
+    },
+] + [
+    {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [{"name": "strategy", "type": "address"}],
+        "outputs": [{"name": "", "type": "uint256"}],
+    }
+    for name in ["debtOutstanding", "creditAvailable"]
+]
+
+# The branches a harvest or tend can take, each a column of the cost table.
+# "swaps" counts uniswap pools traded through, the rest are 0 or 1
+FEATURES = ["harvest", "tend", "supply", "withdraw", "borrow", "repay", "swaps"]
+
+
+def _topic(signature):
+    topic = web3.keccak(text=signature).hex()
+    return topic if topic.startswith("0x") else "0x" + topic
+
+
+SWAP_TOPIC = _topic("Swap(address,address,int256,int256,uint160,uint128,int24)")
+SUPPLY_COLLATERAL_TOPIC = _topic("SupplyCollateral(address,address,address,uint256)")
+WITHDRAW_COLLATERAL_TOPIC = _topic("WithdrawCollateral(address,address,address,uint256)")
+
+
+@dataclass
+class Snapshot:
+    """What decides which branches a harvest or tend runs. LTVs and APRs scaled by 1e18."""
+
+    strategy: str
+    want: str
+    base_token: str
+    want_balance: int
+    collateral: int
+    debt: int
+    depositer: int
+    base_balance: int
+    ltv: int
+    target_ltv: int
+    warning_ltv: int
+    idle_buffer_bps: int
+    borrow_apr: int
+    reward_apr: int
+    # claimed and owed COMP
+    comp: int
+    min_to_sell: int
+    rewards_in_want: int
+    trade_factory: bool
+    emergency_exit: bool
+    total_debt: int
+    debt_outstanding: int
+    credit_available: int
+
+    @property
+    def base_owed(self):
+        return max(0, self.debt - self.depositer - self.base_balance)
+
+
+def read_snapshots(strategies, block_identifier=None):
+    """Snapshots of every strategy in two multicalls."""
+    strategies = load_strategies(strategies)
+    with multicall(block_identifier=block_identifier):
+        first = [
+            (
+                strategy,
+                strategy.vault(),
+                strategy.want(),
+                strategy.baseToken(),
+                strategy.depositer(),
+                strategy.getLiquidateCollateralFactor(),
+                strategy.targetLTVMultiplier(),
+                strategy.warningLTVMultiplier(),
+            )
+            for strategy in strategies
+        ]
+
+    with multicall(block_identifier=block_identifier):
+        calls = []
+        for strategy, vault, want, base, depositer, lcf, target, warning in first:
+            vault = Contract.from_abi("Vault", str(unwrap(vault)), VAULT_ABI)
+            depositer = Depositer.at(unwrap(depositer))
+            lcf = int(unwrap(lcf))
+            calls.append(
+                (
+                    strategy,
+                    str(unwrap(want)),
+                    str(unwrap(base)),
+                    lcf * int(unwrap(target)) // MAX_BPS,
+                    lcf * int(unwrap(warning)) // MAX_BPS,
+                    [
+                        strategy.balanceOfWant(),
+                        strategy.balanceOfCollateral(),
+                        strategy.balanceOfDebt(),
+                        strategy.balanceOfDepositer(),
+                        strategy.balanceOfBaseToken(),
+                        strategy.getCurrentLTV(),
+                        strategy.idleBufferBps(),
+                        strategy.getNetBorrowApr(0),
+                        strategy.getNetRewardApr(0),
+                        interface.IERC20(COMP).balanceOf(strategy),
+                        depositer.getRewardsOwedFor(strategy),
+                        strategy.minToSell(),
+                        strategy.rewardsInWant(),
+                        strategy.tradeFactory(),
+                        strategy.emergencyExit(),
+                        vault.strategies(strategy),
+                        vault.debtOutstanding(strategy),
+                        vault.creditAvailable(strategy),
+                    ],
+                )
+            )
+
+    snapshots = []
+    for strategy, want, base, target, warning, values in calls:
+        (
+            want_balance, collateral, debt, depositer, base_balance, ltv, buffer, borrow_apr,
+            reward_apr, comp_balance, comp_owed, min_to_sell, rewards, trade_factory, emergency,
+            params, outstanding, credit,
+        ) = [unwrap(v) for v in values]
+        snapshots.append(
+            Snapshot(
+                strategy=strategy.address,
+                want=want,
+                base_token=base,
+                want_balance=int(want_balance),
+                collateral=int(collateral),
+                debt=int(debt),
+                depositer=int(depositer),
+                base_balance=int(base_balance),
+                ltv=int(ltv),
+                target_ltv=target,
+                warning_ltv=warning,
+                idle_buffer_bps=int(buffer),
+                borrow_apr=int(borrow_apr),
+                reward_apr=int(reward_apr),
+                comp=int(comp_balance) + int(comp_owed),
+                min_to_sell=int(min_to_sell),
+                rewards_in_want=int(rewards),
+                trade_factory=int(str(unwrap(trade_factory, "0x0")), 16) != 0,
+                emergency_exit=bool(emergency),
+                total_debt=int(params[STRATEGY_PARAMS.index("totalDebt")]) if params else 0,
+                debt_outstanding=int(outstanding),
+                credit_available=int(credit),
+            )
+        )
+    return snapshots
+
+
+def _hops(token):
+    # COMP is sold through WETH unless it is sold for WETH
+    return 1 if token.lower() == WETH.lower() else 2
+
+
+def branches(snapshot, action):
+    """
+    The features of the `action` ("harvest" or "tend") that would run now, following
+    prepareReturn, liquidatePosition and adjustPosition in Strategy.sol.
+    Balances after each step are approximated, so branches near a threshold can be missed.
+    """
+    s = snapshot
+    features = dict.fromkeys(FEATURES, 0)
+    features[action] = 1
+    want, collateral, debt, ltv = s.want_balance, s.collateral, s.debt, s.ltv
+    debt_outstanding = 0
+
+    if action == "harvest":
+        debt_outstanding = s.debt_outstanding
+        if s.emergency_exit:
+            # liquidateAllPositions
+            features["repay"] = int(debt > 0)
+            features["withdraw"] = int(collateral > 0)
+            # and the vault takes all of it
+            want, collateral, debt, ltv = 0, 0, 0, 0
+        else:
+            if s.comp > s.min_to_sell:
+                # base token owed is covered even with a trade factory, it sells the rest
+                if s.base_owed > 0:
+                    features["swaps"] += _hops(s.base_token)
+                if not s.trade_factory:
+                    features["swaps"] += _hops(s.want)
+                    # rewardsInWant under reports by 10%
+                    want += s.rewards_in_want * MAX_BPS // 9_000
+            profit = max(0, want + collateral - s.total_debt)
+            needed = s.debt_outstanding + profit
+            if needed > want and collateral > 0:
+                freed = min(needed - want, collateral)
+                features["repay"] = int(debt > 0)
+                features["withdraw"] = 1
+                # repaid to keep the LTV where it was
+                debt -= debt * freed // collateral
+                collateral -= freed
+                want += freed
+            # the vault takes the profit and debt payment and sends any credit
+            want = max(0, want - needed) + s.credit_available
+
+    if s.borrow_apr > s.reward_apr:
+        # deleverage: everything is liquidated
+        features["repay"] |= int(debt > 0)
+        features["withdraw"] |= int(collateral > 0)
+        return features
+
+    buffer = (want + collateral) * s.idle_buffer_bps // MAX_BPS
+    if want > debt_outstanding + buffer:
+        features["supply"] = 1
+        added = want - debt_outstanding - buffer
+        ltv = ltv * collateral // (collateral + added) if collateral else 0
+        collateral += added
+    elif want < buffer and collateral > 0:
+        features["withdraw"] = 1
+
+    if collateral == 0:
+        return features
+    if s.target_ltv > ltv:
+        features["borrow"] = 1
+    elif ltv > s.warning_ltv:
+        features["repay"] = 1
+    return features
+
+
+def observed(tx):
+    """The features a sent harvest or tend actually ran, from its logs and Decision events."""
+    features = dict.fromkeys(FEATURES, 0)
+    features[tx.fn_name] = 1
+    for log in tx.logs:
+        topic = log["topics"][0].hex() if log["topics"] else ""
+        topic = topic if topic.startswith("0x") else "0x" + topic
+        if topic == SWAP_TOPIC:
+            features["swaps"] += 1
+        elif topic == SUPPLY_COLLATERAL_TOPIC:
+            features["supply"] = 1
+        elif topic == WITHDRAW_COLLATERAL_TOPIC:
+            features["withdraw"] = 1
+    for decision in from_tx(tx):
+        if decision.amount == 0:
+            continue
+        if decision.regime == "borrow":
+            features["borrow"] = 1
+        else:
+            features["repay"] = 1
+    return features
+
+
+def _vector(features):
+    return np.array([features[name] for name in FEATURES], dtype=np.float64)
+
+
+@dataclass
+class Sample:
+    strategy: str
+    action: str
+    predicted: dict
+    observed: dict
+    gas_used: int
+
+
+@dataclass
+class GasModel:
+    """Gas per branch. A prediction is the sum over the branches that run."""
+
+    costs: dict
+
+    @classmethod
+    def fit(cls, samples):
+        """Least squares over the branches the samples actually ran."""
+        features = np.array([_vector(s.observed) for s in samples])
+        gas = np.array([s.gas_used for s in samples], dtype=np.float64)
+        costs, *_ = np.linalg.lstsq(features, gas, rcond=None)
+        return cls(dict(zip(FEATURES, (round(float(c)) for c in costs))))
+
+    def gas(self, features):
+        return max(0, round(float(_vector(features) @ _vector(self.costs))))
+
+    def predict(self, snapshot, action):
+        return self.gas(branches(snapshot, action))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+def predict_many(strategies, model, block_identifier=None):
+    """{address: {"harvest": gas, "tend": gas}} for every strategy, without estimating."""
+    return {
+        s.strategy: {action: model.predict(s, action) for action in ("harvest", "tend")}
+        for s in read_snapshots(strategies, block_identifier)
+    }
+
+
+def record(strategy, action, sender):
+    """Snapshot, send `action` and keep what was predicted, what ran and the gas used."""
+    (snapshot,) = read_snapshots([strategy])
+    tx = getattr(strategy, action)({"from": sender})
+    return Sample(strategy.address, action, branches(snapshot, action), observed(tx), tx.gas_used)
+
+
+def calibrate(vault, strategy, whale, gov, amount, rounds=2):
+    """
+    Walk one strategy on a local chain through the branches and return the samples:
+    deposit and borrow, hold, repay over the warning LTV, sell rewards and withdraw
+    collateral when the vault takes funds back.
+    """
+    want = interface.IERC20(vault.token())
+    want.approve(vault, 2 ** 256 - 1, {"from": whale})
+    target, warning = strategy.targetLTVMultiplier(), strategy.warningLTVMultiplier()
+    params = lambda t, w: (t, w, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    debt_ratio = vault.strategies(strategy)["debtRatio"]
+    samples = []
+    for _ in range(rounds):
+        vault.deposit(amount // rounds, {"from": whale})
+        chain.sleep(1)
+        samples.append(record(strategy, "harvest", gov))
+        samples.append(record(strategy, "tend", gov))
+
+        # lower the warning under the current LTV so the tend repays
+        strategy.setStrategyParams(*params(target // 2, target // 2 + 1))
+        samples.append(record(strategy, "tend", gov))
+        strategy.setStrategyParams(*params(target, warning))
+        samples.append(record(strategy, "tend", gov))
+
+        chain.sleep(24 * 60 * 60)
+        chain.mine(1)
+        samples.append(record(strategy, "harvest", gov))
+
+        # the vault takes part of the debt back
+        vault.updateStrategyDebtRatio(strategy, debt_ratio // 2, {"from": gov})
+        chain.sleep(1)
+        samples.append(record(strategy, "harvest", gov))
+        vault.updateStrategyDebtRatio(strategy, debt_ratio, {"from": gov})
+    return samples
+
+
+def accuracy(model, samples):
+    """
+    Rows for `print_report` per action: the error of the cost table on the branches that ran,
+    and of the full prediction from the snapshot, as percentages of the gas used.
+    """
+    rows = []
+    for action in sorted({s.action for s in samples}):
+        chosen = [s for s in samples if s.action == action]
+        used = np.array([s.gas_used for s in chosen], dtype=np.float64)
+        table = np.abs(np.array([model.gas(s.observed) for s in chosen]) - used) / used
+        full = np.abs(np.array([model.gas(s.predicted) for s in chosen]) - used) / used
+        rows.append(
+            {
+                "action": action,
+                "samples": len(chosen),
+                "branches right": float(np.mean([s.predicted == s.observed for s in chosen])),
+                "table error mean": float(table.mean()),
+                "table error max": float(table.max()),
+                "prediction error mean": float(full.mean()),
+                "prediction error max": float(full.max()),
+            }
+        )
+    return rows
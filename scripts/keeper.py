@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import threading
+import time
+
+import click
+from brownie import accounts, network, web3
+
+from scripts.fleet import LTV_SCALE, load_strategies, read_health, read_triggers
+
+
+def next_check_delay(health, min_blocks, max_blocks):
+    """
+    Blocks to wait before looking at a strategy again.
+    Positions at or below target LTV are checked every `max_blocks`, the delay then
+    shrinks linearly as the LTV moves from target to warning and is `min_blocks` past it.
+    """
+    if health.collateral == 0 or health.ltv <= health.target_ltv:
+        return max_blocks
+    if health.ltv >= health.warning_ltv:
+        return min_blocks
+
+    progress = (health.ltv - health.target_ltv) / (health.warning_ltv - health.target_ltv)
+    return max(min_blocks, round(max_blocks - (max_blocks - min_blocks) * progress))
+
+
+class Keeper:
+    """
+    Watches a set of strategies from one process.
+
+    Every new block the strategies that are due get their LTV and triggers read in one
+    multicall. Work is queued for a bounded pool of workers that send the transactions,
+    and each strategy is rescheduled based on how close it is to its warning LTV.
+    """
+
+    def __init__(
+        self,
+        strategies,
+        account,
+        call_cost=0,
+        min_blocks=1,
+        max_blocks=100,
+        workers=4,
+        poll_interval=1.0,
+    ):
+        self.strategies = {s.address: s for s in load_strategies(strategies)}
+        self.account = account
+        self.call_cost = call_cost
+        self.min_blocks = min_blocks
+        self.max_blocks = max_blocks
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self.health = {}
+        self.sent = []
+        self.failed = []
+        self.checks = 0
+
+        self._schedule = []
+        self._in_flight = set()
+        self._queue = None
+        # brownie accounts are not safe to broadcast from several threads at once
+        self._send_lock = threading.Lock()
+
+    def _log(self, message):
+        print(f"[keeper] {message}")
+
+    def schedule(self, address, block):
+        heapq.heappush(self._schedule, (block, address))
+
+    def due(self, block):
+        due = set()
+        while self._schedule and self._schedule[0][0] <= block:
+            due.add(heapq.heappop(self._schedule)[1])
+        # strategies with a transaction in flight are rescheduled by the worker
+        return [self.strategies[a] for a in due if a not in self._in_flight]
+
+    async def follow_blocks(self, stop_block=None):
+        """Yield every new block number, polling a block filter for new headers."""
+        loop = asyncio.get_running_loop()
+        last = await loop.run_in_executor(None, lambda: web3.eth.block_number)
+        yield last
+        try:
+            block_filter = web3.eth.filter("latest")
+        except ValueError:
+            block_filter = None
+
+        while stop_block is None or last < stop_block:
+            await asyncio.sleep(self.poll_interval)
+            if block_filter is not None:
+                new = await loop.run_in_executor(None, block_filter.get_new_entries)
+                if not new:
+                    continue
+            current = await loop.run_in_executor(None, lambda: web3.eth.block_number)
+            for block in range(last + 1, current + 1):
+                yield block
+            last = max(last, current)
+
+    async def check(self, block):
+        strategies = self.due(block)
+        if not strategies:
+            return
+
+        loop = asyncio.get_running_loop()
+        healths, triggers = await loop.run_in_executor(
+            None,
+            lambda: (
+                read_health(strategies, block),
+                read_triggers(strategies, self.call_cost, block),
+            ),
+        )
+        self.checks += len(strategies)
+
+        for health in healths:
+            address = health.strategy
+            self.health[address] = health
+            harvest, tend = triggers[address]
+            if harvest or tend:
+                self._in_flight.add(address)
+                await self._queue.put((address, "harvest" if harvest else "tend"))
+            else:
+                self.schedule(address, block + next_check_delay(health, self.min_blocks, self.max_blocks))
+
+    def _send(self, address, action):
+        with self._send_lock:
+            tx = getattr(self.strategies[address], action)(
+                {"from": self.account, "required_confs": 0}
+            )
+        tx.wait(1)
+        return tx
+
+    async def worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            address, action = await self._queue.get()
+            try:
+                tx = await loop.run_in_executor(None, self._send, address, action)
+                self.sent.append((address, action, tx.txid))
+                self._log(f"{action} {address} in block {tx.block_number}")
+            except Exception as e:
+                self.failed.append((address, action, repr(e)))
+                self._log(f"{action} {address} failed: {e!r}")
+            finally:
+                self._in_flight.discard(address)
+                # look again on the next block now that the position changed
+                self.schedule(address, web3.eth.block_number + self.min_blocks)
+                self._queue.task_done()
+
+    async def run(self, stop_block=None):
+        self._queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+        started = False
+        try:
+            async for block in self.follow_blocks(stop_block):
+                if not started:
+                    for address in self.strategies:
+                        self.schedule(address, block)
+                    started = True
+                await self.check(block)
+            await self._queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def headroom_report(self):
+        return {
+            address: health.headroom / LTV_SCALE for address, health in self.health.items()
+        }
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    keeper = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    addresses = click.prompt("Strategies (comma separated)").split(",")
+    workers = click.prompt("Workers", default=4, type=int)
+
+    daemon = Keeper([a.strip() for a in addresses], keeper, workers=workers)
+    start = time.time()
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        pass
+    print(f"Ran {time.time() - start:.0f}s, {daemon.checks} checks, {len(daemon.sent)} txs")
@@ -0,0 +1,267 @@
+import time
+from dataclasses import dataclass
+
+import click
+import numpy as np
+from brownie import Strategy, accounts, chain, interface, network, web3
+from brownie.exceptions import VirtualMachineError
+
+from scripts.fleet import LTV_SCALE, MAX_BPS, read_health
+from scripts.report import print_report
+from scripts.scenario import DAY, Deposit, Harvest, Tend, Withdraw
+
+HOUR = 60 * 60
+# ETH each load test user gets for gas
+USER_ETH = 10 ** 18
+
+
+@dataclass
+class LoadProfile:
+    """
+    Arrival process of a load test. Deposits and withdrawals arrive as independent Poisson
+    processes over all users, the keeper harvests every `harvest_interval` and checks the
+    tend trigger every `tend_interval`.
+    """
+
+    users: int = 200
+    days: float = 7
+    # arrivals per hour over all users
+    deposits_per_hour: float = 10
+    withdrawals_per_hour: float = 5
+    # deposit sizes are lognormal with mean `deposit_size` want wei
+    deposit_size: int = 10 ** 18
+    deposit_sigma: float = 1.0
+    # share of withdrawals that exit fully, the others take a uniform part of the user's shares
+    full_exit: float = 0.2
+    harvest_interval: int = DAY
+    tend_interval: int = HOUR
+    # maxLoss of every vault withdrawal, in bps
+    max_loss: int = 1
+    seed: int = 0
+
+    def schedule(self):
+        """
+        (seconds since start, user index, step) of every arrival in time order. Withdrawals
+        have no user, they are made by a random user holding shares when they arrive.
+        """
+        rng = np.random.default_rng(self.seed)
+        duration = int(self.days * DAY)
+        events = []
+
+        count = rng.poisson(self.deposits_per_hour * duration / HOUR)
+        sizes = self.deposit_size * np.exp(
+            self.deposit_sigma * rng.standard_normal(count) - self.deposit_sigma ** 2 / 2
+        )
+        for at, user, size in zip(rng.uniform(0, duration, count), rng.integers(0, self.users, count), sizes):
+            events.append((int(at), int(user), Deposit(max(int(size), 1))))
+
+        count = rng.poisson(self.withdrawals_per_hour * duration / HOUR)
+        bps = np.where(rng.random(count) < self.full_exit, MAX_BPS, rng.integers(1, MAX_BPS + 1, count))
+        for at, part in zip(rng.uniform(0, duration, count), bps):
+            events.append((int(at), None, Withdraw(int(part))))
+
+        events += [(at, None, Harvest()) for at in range(self.harvest_interval, duration + 1, self.harvest_interval)]
+        events += [
+            (at, None, Tend())
+            for at in range(self.tend_interval, duration + 1, self.tend_interval)
+            if at % self.harvest_interval
+        ]
+        # stable, so arrivals at the same second keep the order they were drawn in
+        return sorted(events, key=lambda event: event[0])
+
+
+class LoadTest:
+    """
+    Replays a `LoadProfile` against a vault and its strategy on the local chain, with
+    `profile.users` fresh local accounts funded from `whale`.
+
+    Arrivals run one transaction each in time order, so arrivals at the same second land in
+    consecutive blocks. Idle time between them is a single `chain.sleep`. Every operation is
+    recorded with its gas and the strategy's LTV right after it.
+    """
+
+    def __init__(self, vault, strategy, token, whale, keeper, profile, eth_funder=None):
+        self.vault = vault
+        self.strategy = strategy
+        self.token = token
+        self.whale = whale
+        self.keeper = keeper
+        self.profile = profile
+        self.eth_funder = eth_funder or accounts[0]
+
+        self.events = profile.schedule()
+        self.users = []
+        # users holding vault shares, so a withdrawal doesn't have to look through all of them
+        self.holders = []
+        self.records = []
+        self.elapsed = 0.0
+        self._rng = np.random.default_rng(profile.seed + 1)
+
+    def create_users(self):
+        """Create the accounts and give each the ETH and want for all its deposits."""
+        needed = [0] * self.profile.users
+        for _, user, step in self.events:
+            if isinstance(step, Deposit):
+                needed[user] += step.amount
+        if sum(needed) > self.token.balanceOf(self.whale):
+            raise ValueError(f"{self.whale} holds less than the {sum(needed)} the deposits need")
+
+        self.users = [accounts.add() for _ in range(self.profile.users)]
+        for user, amount in zip(self.users, needed):
+            self.eth_funder.transfer(user, USER_ETH)
+            if amount > 0:
+                self.token.transfer(user, amount, {"from": self.whale})
+                self.token.approve(self.vault, 2 ** 256 - 1, {"from": user})
+        return self.users
+
+    # ----------------- OPERATIONS -----------------
+
+    def _send(self, method, *args):
+        try:
+            tx = method(*args)
+        except VirtualMachineError:
+            return None
+        return tx
+
+    def _deposit(self, user, step):
+        tx = self._send(self.vault.deposit, step.amount, {"from": user})
+        if tx and user not in self.holders:
+            self.holders.append(user)
+        return {"requested": step.amount, "received": step.amount if tx else 0}, tx
+
+    def _withdraw(self, step):
+        if not self.holders:
+            return None, None
+        user = self.holders[self._rng.integers(len(self.holders))]
+        balance = self.vault.balanceOf(user)
+        shares = max(balance * step.bps // MAX_BPS, 1)
+        requested = shares * self.vault.pricePerShare() // 10 ** self.vault.decimals()
+        # more than the vault holds has to come out of the strategy through liquidatePosition
+        from_strategy = requested > self.token.balanceOf(self.vault)
+
+        before = self.token.balanceOf(user)
+        tx = self._send(self.vault.withdraw, shares, user, self.profile.max_loss, {"from": user})
+        left = self.vault.balanceOf(user)
+        if left == 0:
+            self.holders.remove(user)
+        return {
+            "requested": requested,
+            "received": self.token.balanceOf(user) - before,
+            "from strategy": from_strategy,
+            # the vault burns only the shares it could pay out
+            "served": tx is not None and balance - left == shares,
+        }, tx
+
+    def _keeper(self, step):
+        if isinstance(step, Harvest):
+            return {}, self._send(self.strategy.harvest, {"from": self.keeper})
+        if not self.strategy.tendTrigger(0):
+            return None, None
+        return {}, self._send(self.strategy.tend, {"from": self.keeper})
+
+    def apply(self, user, step):
+        """Run one arrival, None when there was nothing to do."""
+        if isinstance(step, Deposit):
+            record, tx = self._deposit(self.users[user], step)
+        elif isinstance(step, Withdraw):
+            record, tx = self._withdraw(step)
+        else:
+            record, tx = self._keeper(step)
+        if record is None:
+            return None
+        record["operation"] = type(step).__name__
+        record["ok"] = tx is not None
+        record["gas"] = tx.gas_used if tx else None
+        return record
+
+    # ----------------- RUNNING -----------------
+
+    def run(self):
+        if not self.users:
+            self.create_users()
+        started = time.time()
+        start = web3.eth.get_block("latest")["timestamp"]
+        for at, user, step in self.events:
+            # the next block is mined by the operation's own transaction
+            delta = start + at - web3.eth.get_block("latest")["timestamp"]
+            if delta > 0:
+                chain.sleep(delta)
+            record = self.apply(user, step)
+            if record is None:
+                continue
+            health = read_health([self.strategy])[0]
+            record["at"] = at
+            record["ltv drift"] = (health.ltv - health.target_ltv) / LTV_SCALE if health.collateral else None
+            self.records.append(record)
+        self.elapsed = time.time() - started
+        return self.records
+
+    # ----------------- REPORT -----------------
+
+    def operation_rows(self):
+        rows = []
+        for operation in ["Deposit", "Withdraw", "Harvest", "Tend"]:
+            records = [r for r in self.records if r["operation"] == operation]
+            if not records:
+                continue
+            gas = np.array([r["gas"] for r in records if r["ok"]] or [0])
+            rows.append(
+                {
+                    "operation": operation,
+                    "count": len(records),
+                    "reverted": sum(not r["ok"] for r in records),
+                    "mean gas": int(gas.mean()),
+                    "p50 gas": int(np.percentile(gas, 50)),
+                    "p95 gas": int(np.percentile(gas, 95)),
+                    "max gas": int(gas.max()),
+                }
+            )
+        return rows
+
+    def summary(self):
+        scale = 10 ** self.token.decimals()
+        withdrawals = [r for r in self.records if r["operation"] == "Withdraw"]
+        drift = np.array([r["ltv drift"] for r in self.records if r["ltv drift"] is not None] or [0.0])
+        gas = sum(r["gas"] or 0 for r in self.records)
+        return {
+            "operations": len(self.records),
+            "withdrawals from strategy": sum(r["from strategy"] for r in withdrawals),
+            "not fully served": sum(not r["served"] for r in withdrawals),
+            "shortfall": sum(max(r["requested"] - r["received"], 0) for r in withdrawals) / scale,
+            "mean ltv drift": float(drift.mean()),
+            "max ltv drift": float(drift[np.abs(drift).argmax()]),
+            "gas per day": int(gas / self.profile.days),
+            "seconds": self.elapsed,
+            "operations per second": len(self.records) / self.elapsed if self.elapsed else 0.0,
+        }
+
+    def report(self, csv_path=None):
+        print_report(
+            f"Load test, {self.profile.users} users over {self.profile.days} days",
+            self.operation_rows(),
+            csv_path=csv_path,
+        )
+        print_report("Load test summary", [self.summary()])
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    if not network.show_active().endswith("fork"):
+        raise click.ClickException("the load test impersonates the whale and keeper, run it on a fork")
+    strategy = Strategy.at(click.prompt("Strategy"))
+    vault = interface.VaultAPI(strategy.vault())
+    token = interface.IERC20Extended(strategy.want())
+    whale = accounts.at(click.prompt("Want holder to fund the users from"), force=True)
+    decimals = token.decimals()
+    profile = LoadProfile(
+        users=click.prompt("Users", default=200, type=int),
+        days=click.prompt("Days", default=7.0, type=float),
+        deposits_per_hour=click.prompt("Deposits per hour", default=10.0, type=float),
+        withdrawals_per_hour=click.prompt("Withdrawals per hour", default=5.0, type=float),
+        deposit_size=int(click.prompt("Mean deposit", default=1.0, type=float) * 10 ** decimals),
+    )
+
+    test = LoadTest(vault, strategy, token, whale, accounts.at(strategy.keeper(), force=True), profile)
+    test.create_users()
+    test.run()
+    test.report()
@@ -0,0 +1,298 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing import shared_memory
+
+import click
+import numpy as np
+from brownie import Strategy, interface, network
+
+from scripts.report import print_report
+from scripts.tend_sim import APR_SCALE, HOUR, YEAR, Position
+
+MAX_BPS = 10_000
+GWEI = 10 ** 9
+
+
+@dataclass
+class Market:
+    """The comet market and costs the paths are simulated for. USD values, APRs as fractions."""
+
+    collateral_usd: float = 1_000_000
+    liquidation_ltv: float = 0.825
+    # penalty paid on the collateral when absorbed
+    liquidation_penalty: float = 0.07
+    volatility: float = 0.6
+    # rate model, the same shape as comet's per second rates but annualized
+    borrow_base: float = 0.015
+    borrow_slope_low: float = 0.035
+    borrow_slope_high: float = 2.4
+    kink: float = 0.8
+    reserve_factor: float = 0.1
+    # COMP rewards on supplying and borrowing the debt amount
+    reward_apr: float = 0.04
+    utilization_mean: float = 0.75
+    utilization_volatility: float = 0.3
+    # mean reversion speed per year
+    utilization_reversion: float = 50.0
+    gas_mean_gwei: float = 25
+    gas_volatility: float = 4.0
+    gas_reversion: float = 100.0
+    # the base fee oracle's limit, which gates re-levering and harvests
+    acceptable_gas_gwei: float = 40
+    tend_gas: int = 700_000
+    harvest_gas: int = 1_200_000
+    # extra gas when a harvest sells COMP
+    sell_gas: int = 180_000
+    harvest_interval: int = 7 * 24 * HOUR
+    eth_usd: float = 1_800
+
+    @classmethod
+    def from_strategy(cls, strategy, **kwargs):
+        """Read the position, rewards and comet's borrow rate model from a deployed strategy."""
+        position = Position.from_strategy(strategy)
+        comet = interface.Comet(strategy.comet())
+        per_year = YEAR / APR_SCALE
+        return cls(
+            collateral_usd=position.collateral_usd,
+            liquidation_ltv=position.liquidation_ltv,
+            borrow_base=comet.borrowPerSecondInterestRateBase() * per_year,
+            borrow_slope_low=comet.borrowPerSecondInterestRateSlopeLow() * per_year,
+            borrow_slope_high=comet.borrowPerSecondInterestRateSlopeHigh() * per_year,
+            kink=comet.borrowKink() / APR_SCALE,
+            utilization_mean=comet.getUtilization() / APR_SCALE,
+            reward_apr=position.reward_apr,
+            **kwargs,
+        )
+
+
+@dataclass(frozen=True)
+class Candidate:
+    target_multiplier: int
+    warning_multiplier: int
+    # USD, converted to COMP by `strategy_params`
+    min_to_sell: float
+    max_gas_gwei: float
+
+    def strategy_params(self, comp_usd, leave_debt_behind=False):
+        """Arguments for `setStrategyParams`."""
+        return (
+            self.target_multiplier,
+            self.warning_multiplier,
+            int(self.min_to_sell / comp_usd * 10 ** 18),
+            leave_debt_behind,
+            int(self.max_gas_gwei * GWEI),
+        )
+
+
+def _ou(rng, shape, mean, volatility, reversion, dt, start):
+    # mean reverting in log space for gas, in linear space for utilization
+    steps, paths = shape
+    values = np.empty(shape)
+    current = np.full(paths, start, dtype=np.float64)
+    decay = np.exp(-reversion * dt)
+    noise = volatility * np.sqrt((1 - decay ** 2) / (2 * reversion))
+    shocks = rng.standard_normal(shape)
+    for i in range(steps):
+        current = mean + (current - mean) * decay + noise * shocks[i]
+        values[i] = current
+    return values
+
+
+def simulate_paths(market, days=90, paths=512, step=HOUR, seed=0):
+    """(prices, utilizations, gas prices in gwei), each steps x paths."""
+    rng = np.random.default_rng(seed)
+    steps = int(days * 24 * HOUR / step)
+    dt = step / YEAR
+    sigma = market.volatility * np.sqrt(dt)
+    prices = np.exp(np.cumsum(rng.normal(-sigma * sigma / 2, sigma, (steps, paths)), axis=0))
+    utilizations = np.clip(
+        _ou(
+            rng, (steps, paths), market.utilization_mean, market.utilization_volatility,
+            market.utilization_reversion, dt, market.utilization_mean,
+        ),
+        0.0,
+        0.999,
+    )
+    log_gas = _ou(
+        rng, (steps, paths), np.log(market.gas_mean_gwei), market.gas_volatility,
+        market.gas_reversion, dt, np.log(market.gas_mean_gwei),
+    )
+    return prices, utilizations, np.exp(log_gas)
+
+
+def borrow_apr(market, utilization):
+    low = market.borrow_slope_low * np.minimum(utilization, market.kink)
+    high = market.borrow_slope_high * np.maximum(utilization - market.kink, 0.0)
+    return market.borrow_base + low + high
+
+
+def evaluate(market, candidate, prices, utilizations, gas, step=HOUR):
+    """
+    Run one candidate over every path with the strategy's rules: tend back to target over the
+    warning LTV when gas is at most `max_gas_gwei`, or 10p.p. under target when the base fee
+    is acceptable, harvest every `harvest_interval` and only sell COMP over `min_to_sell`.
+    Rewards count toward the yield once sold.
+    """
+    steps, paths = prices.shape
+    dt = step / YEAR
+    liquidation = market.liquidation_ltv
+    target = liquidation * candidate.target_multiplier / MAX_BPS
+    warning = liquidation * candidate.warning_multiplier / MAX_BPS
+    harvest_every = max(1, int(market.harvest_interval / step))
+    usd_per_gas = GWEI * 1e-18 * market.eth_usd
+
+    borrow = borrow_apr(market, utilizations)
+    supply = borrow * utilizations * (1 - market.reserve_factor)
+    # what the debt earns in the depositer minus what it costs, rewards are counted when sold
+    carry = (supply - borrow) * dt
+
+    collateral_units = np.full(paths, market.collateral_usd)
+    debt = collateral_units * target
+    unsold = np.zeros(paths)
+    earned = np.zeros(paths)
+    keeper_gas = np.zeros(paths)
+    above_warning = np.zeros(paths)
+    alive = np.ones(paths, dtype=bool)
+
+    for i in range(steps):
+        collateral = collateral_units * prices[i]
+        earned += np.where(alive, debt * carry[i], 0.0)
+        unsold += np.where(alive, debt * market.reward_apr * dt, 0.0)
+        ltv = debt / collateral
+
+        liquidated = alive & (ltv >= liquidation)
+        if liquidated.any():
+            earned -= np.where(liquidated, collateral * market.liquidation_penalty, 0.0)
+            alive &= ~liquidated
+
+        acceptable = gas[i] <= market.acceptable_gas_gwei
+        over = alive & (ltv > warning)
+        above_warning += over
+        tend = (over & (gas[i] <= candidate.max_gas_gwei)) | (alive & acceptable & (target - ltv > 0.1))
+        debt = np.where(tend, collateral * target, debt)
+        keeper_gas += np.where(tend, market.tend_gas * gas[i] * usd_per_gas, 0.0)
+
+        if (i + 1) % harvest_every == 0:
+            # the keeper waits for the base fee like for tends, the simulation harvests on schedule
+            sell = alive & (unsold > candidate.min_to_sell)
+            earned += np.where(sell, unsold, 0.0)
+            unsold = np.where(sell, 0.0, unsold)
+            cost = np.where(alive, market.harvest_gas + np.where(sell, market.sell_gas, 0), 0)
+            keeper_gas += cost * gas[i] * usd_per_gas
+
+    years = steps * dt
+    net = earned - keeper_gas
+    return {
+        **asdict(candidate),
+        "net apr": float(net.mean() / market.collateral_usd / years),
+        "liquidation probability": float((~alive).mean()),
+        "time above warning": float(above_warning.mean() / steps),
+        "keeper gas usd": float(keeper_gas.mean()),
+    }
+
+
+# ----------------- PROCESS POOL -----------------
+# Workers attach to the paths the parent put in shared memory instead of receiving copies
+
+_shared = {}
+
+
+def _share(arrays):
+    blocks = {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+        blocks[name] = (block, array.shape, array.dtype.str)
+    return blocks
+
+
+def _attach(specs, market, step):
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        # keep the block open for as long as the worker lives
+        _shared[name] = (block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+    _shared["market"] = market
+    _shared["step"] = step
+
+
+def _evaluate_shared(candidate):
+    return evaluate(
+        _shared["market"],
+        candidate,
+        _shared["prices"][1],
+        _shared["utilizations"][1],
+        _shared["gas"][1],
+        _shared["step"],
+    )
+
+
+def grid(
+    targets=range(5_000, 8_501, 500),
+    warnings=range(6_000, 9_001, 500),
+    min_to_sell=(10, 1_000, 10_000),
+    max_gas_gwei=(20, 50, 150),
+):
+    """Every combination with the warning over the target, as `setStrategyParams` requires."""
+    return [
+        Candidate(t, w, m, g)
+        for t, w, m, g in itertools.product(targets, warnings, min_to_sell, max_gas_gwei)
+        if t < w <= 9_000
+    ]
+
+
+def optimize(market, candidates, days=90, paths=512, step=HOUR, seed=0, workers=None):
+    """Evaluate every candidate on the same paths, spread over a process pool. Returns one row each."""
+    prices, utilizations, gas = simulate_paths(market, days, paths, step, seed)
+    blocks = _share({"prices": prices, "utilizations": utilizations, "gas": gas})
+    specs = {name: (block.name, shape, dtype) for name, (block, shape, dtype) in blocks.items()}
+    try:
+        with ProcessPoolExecutor(
+            workers or os.cpu_count(), initializer=_attach, initargs=(specs, market, step)
+        ) as pool:
+            return list(pool.map(_evaluate_shared, candidates, chunksize=max(1, len(candidates) // 64)))
+    finally:
+        for block, _, _ in blocks.values():
+            block.close()
+            block.unlink()
+
+
+# objective: True to maximize, False to minimize
+OBJECTIVES = {
+    "net apr": True,
+    "liquidation probability": False,
+    "time above warning": False,
+    "keeper gas usd": False,
+}
+
+
+def pareto_front(rows, objectives=OBJECTIVES):
+    """The rows no other row is at least as good as on every objective and better on one."""
+    signs = np.array([1.0 if maximize else -1.0 for maximize in objectives.values()])
+    scores = np.array([[row[name] for name in objectives] for row in rows]) * signs
+    front = []
+    for i, score in enumerate(scores):
+        dominated = np.any(np.all(scores >= score, axis=1) & np.any(scores > score, axis=1))
+        if not dominated:
+            front.append(rows[i])
+    return sorted(front, key=lambda row: -row["net apr"])
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    strategy = Strategy.at(click.prompt("Strategy"))
+    comp_usd = click.prompt("COMP price in USD", type=float)
+    paths = click.prompt("Paths", default=512, type=int)
+
+    market = Market.from_strategy(strategy)
+    candidates = grid()
+    start = time.time()
+    rows = optimize(market, candidates, paths=paths)
+    print(f"{len(candidates)} candidates over {paths} paths in {time.time() - start:.0f}s")
+
+    front = pareto_front(rows)
+    print_report(f"Pareto frontier for {strategy.address}", front)
+    best = Candidate(*[front[0][k] for k in ("target_multiplier", "warning_multiplier", "min_to_sell", "max_gas_gwei")])
+    print(f"setStrategyParams{best.strategy_params(comp_usd)}")
@@ -0,0 +1,257 @@
+import threading
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+from brownie import interface, multicall, network, web3
+
+from scripts.fleet import load_strategies, unwrap
+
+# Fields of a record, all in raw on-chain units: balances in token wei, LTVs and APRs scaled
+# by 1e18, prices in USD scaled by 1e8. Stored as float64 so every record has the same width
+FIELDS = [
+    "collateral",
+    "debt",
+    "depositer",
+    "want_balance",
+    "ltv",
+    "target_ltv",
+    "warning_ltv",
+    "want_price",
+    "base_price",
+    "borrow_apr",
+    "reward_apr",
+    "rewards_in_want",
+    "estimated_total_assets",
+]
+RECORD = np.dtype([("block", "<u8"), ("timestamp", "<u8")] + [(name, "<f8") for name in FIELDS])
+# magic, version, record size, capacity, records written
+HEADER = np.dtype(
+    [("magic", "S8"), ("version", "<u8"), ("record_size", "<u8"), ("capacity", "<u8"), ("written", "<u8")]
+)
+HEADER_SIZE = 64
+MAGIC = b"CV3RING"
+VERSION = 1
+
+
+class Ring:
+    """
+    Fixed size file of `capacity` records, memory mapped. Once full the oldest record is
+    overwritten, so the file never grows. Records are written before the count that makes
+    them visible, so a reader in another process never sees a half written one.
+    """
+
+    def __init__(self, path, capacity=None):
+        self.path = Path(path)
+        if not self.path.exists():
+            if capacity is None:
+                raise FileNotFoundError(self.path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.truncate(HEADER_SIZE + capacity * RECORD.itemsize)
+            header = np.memmap(self.path, HEADER, "r+", 0, 1)
+            header[0] = (MAGIC, VERSION, RECORD.itemsize, capacity, 0)
+            header.flush()
+            del header
+
+        self._header = np.memmap(self.path, HEADER, "r+", 0, 1)
+        magic, version, size, stored, _ = self._header[0].tolist()
+        if magic != MAGIC or version != VERSION or size != RECORD.itemsize:
+            raise ValueError(f"{self.path} is not a version {VERSION} recorder file")
+        if capacity is not None and capacity != stored:
+            raise ValueError(f"{self.path} holds {stored} records, not {capacity}")
+        self.capacity = int(stored)
+        self.records = np.memmap(self.path, RECORD, "r+", HEADER_SIZE, self.capacity)
+
+    @property
+    def written(self):
+        return int(self._header["written"][0])
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, record):
+        written = self.written
+        self.records[written % self.capacity] = record
+        self._header["written"] = written + 1
+
+    def flush(self):
+        self.records.flush()
+        self._header.flush()
+
+    def segments(self):
+        """The records oldest first as one or, once wrapped, two views into the file."""
+        written = self.written
+        if written <= self.capacity:
+            return [self.records[:written]]
+        split = written % self.capacity
+        return [self.records[split:], self.records[:split]]
+
+    def view(self):
+        """All records oldest first. A view while the ring has not wrapped, a copy after."""
+        segments = self.segments()
+        return segments[0] if len(segments) == 1 else np.concatenate(segments)
+
+    def range(self, start_block, end_block):
+        """Records with start_block <= block <= end_block. A view unless it spans the wrap."""
+        parts = []
+        for segment in self.segments():
+            blocks = segment["block"]
+            low = np.searchsorted(blocks, start_block, side="left")
+            high = np.searchsorted(blocks, end_block, side="right")
+            if high > low:
+                parts.append(segment[low:high])
+        if not parts:
+            return self.records[:0]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def at(self, block):
+        """The last record at or before `block`, None if the ring does not go back that far."""
+        for segment in reversed(self.segments()):
+            index = np.searchsorted(segment["block"], block, side="right")
+            if index > 0:
+                return segment[index - 1]
+        return None
+
+    def downsample(self, start_block, end_block, points):
+        """About `points` evenly spaced records of the range, a strided view when it is one."""
+        records = self.range(start_block, end_block)
+        step = max(1, -(-len(records) // points))
+        return records[::step]
+
+
+class Recorder:
+    """
+    Samples every strategy at every block into a ring file per strategy.
+
+    Each block is read in one multicall for all strategies. Blocks mined between two polls
+    are read one by one at their own number, so no block is skipped while the node keeps them.
+    """
+
+    def __init__(self, strategies, directory, capacity=100_000, poll_interval=1.0):
+        self.strategies = load_strategies(strategies)
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.rings = {
+            s.address: Ring(self.directory / f"{s.address}.ring", capacity)
+            for s in self.strategies
+        }
+        self.block = None
+        self.samples = 0
+        self._feeds = self._read_feeds()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ring(self, strategy):
+        return self.rings[str(strategy)]
+
+    def _read_feeds(self):
+        # the comet and price feeds don't change so they are read once
+        with multicall():
+            calls = [(s, s.comet(), s.want()) for s in self.strategies]
+        comets = {s.address: interface.Comet(unwrap(c)) for s, c, _ in calls}
+        with multicall():
+            infos = [
+                (s, comets[s.address].getAssetInfoByAddress(unwrap(w)), comets[s.address].baseTokenPriceFeed())
+                for s, _, w in calls
+            ]
+        return {
+            s.address: (comets[s.address], unwrap(info)["priceFeed"], unwrap(base_feed))
+            for s, info, base_feed in infos
+        }
+
+    def sample(self, block):
+        """Read every strategy at `block` and append a record to each ring."""
+        timestamp = web3.eth.get_block(block)["timestamp"]
+        with multicall(block_identifier=block):
+            calls = []
+            for strategy in self.strategies:
+                comet, want_feed, base_feed = self._feeds[strategy.address]
+                calls.append(
+                    (
+                        strategy,
+                        [
+                            strategy.balanceOfCollateral(),
+                            strategy.balanceOfDebt(),
+                            strategy.balanceOfDepositer(),
+                            strategy.balanceOfWant(),
+                            strategy.getCurrentLTV(),
+                            strategy.getLiquidateCollateralFactor(),
+                            strategy.targetLTVMultiplier(),
+                            strategy.warningLTVMultiplier(),
+                            comet.getPrice(want_feed),
+                            comet.getPrice(base_feed),
+                            strategy.getNetBorrowApr(0),
+                            strategy.getNetRewardApr(0),
+                            strategy.rewardsInWant(),
+                            strategy.estimatedTotalAssets(),
+                        ],
+                    )
+                )
+
+        for strategy, values in calls:
+            (
+                collateral, debt, depositer, want_balance, ltv, lcf, target, warning,
+                want_price, base_price, borrow_apr, reward_apr, rewards, assets,
+            ) = [int(unwrap(v)) for v in values]
+            self.rings[strategy.address].append(
+                (
+                    block, timestamp, collateral, debt, depositer, want_balance, ltv,
+                    lcf * target // 10_000, lcf * warning // 10_000, want_price, base_price,
+                    borrow_apr, reward_apr, rewards, assets,
+                )
+            )
+        self.block = block
+        self.samples += 1
+
+    def catch_up(self, block=None):
+        """Sample every block after the last one sampled, up to `block` (default latest)."""
+        block = web3.eth.block_number if block is None else block
+        first = block if self.block is None else self.block + 1
+        for number in range(first, block + 1):
+            self.sample(number)
+
+    def flush(self):
+        for ring in self.rings.values():
+            ring.flush()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.catch_up()
+            except Exception as e:
+                print(f"[recorder] sample failed: {e!r}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self.catch_up()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    addresses = click.prompt("Strategies (comma separated)").split(",")
+    directory = click.prompt("Directory", default="recordings")
+    capacity = click.prompt("Blocks kept per strategy", default=100_000, type=int)
+
+    recorder = Recorder([a.strip() for a in addresses], directory, capacity)
+    size = sum(ring.path.stat().st_size for ring in recorder.rings.values())
+    print(f"Recording to {directory}, {size / 2 ** 20:.1f} MiB on disk at most")
+    start = time.time()
+    recorder.start()
+    try:
+        while True:
+            time.sleep(60)
+            recorder.flush()
+    except KeyboardInterrupt:
+        pass
+    recorder.stop()
+    print(f"Ran {time.time() - start:.0f}s, {recorder.samples} blocks sampled")
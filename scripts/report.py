@@ -0,0 +1,50 @@
+import csv
+from pathlib import Path
+
+
+def _format_value(value):
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        return f"{value:,.4f}"
+    return str(value)
+
+
+def format_table(rows, columns=None):
+    """
+    Format a list of dicts as a plain text table.
+    Columns default to the keys of the first row, in order.
+    """
+    if not rows:
+        return ""
+    columns = columns or list(rows[0].keys())
+    cells = [[_format_value(row.get(column)) for column in columns] for row in rows]
+    widths = [
+        max(len(str(column)), *(len(line[i]) for line in cells))
+        for i, column in enumerate(columns)
+    ]
+
+    header = " | ".join(str(column).rjust(widths[i]) for i, column in enumerate(columns))
+    lines = [header, "-+-".join("-" * width for width in widths)]
+    for line in cells:
+        lines.append(" | ".join(cell.rjust(widths[i]) for i, cell in enumerate(line)))
+    return "\n".join(lines)
+
+
+def print_report(title, rows, columns=None, csv_path=None):
+    """
+    Print a titled table and optionally write the same rows to a csv file.
+    """
+    print(f"\n{title}")
+    print(format_table(rows, columns))
+
+    if csv_path and rows:
+        columns = columns or list(rows[0].keys())
+        path = Path(csv_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
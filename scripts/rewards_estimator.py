@@ -0,0 +1,157 @@
+from brownie import interface, multicall, web3
+
+from scripts.fleet import unwrap
+
+REWARDS_CONTRACT = "0x1B0e765F6224C21223AeA2af16c1C46E38885a40"
+
+# Comet and CometRewards events that change an account's principal or claimed amount
+PRINCIPAL_EVENTS = [
+    "Supply(address,address,uint256)",
+    "Withdraw(address,address,uint256)",
+    "Transfer(address,address,uint256)",
+    "AbsorbDebt(address,address,uint256,uint256)",
+]
+CLAIM_EVENTS = ["RewardClaimed(address,address,address,uint256)"]
+
+
+def _topic(signature):
+    topic = web3.keccak(text=signature).hex()
+    return topic if topic.startswith("0x") else "0x" + topic
+
+
+def _account_topic(address):
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+class RewardsEstimator:
+    """
+    Local estimate of the COMP owed to a depositer and its strategy.
+
+    Reads Comet's tracking indices, tracking speeds and the accounts' principals once,
+    then extrapolates the tracking indices the same way `Comet.accrueInternal` and
+    `Comet.updateBasePrincipal` would to get what `Depositer.getRewardsOwed` returns
+    after both accounts are accrued at any timestamp.
+
+    The extrapolation assumes Comet's total supply and borrow stay as they were at the
+    last sync. `poll` re-syncs only when one of our accounts' principal or claims change.
+    """
+
+    def __init__(self, depositer, rewards_contract=REWARDS_CONTRACT):
+        self.depositer = depositer
+        self.comet = interface.Comet(depositer.comet())
+        self.rewards = interface.CometRewards(rewards_contract)
+        self.accounts = [depositer.address, depositer.strategy()]
+
+        self.synced_block = None
+        self.syncs = 0
+
+    def sync(self, block_identifier=None):
+        comet = self.comet
+        block = web3.eth.get_block(block_identifier or "latest")
+        with multicall(block_identifier=block["number"]):
+            totals = comet.totalsBasic()
+            supply_speed = comet.baseTrackingSupplySpeed()
+            borrow_speed = comet.baseTrackingBorrowSpeed()
+            min_for_rewards = comet.baseMinForRewards()
+            base_scale = comet.baseScale()
+            tracking_index_scale = comet.trackingIndexScale()
+            accrual_scale = comet.baseAccrualScale()
+            config = self.rewards.rewardConfig(comet)
+            users = [comet.userBasic(account) for account in self.accounts]
+            claimed = [self.rewards.rewardsClaimed(comet, account) for account in self.accounts]
+
+        self.totals = unwrap(totals)
+        self.supply_speed = int(supply_speed)
+        self.borrow_speed = int(borrow_speed)
+        self.min_for_rewards = int(min_for_rewards)
+        self.base_scale = int(base_scale)
+        self.tracking_index_scale = int(tracking_index_scale)
+        self.accrual_descale_factor = self.base_scale // int(accrual_scale)
+        config = unwrap(config)
+        self.rescale_factor = int(config["rescaleFactor"])
+        self.should_upscale = bool(config["shouldUpscale"])
+        self.users = [unwrap(user) for user in users]
+        self.claimed = sum(int(c) for c in claimed)
+
+        self.synced_block = block["number"]
+        self.synced_time = block["timestamp"]
+        self.syncs += 1
+
+    def tracking_indices(self, timestamp):
+        """Comet's (trackingSupplyIndex, trackingBorrowIndex) accrued up to `timestamp`."""
+        totals = self.totals
+        supply_index = int(totals["trackingSupplyIndex"])
+        borrow_index = int(totals["trackingBorrowIndex"])
+        elapsed = max(0, timestamp - int(totals["lastAccrualTime"]))
+        if elapsed == 0:
+            return supply_index, borrow_index
+
+        total_supply = int(totals["totalSupplyBase"])
+        total_borrow = int(totals["totalBorrowBase"])
+        if total_supply >= self.min_for_rewards and total_supply > 0:
+            supply_index += self.supply_speed * elapsed * self.base_scale // total_supply
+        if total_borrow >= self.min_for_rewards and total_borrow > 0:
+            borrow_index += self.borrow_speed * elapsed * self.base_scale // total_borrow
+        return supply_index, borrow_index
+
+    def tracking_accrued(self, user, timestamp):
+        """An account's baseTrackingAccrued once accrued at `timestamp`."""
+        supply_index, borrow_index = self.tracking_indices(timestamp)
+        principal = int(user["principal"])
+        if principal >= 0:
+            delta = supply_index - int(user["baseTrackingIndex"])
+        else:
+            delta = borrow_index - int(user["baseTrackingIndex"])
+        return (
+            int(user["baseTrackingAccrued"])
+            + abs(principal) * delta // self.tracking_index_scale // self.accrual_descale_factor
+        )
+
+    def estimate(self, timestamp=None):
+        """COMP owed to the depositer and strategy at `timestamp`, defaults to the last sync."""
+        if self.synced_block is None:
+            self.sync()
+        timestamp = timestamp or self.synced_time
+
+        accrued = sum(self.tracking_accrued(user, timestamp) for user in self.users)
+        if self.should_upscale:
+            accrued *= self.rescale_factor
+        else:
+            accrued //= self.rescale_factor
+        return max(0, accrued - self.claimed)
+
+    def rate(self, timestamp=None, window=3600):
+        """COMP per second accruing to our accounts, averaged over `window` seconds."""
+        timestamp = timestamp or self.synced_time
+        return (self.estimate(timestamp + window) - self.estimate(timestamp)) / window
+
+    def _changed(self, from_block, to_block):
+        accounts = [_account_topic(account) for account in self.accounts]
+        queries = [
+            (self.comet.address, [[_topic(s) for s in PRINCIPAL_EVENTS], accounts]),
+            (self.comet.address, [[_topic(s) for s in PRINCIPAL_EVENTS], None, accounts]),
+            (self.rewards.address, [[_topic(s) for s in CLAIM_EVENTS], accounts]),
+        ]
+        for address, topics in queries:
+            logs = web3.eth.get_logs(
+                {"fromBlock": from_block, "toBlock": to_block, "address": address, "topics": topics}
+            )
+            if logs:
+                return True
+        return False
+
+    def poll(self, block_identifier=None):
+        """
+        Check the blocks since the last sync for events that touch our accounts
+        and re-sync if there are any. Returns True if it re-synced.
+        """
+        latest = web3.eth.get_block(block_identifier or "latest")["number"]
+        if self.synced_block is None:
+            self.sync(latest)
+            return True
+        if latest <= self.synced_block:
+            return False
+        if self._changed(self.synced_block + 1, latest):
+            self.sync(latest)
+            return True
+        return False
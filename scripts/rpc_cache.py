@@ -0,0 +1,168 @@
+import gzip
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+RECORD = "record"
+REPLAY = "replay"
+# JSON-RPC error code returned for requests that are not in the cache when replaying
+MISS_CODE = -32099
+# JSON-RPC error code returned when the upstream fails or doesn't answer with JSON
+UPSTREAM_CODE = -32098
+
+
+def cache_key(method, params):
+    return method + json.dumps(params or [], sort_keys=True, separators=(",", ":"))
+
+
+class RpcCache:
+    """
+    JSON-RPC responses of a forked node's upstream, keyed by method and params.
+
+    The fork is pinned to `block`, so every request the node makes upstream names that
+    block or an older one and the answers never change. Stored gzipped with sorted keys
+    so recording the same tests twice gives the same file.
+    """
+
+    def __init__(self, path, block=None):
+        self.path = Path(path)
+        self.block = block
+        self.responses = {}
+        self.hits = 0
+        self.misses = []
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with gzip.open(self.path, "rt") as f:
+                data = json.load(f)
+            if block is not None and data["block"] != block:
+                raise ValueError(f"{self.path} was recorded at block {data['block']}, not {block}")
+            self.block = data["block"]
+            self.responses = data["responses"]
+
+    def get(self, method, params):
+        """The cached response, {"result": ...} or {"error": ...}, or None on a miss."""
+        key = cache_key(method, params)
+        with self._lock:
+            response = self.responses.get(key)
+            if response is None:
+                self.misses.append(key)
+            else:
+                self.hits += 1
+            return response
+
+    def put(self, method, params, response):
+        with self._lock:
+            self.responses[cache_key(method, params)] = response
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"block": self.block, "responses": self.responses}
+        with gzip.open(self.path, "wt") as f:
+            json.dump(data, f, sort_keys=True, separators=(",", ":"))
+
+
+class CachingProxy:
+    """
+    JSON-RPC server to point a fork at instead of the real node.
+
+    Recording forwards misses to `upstream` and stores the answers that have a result. Errors,
+    such as a rate limit or a timeout, are passed on without being stored. Replaying never
+    touches the network and answers misses with a `MISS_CODE` error, so a test that
+    needs state that was not recorded fails instead of silently going online.
+    """
+
+    def __init__(self, cache, mode, upstream=None, host="127.0.0.1", port=0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be {RECORD!r} or {REPLAY!r}")
+        if mode == RECORD and not upstream:
+            raise ValueError("recording needs an upstream node")
+        if mode == REPLAY and cache.block is None:
+            raise ValueError(f"nothing recorded at {cache.path}")
+        self.cache = cache
+        self.mode = mode
+        self.upstream = upstream
+        self.upstream_requests = 0
+        self._session = requests.Session()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def fork_url(self):
+        """What to give ganache as its fork, pinned to the cache's block."""
+        return f"{self.url}@{self.cache.block}"
+
+    def _forward(self, request):
+        self.upstream_requests += 1
+        try:
+            response = self._session.post(self.upstream, json=request, timeout=60)
+            response.raise_for_status()
+            response = response.json()
+        except (requests.RequestException, ValueError) as e:
+            return {"error": {"code": UPSTREAM_CODE, "message": f"upstream failed: {e!r}"}}
+        return {k: v for k, v in response.items() if k in ("result", "error")}
+
+    def answer(self, request):
+        method, params = request["method"], request.get("params", [])
+        response = self.cache.get(method, params)
+        if response is None:
+            if self.mode == REPLAY:
+                response = {"error": {"code": MISS_CODE, "message": f"rpc cache miss: {method} {params}"}}
+            else:
+                response = self._forward({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+                # an error may not happen again, replaying it forever would break the fork
+                if "result" in response:
+                    self.cache.put(method, params, response)
+        return {"jsonrpc": "2.0", "id": request.get("id"), **response}
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if isinstance(request, list):
+                    response = [proxy.answer(r) for r in request]
+                else:
+                    response = proxy.answer(request)
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        if self.cache.block is None:
+            # pin the fork to the upstream's latest block
+            response = self._forward({"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []})
+            if "result" not in response:
+                raise RuntimeError(f"{self.upstream} did not return its latest block: {response['error']}")
+            self.cache.block = int(response["result"], 16)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.mode == RECORD:
+            self.cache.save()
+
+
+def resolve_upstream(fork, networks):
+    """The node url behind a brownie `fork` setting, which can be a network id like "mainnet"."""
+    if fork in networks:
+        fork = networks[fork]["host"]
+    return os.path.expandvars(fork.split("@")[0])
@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+
+from brownie import Contract, MockPriceFeed, chain, history, web3
+
+MAX_BPS = 10_000
+DAY = 24 * 60 * 60
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# Methods that replace an account's code, per node
+SET_CODE_METHODS = ["evm_setAccountCode", "anvil_setCode", "hardhat_setCode"]
+
+
+# ----------------- STEPS -----------------
+# A scenario is a list of (seconds since start, step) tuples.
+# Steps at the same or earlier time than the previous one run right away.
+
+
+@dataclass
+class Deposit:
+    amount: int
+
+
+@dataclass
+class Withdraw:
+    # fraction of the depositor's vault shares, in bps
+    bps: int = MAX_BPS
+
+
+@dataclass
+class PriceMove:
+    # relative move of the price comet and the strategy read, in bps. i.e. -2_000 is a 20% drop
+    bps: int
+    # "want" or "base"
+    token: str = "want"
+
+
+@dataclass
+class UtilizationMove:
+    # base token borrowed from (> 0) or supplied to (< 0) comet by an outside account
+    amount: int
+
+
+@dataclass
+class DebtRatio:
+    bps: int
+
+
+@dataclass
+class Harvest:
+    pass
+
+
+@dataclass
+class Tend:
+    pass
+
+
+@dataclass
+class Checkpoint:
+    name: str
+
+
+class ScenarioRunner:
+    """
+    Runs declarative lifecycle scenarios against a strategy on the local chain.
+
+    Idle time between steps is compressed into a single `chain.sleep`. The next
+    transaction mines the block at the new time so no empty blocks are mined.
+    Metrics are collected after every step.
+    """
+
+    def __init__(
+        self,
+        vault,
+        strategy,
+        comet,
+        token,
+        base_token,
+        depositor,
+        base_whale,
+        keeper,
+        gov,
+    ):
+        self.vault = vault
+        self.strategy = strategy
+        self.comet = comet
+        self.token = token
+        self.base_token = base_token
+        self.depositor = depositor
+        self.base_whale = base_whale
+        self.keeper = keeper
+        self.gov = gov
+
+        self.start = None
+        self.checkpoints = {}
+        self._feeds = {}
+
+    # ----------------- TIME -----------------
+
+    def _now(self):
+        return web3.eth.get_block("latest")["timestamp"]
+
+    def _advance_to(self, at):
+        if self.start is None:
+            self.start = self._now()
+        # the next block is mined by the step's own transaction
+        delta = self.start + at - self._now()
+        if delta > 0:
+            chain.sleep(delta)
+
+    # ----------------- METRICS -----------------
+
+    def metrics(self, label, at):
+        strategy = self.strategy
+        collateral = strategy.balanceOfCollateral()
+        return {
+            "step": label,
+            "day": at / DAY,
+            "block": chain.height,
+            "ltv": strategy.getCurrentLTV() / 1e18 if collateral > 0 else 0.0,
+            "estimatedTotalAssets": strategy.estimatedTotalAssets(),
+            "pricePerShare": self.vault.pricePerShare(),
+            "collateral": collateral,
+            "debt": strategy.balanceOfDebt(),
+        }
+
+    # ----------------- ACTIONS -----------------
+
+    def _mock_feed(self, address):
+        # Put a MockPriceFeed's code at a live feed, keeping its decimals and answer, so
+        # everything that reads the feed sees the prices we set
+        live = Contract.from_abi("PriceFeed", address, MockPriceFeed.abi)
+        decimals, answer = live.decimals(), live.latestRoundData()[1]
+        template = MockPriceFeed.deploy(decimals, answer, {"from": self.gov})
+        code = web3.eth.get_code(template.address)
+        set_code(address, code)
+        feed = MockPriceFeed.at(address)
+        feed.setAnswer(answer, {"from": self.gov})
+        return feed, code
+
+    def _feeds_of(self, token):
+        # Comet's own feed, so collateralization and liquidation move too, and the strategy's
+        # when it reads another one
+        asset = self.token if token == "want" else self.base_token
+        if asset.address not in self._feeds:
+            if token == "want":
+                comet_feed = self.comet.getAssetInfoByAddress(asset)["priceFeed"]
+            else:
+                comet_feed = self.comet.baseTokenPriceFeed()
+            addresses = [comet_feed]
+            strategy_feed = self.strategy.priceFeeds(asset)
+            if strategy_feed not in (ZERO_ADDRESS, comet_feed):
+                addresses.append(strategy_feed)
+            self._feeds[asset.address] = [self._mock_feed(address) for address in addresses]
+        return [feed for feed, _ in self._feeds[asset.address]]
+
+    def _price_move(self, step):
+        for feed in self._feeds_of(step.token):
+            feed.setAnswer(feed.answer() * (MAX_BPS + step.bps) // MAX_BPS, {"from": self.gov})
+
+    def _utilization_move(self, step):
+        comet = self.comet
+        base = self.base_token
+        if step.amount < 0:
+            base.approve(comet, -step.amount, {"from": self.base_whale})
+            comet.supply(base, -step.amount, {"from": self.base_whale})
+            return
+
+        # post twice the borrowed value as collateral from the depositor
+        want_price = comet.getPrice(comet.getAssetInfoByAddress(self.token)["priceFeed"])
+        base_price = comet.getPrice(comet.baseTokenPriceFeed())
+        collateral = (
+            step.amount * base_price * 10 ** self.token.decimals() * 2
+            // (want_price * 10 ** base.decimals())
+        )
+        self.token.approve(comet, collateral, {"from": self.depositor})
+        comet.supply(self.token, collateral, {"from": self.depositor})
+        comet.withdraw(base, step.amount, {"from": self.depositor})
+
+    def apply(self, step):
+        if isinstance(step, Deposit):
+            self.token.approve(self.vault, step.amount, {"from": self.depositor})
+            self.vault.deposit(step.amount, {"from": self.depositor})
+        elif isinstance(step, Withdraw):
+            shares = self.vault.balanceOf(self.depositor) * step.bps // MAX_BPS
+            self.vault.withdraw(shares, self.depositor, MAX_BPS, {"from": self.depositor})
+        elif isinstance(step, PriceMove):
+            self._price_move(step)
+        elif isinstance(step, UtilizationMove):
+            self._utilization_move(step)
+        elif isinstance(step, DebtRatio):
+            self.vault.updateStrategyDebtRatio(self.strategy, step.bps, {"from": self.gov})
+        elif isinstance(step, Harvest):
+            self.strategy.harvest({"from": self.keeper})
+        elif isinstance(step, Tend):
+            self.strategy.tend({"from": self.keeper})
+        elif isinstance(step, Checkpoint):
+            self.checkpoints[step.name] = mark()
+        else:
+            raise ValueError(f"Unknown step {step}")
+
+    # ----------------- RUNNING -----------------
+
+    def run(self, steps):
+        """Run the steps in order and return the metrics after each one."""
+        result = []
+        for at, step in steps:
+            self._advance_to(at)
+            self.apply(step)
+            result.append(self.metrics(type(step).__name__, at))
+        return result
+
+    def run_branches(self, prefix, branches):
+        """
+        Run `prefix` once, then every branch from the state it left behind.
+        Returns {branch name: prefix metrics + branch metrics}.
+        The chain is left at the end of the prefix.
+        """
+        shared = self.run(prefix)
+        end_of_prefix = mark()
+        start = self.start
+
+        results = {}
+        for name, steps in branches.items():
+            results[name] = shared + self.run(steps)
+            rewind(end_of_prefix)
+            self.start = start
+            # feeds mocked in the branch are live feeds again
+            self._feeds = {
+                asset: feeds
+                for asset, feeds in self._feeds.items()
+                if all(web3.eth.get_code(feed.address) == code for feed, code in feeds)
+            }
+        return results
+
+    def revert_to(self, name):
+        """Go back to a named `Checkpoint` step. The checkpoint can be reused."""
+        rewind(self.checkpoints[name])
+
+
+# Rollbacks go through brownie's undo buffer. Its history and the node stay in step, and the single
+# snapshot chain.snapshot() keeps, the one the test isolation reverts to, is left alone
+def mark():
+    """Point in brownie's transaction history to `rewind` to."""
+    return len(history)
+
+
+def rewind(point):
+    """
+    Undo every transaction since `point`, back to the state right after the transaction before it.
+    Reverted transactions are mined too and are undone with the rest.
+    """
+    count = len(history) - point
+    if count > 0:
+        chain.undo(count)
+
+
+def set_code(address, code):
+    for method in SET_CODE_METHODS:
+        if "error" not in web3.provider.make_request(method, [address, "0x" + bytes(code).hex()]):
+            return
+    raise RuntimeError("the node can't replace an account's code")
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+from brownie import interface
+
+from scripts.fleet import LTV_SCALE
+
+APR_SCALE = 10 ** 18
+YEAR = 365 * 24 * 60 * 60
+HOUR = 60 * 60
+
+
+@dataclass
+class Position:
+    """What the tend policies are compared on. USD values, APRs and LTVs as fractions."""
+
+    collateral_usd: float
+    liquidation_ltv: float = 0.825
+    target_multiplier: float = 0.7
+    warning_multiplier: float = 0.8
+    # getNetBorrowApr(0) and getNetRewardApr(0)
+    borrow_apr: float = 0.02
+    reward_apr: float = 0.05
+    # annualized volatility of the want / base token price
+    volatility: float = 0.6
+    gas_per_tend: int = 700_000
+    gas_price_gwei: float = 20
+    eth_usd: float = 1_800
+
+    @property
+    def target_ltv(self):
+        return self.liquidation_ltv * self.target_multiplier
+
+    @property
+    def warning_ltv(self):
+        return self.liquidation_ltv * self.warning_multiplier
+
+    @property
+    def tend_cost_usd(self):
+        return self.gas_per_tend * self.gas_price_gwei * 1e-9 * self.eth_usd
+
+    @classmethod
+    def from_strategy(cls, strategy, **kwargs):
+        """Read the position, LTVs and APRs from a deployed strategy. Gas settings come from `kwargs`."""
+        want = interface.IERC20Extended(strategy.want())
+        comet = interface.Comet(strategy.comet())
+        # comet prices are USD with 8 decimals
+        price = comet.getPrice(comet.getAssetInfoByAddress(want)["priceFeed"]) / 1e8
+        collateral = strategy.balanceOfCollateral() / 10 ** want.decimals() * price
+        return cls(
+            collateral_usd=collateral,
+            liquidation_ltv=strategy.getLiquidateCollateralFactor() / LTV_SCALE,
+            target_multiplier=strategy.targetLTVMultiplier() / 10_000,
+            warning_multiplier=strategy.warningLTVMultiplier() / 10_000,
+            borrow_apr=strategy.getNetBorrowApr(0) / APR_SCALE,
+            reward_apr=strategy.getNetRewardApr(0) / APR_SCALE,
+            **kwargs,
+        )
+
+
+def price_paths(position, days, paths, step=HOUR, seed=0):
+    """Driftless geometric brownian motion of the want price in base token, starting at 1."""
+    steps = int(days * 24 * HOUR / step)
+    sigma = position.volatility * np.sqrt(step / YEAR)
+    shocks = np.random.default_rng(seed).normal(-sigma * sigma / 2, sigma, (steps, paths))
+    return np.exp(np.cumsum(shocks, axis=0))
+
+
+def simulate(position, prices, payback_window=0, step=HOUR):
+    """
+    Run the strategy's tend rules over `prices` (steps x paths) with a keeper checking every `step`.
+
+    `payback_window` of 0 re-levers on the fixed 10p.p. LTV band, otherwise when the net
+    rewards on the extra debt over `payback_window` seconds cover the tend's gas, the same
+    as `tendTrigger`. Over the warning LTV both repay to the target.
+    Returns (tends, net yield in USD) per path.
+    """
+    target, warning = position.target_ltv, position.warning_ltv
+    spread = position.reward_apr - position.borrow_apr
+    cost = position.tend_cost_usd
+
+    paths = prices.shape[1]
+    # the position starts levered to the target by a harvest
+    debt = np.full(paths, position.collateral_usd * target)
+    tends = np.zeros(paths, dtype=np.int64)
+    earned = np.zeros(paths)
+
+    for price in prices:
+        collateral = position.collateral_usd * price
+        earned += debt * spread * step / YEAR
+        ltv = debt / collateral
+
+        gap = target - ltv
+        if payback_window == 0:
+            relever = gap > 0.1
+        else:
+            relever = (gap > 0) & (gap * collateral * spread * payback_window / YEAR > cost)
+        tend = relever | (ltv > warning)
+        # unhealthy borrowing costs would tend every step for both, and is left out
+        debt = np.where(tend, collateral * target, debt)
+        tends += tend
+
+    return tends, earned - tends * cost
+
+
+def compare(position, windows, days=90, paths=256, step=HOUR, seed=0):
+    """One row per policy with mean tends and net APR over the collateral, on the same price paths."""
+    prices = price_paths(position, days, paths, step, seed)
+    rows = []
+    for window in [0] + list(windows):
+        tends, net = simulate(position, prices, window, step)
+        rows.append(
+            {
+                "collateral usd": round(position.collateral_usd),
+                "gas gwei": position.gas_price_gwei,
+                "policy": "fixed band" if window == 0 else f"payback {window / (24 * HOUR):g}d",
+                "tends": float(tends.mean()),
+                "net apr": float(net.mean() / position.collateral_usd * YEAR / (days * 24 * HOUR)),
+            }
+        )
+    return rows
+
+
+def sweep(position, sizes, gas_prices, windows, **kwargs):
+    """`compare` over position sizes and gas prices."""
+    rows = []
+    for size in sizes:
+        for gas_price in gas_prices:
+            rows += compare(
+                replace(position, collateral_usd=size, gas_price_gwei=gas_price), windows, **kwargs
+            )
+    return rows
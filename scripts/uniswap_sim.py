@@ -0,0 +1,257 @@
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import interface, multicall
+
+from scripts.fleet import unwrap
+
+FACTORY = "0x1F98431c8aD98523631AE4a59f267346ea31F984"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+
+MIN_TICK = -887272
+MAX_TICK = 887272
+FEE_SCALE = 1_000_000
+MAX_BPS = 10_000
+Q96 = 2 ** 96
+
+
+def tick_sqrt_price(ticks):
+    """sqrt(token1 / token0) at each tick, as a float."""
+    return np.power(1.0001, np.asarray(ticks, dtype=np.float64) / 2)
+
+
+@dataclass
+class PoolState:
+    """Snapshot of a Uniswap V3 pool with the initialized ticks that were loaded around its price."""
+
+    address: str
+    token0: str
+    token1: str
+    fee: int
+    tick_spacing: int
+    sqrt_price: float
+    tick: int
+    liquidity: int
+    # sorted initialized ticks and their liquidityNet
+    ticks: np.ndarray
+    liquidity_net: np.ndarray
+
+    @classmethod
+    def load(cls, pool, words=16, block_identifier=None):
+        """
+        Read a pool's price, liquidity and the initialized ticks in `words` bitmap words
+        on each side of the current tick. Swaps that go past those ticks come back as nan.
+        """
+        pool = interface.IUniswapV3Pool(pool)
+        with multicall(block_identifier=block_identifier):
+            slot0 = pool.slot0()
+            liquidity = pool.liquidity()
+            fee = pool.fee()
+            tick_spacing = pool.tickSpacing()
+            token0 = pool.token0()
+            token1 = pool.token1()
+        slot0 = unwrap(slot0)
+        tick = int(slot0[1])
+        tick_spacing = int(tick_spacing)
+
+        # Same layout as TickBitmap.position with a compressed tick rounded towards -inf
+        word = (tick // tick_spacing) >> 8
+        first = max(word - words, (MIN_TICK // tick_spacing) >> 8)
+        last = min(word + words, (MAX_TICK // tick_spacing) >> 8)
+        with multicall(block_identifier=block_identifier):
+            bitmaps = [(position, pool.tickBitmap(position)) for position in range(first, last + 1)]
+
+        initialized = []
+        for position, bitmap in bitmaps:
+            bitmap = int(unwrap(bitmap))
+            while bitmap:
+                bit = (bitmap & -bitmap).bit_length() - 1
+                initialized.append(((position << 8) + bit) * tick_spacing)
+                bitmap &= bitmap - 1
+
+        with multicall(block_identifier=block_identifier):
+            infos = [pool.ticks(t) for t in initialized]
+
+        return cls(
+            address=pool.address,
+            token0=unwrap(token0),
+            token1=unwrap(token1),
+            fee=int(fee),
+            tick_spacing=tick_spacing,
+            sqrt_price=int(slot0[0]) / Q96,
+            tick=tick,
+            liquidity=int(liquidity),
+            ticks=np.array(initialized, dtype=np.int64),
+            liquidity_net=np.array([float(unwrap(info)[1]) for info in infos], dtype=np.float64),
+        )
+
+
+class Hop:
+    """
+    One swap through a pool in a fixed direction.
+
+    The price range the swap can cross is cut into segments at the initialized ticks with
+    the cumulative amounts needed to reach the end of each one. A batch of amounts is then
+    placed in its segment with one `searchsorted` and solved in closed form, so thousands
+    of sizes cost a few array operations instead of a tick by tick loop each.
+    Amounts are floats, within rounding of what the pool would do for non dust amounts.
+    """
+
+    def __init__(self, pool, token_in):
+        self.pool = pool
+        self.zero_for_one = token_in.lower() == pool.token0.lower()
+        self.token_in = pool.token0 if self.zero_for_one else pool.token1
+        self.token_out = pool.token1 if self.zero_for_one else pool.token0
+        self.fee = pool.fee / FEE_SCALE
+        self._build_segments()
+
+    def _build_segments(self):
+        pool = self.pool
+        if self.zero_for_one:
+            # moving down crosses every initialized tick at or below the current one
+            mask = pool.ticks <= pool.tick
+            ticks = pool.ticks[mask][::-1]
+            # crossing a tick right to left removes its liquidityNet
+            changes = -pool.liquidity_net[mask][::-1]
+        else:
+            mask = pool.ticks > pool.tick
+            ticks = pool.ticks[mask]
+            changes = pool.liquidity_net[mask]
+
+        # Segments run from the current price to the first tick, then tick to tick.
+        # Nothing is known past the last loaded tick so the swap cannot go further.
+        ends = np.concatenate(([pool.sqrt_price], tick_sqrt_price(ticks)))
+        starts = ends[:-1] if ticks.size else ends
+        ends = ends[1:] if ticks.size else ends
+        liquidity = float(pool.liquidity) + np.concatenate(([0.0], np.cumsum(changes[:-1])))
+        liquidity = liquidity[: starts.size]
+
+        liquidity = np.maximum(liquidity, 0.0)
+        if self.zero_for_one:
+            amount_in = liquidity * (starts - ends) / (starts * ends)
+            amount_out = liquidity * (starts - ends)
+        else:
+            amount_in = liquidity * (ends - starts)
+            amount_out = liquidity * (ends - starts) / (starts * ends)
+
+        self.starts = starts
+        self.liquidity = liquidity
+        # amounts to get through segments [0, i), net of fees
+        self.cumulative_in = np.concatenate(([0.0], np.cumsum(amount_in)))
+        self.cumulative_out = np.concatenate(([0.0], np.cumsum(amount_out)))
+
+    @property
+    def capacity_in(self):
+        """Largest amount in, fees included, the loaded ticks can fill."""
+        return self.cumulative_in[-1] / (1 - self.fee)
+
+    def spot_rate(self):
+        """Amount out per unit in for an infinitely small swap, fees included."""
+        price = self.pool.sqrt_price ** 2
+        return (price if self.zero_for_one else 1 / price) * (1 - self.fee)
+
+    def _locate(self, cumulative, amounts):
+        # last segment that starts at or before `amounts`, zero length segments are skipped
+        index = np.searchsorted(cumulative, amounts, side="right") - 1
+        index = np.clip(index, 0, self.starts.size - 1)
+        return index, amounts - cumulative[index], amounts > cumulative[-1]
+
+    def exact_input(self, amounts):
+        """Amounts out for each amount in. nan where the loaded liquidity runs out."""
+        net = np.asarray(amounts, dtype=np.float64) * (1 - self.fee)
+        index, rest, over = self._locate(self.cumulative_in, net)
+        start = self.starts[index]
+        liquidity = self.liquidity[index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.zero_for_one:
+                partial = rest * start * start * liquidity / (liquidity + rest * start)
+            else:
+                partial = rest / (start * (start + rest / liquidity))
+            out = self.cumulative_out[index] + np.where(rest > 0, partial, 0.0)
+        return np.where(over, np.nan, out)
+
+    def exact_output(self, amounts):
+        """Amounts in, fees included, for each amount out. nan where the loaded liquidity runs out."""
+        wanted = np.asarray(amounts, dtype=np.float64)
+        index, rest, over = self._locate(self.cumulative_out, wanted)
+        start = self.starts[index]
+        liquidity = self.liquidity[index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.zero_for_one:
+                end = start - rest / liquidity
+                partial = rest / (start * end)
+            else:
+                end = 1 / (1 / start - rest / liquidity)
+                partial = rest * start * end
+            net = self.cumulative_in[index] + np.where(rest > 0, partial, 0.0)
+        # going past the top of a segment would mean a negative price
+        over |= ~np.isfinite(net) | (net < 0)
+        return np.where(over, np.nan, net / (1 - self.fee))
+
+
+class Route:
+    """A path of hops, the same shape the router's `exactInput` and `exactOutput` take."""
+
+    def __init__(self, hops):
+        self.hops = hops
+
+    @property
+    def tokens(self):
+        return [self.hops[0].token_in] + [hop.token_out for hop in self.hops]
+
+    def exact_input(self, amounts):
+        for hop in self.hops:
+            amounts = hop.exact_input(amounts)
+        return amounts
+
+    def exact_output(self, amounts):
+        for hop in reversed(self.hops):
+            amounts = hop.exact_output(amounts)
+        return amounts
+
+    def spot_rate(self):
+        rate = 1.0
+        for hop in self.hops:
+            rate *= hop.spot_rate()
+        return rate
+
+    def price_impact_bps(self, amounts):
+        """Loss against the spot price for each amount in, fees excluded."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        return (1 - self.exact_input(amounts) / (amounts * self.spot_rate())) * MAX_BPS
+
+    def max_amount_in(self, max_impact_bps, low, high, samples=4096):
+        """Largest amount in between `low` and `high` that stays under `max_impact_bps`."""
+        sizes = np.geomspace(low, high, samples)
+        ok = self.price_impact_bps(sizes) <= max_impact_bps
+        return float(sizes[ok][-1]) if ok.any() else 0.0
+
+    def buffer_bps(self, amounts_out, oracle_amounts_in):
+        """
+        Buffer over an oracle derived amount in needed for `exactOutput` to fill,
+        to compare against the strategy's fixed 10_500 bps.
+        """
+        needed = self.exact_output(amounts_out)
+        return (needed / np.asarray(oracle_amounts_in, dtype=np.float64) - 1) * MAX_BPS
+
+
+def load_route(strategy, token_in, token_out, words=16, block_identifier=None):
+    """
+    Load the pools for the path the strategy swaps `token_in` to `token_out` through:
+    directly when one side is WETH, through WETH otherwise, with the strategy's `uniFees`.
+    """
+    token_in, token_out = str(token_in), str(token_out)
+    if WETH.lower() in (token_in.lower(), token_out.lower()):
+        pairs = [(token_in, token_out)]
+    else:
+        pairs = [(token_in, WETH), (WETH, token_out)]
+
+    factory = interface.IUniswapV3Factory(FACTORY)
+    with multicall(block_identifier=block_identifier):
+        pools = [factory.getPool(a, b, strategy.uniFees(a, b)) for a, b in pairs]
+    return Route(
+        [
+            Hop(PoolState.load(unwrap(pool), words, block_identifier), token)
+            for pool, (token, _) in zip(pools, pairs)
+        ]
+    )
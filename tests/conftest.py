@@ -1,15 +1,223 @@
+import time
+from pathlib import Path
+
 import pytest
-from brownie import config, chain, Wei
+from brownie import config, chain, history, Wei
 from brownie import Contract
 
+from scripts.chain_state import ChainState, can_dump, content_key, fork_point, pinned_block
+from scripts.report import format_table
+from scripts.rpc_cache import RECORD, REPLAY, CachingProxy, RpcCache, resolve_upstream
+from scripts.scenario import ScenarioRunner
+
+# name: (collateral, comet, ethToWantFee)
+MARKETS = {
+    "WBTC/USDC": ("WBTC", "0xc3d688B66703497DAA19211EEdff47f25384cdc3", 3000),  # wbtc/eth .3% pool
+    "LINK/USDC": ("LINK", "0xc3d688B66703497DAA19211EEdff47f25384cdc3", 3000),
+    "wstETH/WETH": ("WSTETH", "0xA17581A9E3356d9A858b789D68B4d866e593aE94", 500),
+}
+DEFAULT_MARKET = "WBTC/USDC"
+
+GOV = "0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52"
+BALANCER_VAULT = "0xba12222222228d8ba445958a75a0704d566bf2c8"
+ETH_USD_FEED = "0x5f4eC3Df9cbd43714FE2740f5E3616155c5b8419"
+COMP_ETH_FEED = "0x1B39Ee86Ec5979ba5C322b826B3ECb8C79991699"
+
+# nodeid: {"market", "outcome", "gas"} for the summary
+_market_results = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--market",
+        default=DEFAULT_MARKET,
+        help="Comma separated markets to run against, or 'all'. Use with -n to run each in its own worker and chain",
+    )
+    parser.addoption("--rpc-cache", default=None, help="File the fork's RPC responses are recorded to or replayed from")
+    parser.addoption("--rpc-mode", default=REPLAY, choices=[RECORD, REPLAY])
+    parser.addoption("--rpc-block", default=None, type=int, help="Block to pin the fork to when recording, defaults to the latest")
+    parser.addoption(
+        "--chain-state",
+        default=None,
+        help="Directory the deployed vault and cloner of each market are dumped to and loaded from, needs an anvil fork pinned to a block",
+    )
+
+
+def pytest_configure(config):
+    # Put a caching proxy between the forked chain and its node before brownie launches it
+    path = config.getoption("rpc_cache")
+    if not path:
+        return
+    from brownie._config import CONFIG
+
+    mode = config.getoption("rpc_mode")
+    if mode == RECORD and hasattr(config, "workerinput"):
+        raise pytest.UsageError("record the rpc cache without -n, replaying works with it")
+
+    network = config.getoption("network", None) or CONFIG.settings["networks"]["default"]
+    settings = CONFIG.networks[network]["cmd_settings"]
+    upstream = resolve_upstream(settings["fork"], CONFIG.networks) if mode == RECORD else None
+    proxy = CachingProxy(RpcCache(path, config.getoption("rpc_block")), mode, upstream)
+    proxy.start()
+    settings["fork"] = proxy.fork_url
+    config.rpc_proxy = proxy
+
+
+def pytest_unconfigure(config):
+    proxy = getattr(config, "rpc_proxy", None)
+    if proxy is not None:
+        proxy.stop()
+
+
+def selected_markets(config):
+    option = config.getoption("market")
+    return list(MARKETS) if option == "all" else [name.strip() for name in option.split(",")]
+
+
+def pytest_generate_tests(metafunc):
+    # every test that uses the token runs once per market
+    if "market" in metafunc.fixturenames:
+        metafunc.parametrize("market", selected_markets(metafunc.config))
+
+
+def pytest_runtest_logreport(report):
+    # runs in the main process with xdist, from the reports the workers send back
+    result = _market_results.setdefault(report.nodeid, {"market": None, "outcome": "passed", "gas": 0})
+    if report.failed:
+        result["outcome"] = "failed" if report.when == "call" else "error"
+    elif report.skipped and report.when != "teardown":
+        result["outcome"] = "skipped"
+    properties = dict(report.user_properties)
+    if "market" in properties:
+        result["market"] = properties["market"]
+        result["gas"] = properties["gas_used"]
+
+
+def pytest_terminal_summary(terminalreporter):
+    summary = {}
+    for result in _market_results.values():
+        if result["market"] is None:
+            continue
+        row = summary.setdefault(
+            result["market"],
+            {"market": result["market"], "passed": 0, "failed": 0, "error": 0, "skipped": 0, "gas used": 0},
+        )
+        row[result["outcome"]] += 1
+        row["gas used"] += result["gas"]
+    if summary:
+        terminalreporter.write_sep("=", "markets")
+        terminalreporter.write_line(format_table(list(summary.values())))
+
+    proxy = getattr(terminalreporter.config, "rpc_proxy", None)
+    if proxy is not None:
+        cache = proxy.cache
+        terminalreporter.write_sep("=", f"rpc cache ({proxy.mode}, block {cache.block})")
+        terminalreporter.write_line(
+            f"{cache.hits} hits, {len(cache.misses)} misses, {proxy.upstream_requests} upstream requests"
+        )
+        if proxy.mode == REPLAY:
+            for key in cache.misses[:20]:
+                terminalreporter.write_line(f"miss: {key}")
+
+    status = getattr(terminalreporter.config, "chain_state_status", None)
+    if status is not None:
+        terminalreporter.write_sep("=", "chain state")
+        terminalreporter.write_line(status)
+
+
+@pytest.fixture(scope="session")
+def chain_state(request, pm, accounts, interface, CompV3LenderBorrowerCloner, Strategy, Depositer):
+    # market: addresses of its vault and cloner, set up once before the first test's snapshot so every
+    # test reverts back to them. Empty without --chain-state, then each test deploys its own
+    directory = request.config.getoption("chain_state")
+    if not directory:
+        yield {}
+        return
+
+    start = time.time()
+    markets = sorted(selected_markets(request.config))
+
+    def build():
+        return {
+            market: prepare_market(market, pm, accounts, interface, CompV3LenderBorrowerCloner, Strategy, Depositer)
+            for market in markets
+        }
+
+    if not can_dump():
+        # still only built once per session
+        deployed = build()
+        request.config.chain_state_status = f"built, the node can't dump its state, in {time.time() - start:.2f}s"
+        yield deployed
+        return
+
+    from brownie._config import CONFIG
+
+    block = pinned_block(CONFIG.active_network.get("cmd_settings", {}))
+    if block is None:
+        raise pytest.UsageError(
+            "--chain-state needs the fork pinned to a block, set fork_block on the network or use --rpc-cache"
+        )
+    key = content_key(Path(__file__).parent.parent, *markets, *fork_point(block))
+    state = ChainState(Path(directory) / f"{'+'.join(markets).replace('/', '-')}.json")
+    deployed = state.load(key)
+    if deployed is not None:
+        status = "loaded"
+    else:
+        deployed = build()
+        status = "built and dumped" if state.dump(key, deployed) else "built, the node failed to dump its state"
+    request.config.chain_state_status = f"{status} {state.path} in {time.time() - start:.2f}s"
+    yield deployed
+
+
+def prepare_market(market, pm, accounts, interface, CompV3LenderBorrowerCloner, Strategy, Depositer):
+    # What the vault, cloner, strategy, depositer and amount fixtures set up on every test
+    collateral, comet_address, ethToWantFee = MARKETS[market]
+    token = Contract(addresses[collateral])
+    comet = interface.Comet(comet_address)
+    gov = accounts.at(GOV, force=True)
+    rewards, guardian, management, strategist = accounts[1], accounts[2], accounts[3], accounts[4]
+
+    vault = deploy_vault(pm, token, gov, rewards, guardian, management)
+    cloner = deploy_cloner(strategist, CompV3LenderBorrowerCloner, vault, comet, ethToWantFee, token)
+    set_strategy_price_feeds(Strategy.at(cloner.originalStrategy()), comet)
+    set_depositer_price_feeds(Depositer.at(cloner.originalDepositer()), gov)
+    symbol = token.symbol()
+    token.transfer(whales[symbol], amounts[symbol], {"from": accounts.at(BALANCER_VAULT, force=True)})
+    return {"vault": vault.address, "cloner": cloner.address}
+
+
+@pytest.fixture
+def prepared(chain_state, market):
+    # the market's addresses from the chain state, None when this test deploys its own
+    yield chain_state.get(market)
+
 
 @pytest.fixture(autouse=True)
-def isolation(fn_isolation):
+def isolation(chain_state, fn_isolation):
     pass
 
+
+@pytest.fixture(autouse=True)
+def market_gas(isolation, request):
+    # Gas of every transaction in the test and its fixtures, reported per market in the summary.
+    # Read before the isolation reverts and drops them from the history
+    start = len(history)
+    yield
+    callspec = getattr(request.node, "callspec", None)
+    if callspec is not None and "market" in callspec.params:
+        request.node.user_properties.append(("market", callspec.params["market"]))
+        request.node.user_properties.append(
+            ("gas_used", sum(tx.gas_used or 0 for tx in history[start:]))
+        )
+
+
+@pytest.fixture
+def market():
+    yield DEFAULT_MARKET
+
 @pytest.fixture
 def gov(accounts):
-    yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+    yield accounts.at(GOV, force=True)
 
 
 @pytest.fixture
@@ -44,23 +252,26 @@ def keeper(accounts):
 amounts = {
     "WBTC": 5e8,  # binance14
     "WETH": 5e18,
+    "LINK": 1_000e18,
     "USDT": 10_000e18,  #
     "USDC": 10_000e18,
     "wstETH": 5e18
 }
 
 @pytest.fixture
-def amount(accounts, token, token_whale):
+def amount(accounts, token, token_whale, prepared):
     amount = amounts[token.symbol()]
     # In order to get some funds for the token you are about to use,
     # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0xba12222222228d8ba445958a75a0704d566bf2c8", force=True)
-    token.transfer(token_whale, amount, {"from": reserve})
+    # A prepared chain already funded the whale
+    if prepared is None:
+        reserve = accounts.at(BALANCER_VAULT, force=True)
+        token.transfer(token_whale, amount, {"from": reserve})
     yield amount
 
 @pytest.fixture
 def bal_vault(accounts):
-    yield accounts.at("0xba12222222228d8ba445958a75a0704d566bf2c8", force=True)
+    yield accounts.at(BALANCER_VAULT, force=True)
 
 
 @pytest.fixture
@@ -80,12 +291,9 @@ def comp():
     yield Contract("0xc00e94Cb662C3520282E6f5717214004A7f26888")
 
 @pytest.fixture
-def comet(interface, token, wstETH):
-    if token == wstETH:
-        yield interface.Comet("0xA17581A9E3356d9A858b789D68B4d866e593aE94")
-    else:
-        yield interface.Comet("0xc3d688B66703497DAA19211EEdff47f25384cdc3")
-        
+def comet(interface, market):
+    yield interface.Comet(MARKETS[market][1])
+
 
 @pytest.fixture
 def baseToken(comet):
@@ -101,11 +309,8 @@ def weth_whale(accounts):
     yield accounts.at("0x2F0b23f53734252Bda2277357e97e1517d6B042A", force=True)
 
 @pytest.fixture
-def ethToWantFee(token, wstETH):
-    if token == wstETH:
-        yield 500
-    else:
-        yield 3000 # wbtc/eth .3% pool
+def ethToWantFee(market):
+    yield MARKETS[market][2]
 
 addresses = {
     "WBTC": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",  # WBTC
@@ -115,12 +320,13 @@ addresses = {
     "USDT": "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
     "DAI": "0x6B175474E89094C44Da98b954EedeAC495271d0F",  # DAI
     "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",  # USDC
-    "WSTETH": "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0"
+    "WSTETH": "0x7f39C581F595B53c5cb19bD0b3f8dA6c935E2Ca0",
+    "COMP": "0xc00e94Cb662C3520282E6f5717214004A7f26888",
     }
 
 @pytest.fixture
-def token():
-    yield Contract(addresses["WBTC"])
+def token(market):
+    yield Contract(addresses[MARKETS[market][0]])
 
 whales = {
     "WBTC": "0x28c6c06298d514db089934071355e5743bf21d60",  # binance14
@@ -173,8 +379,7 @@ def live_vault(registry, token, wstETH, vault):
         yield Contract(registry.latestVault(token))
 
 
-@pytest.fixture
-def vault(pm, gov, rewards, guardian, management, token):
+def deploy_vault(pm, token, gov, rewards, guardian, management):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
     vault.initialize(token, gov, rewards, "", "", guardian, management, {"from": gov})
@@ -182,50 +387,79 @@ def vault(pm, gov, rewards, guardian, management, token):
     vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
     vault.setManagementFee(0, {"from": gov})
     vault.setPerformanceFee(0, {"from": gov})
-    yield vault
+    return vault
+
+
+def deploy_cloner(strategist, CompV3LenderBorrowerCloner, vault, comet, ethToWantFee, token):
+    baseToken = Contract(comet.baseToken())
+    return strategist.deploy(
+        CompV3LenderBorrowerCloner,
+        vault,
+        comet,
+        ethToWantFee,
+        f"Strategy{token.symbol()}Lender{baseToken.symbol()}Borrower",
+    )
+
+
+def set_strategy_price_feeds(strategy, comet):
+    if strategy.baseToken() != addresses["WETH"] or strategy.priceFeeds(addresses["COMP"]) == COMP_ETH_FEED:
+        return
+    # set reward price feed to be comp/eth
+    strategy.setPriceFeed(
+        addresses["COMP"],
+        COMP_ETH_FEED,
+        {"from": strategy.strategist()},
+    )
+    # set want to non-scaled version
+    bad_feed = Contract(comet.getAssetInfoByAddress(strategy.want())["priceFeed"])
+    strategy.setPriceFeed(
+        strategy.want(),
+        bad_feed.stETHtoETHPriceFeed(),
+        {"from": strategy.strategist()},
+    )
+
+
+def set_depositer_price_feeds(depositer, gov):
+    if depositer.baseToken() != addresses["WETH"] or depositer.baseTokenPriceFeed() == ETH_USD_FEED:
+        return
+    depositer.setPriceFeeds(
+        ETH_USD_FEED,
+        depositer.rewardTokenPriceFeed(),
+        {"from": gov}
+    )
+
 
 @pytest.fixture
-def weth_vault(pm, gov, rewards, guardian, management, weth):
-    Vault = pm(config["dependencies"][0]).Vault
-    vault = guardian.deploy(Vault)
-    vault.initialize(weth, gov, rewards, "", "", guardian, management, {"from": gov})
+def create_vault(pm, gov, rewards, guardian, management):
+    def create_vault(token):
+        return deploy_vault(pm, token, gov, rewards, guardian, management)
+
+    yield create_vault
 
-    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
-    vault.setManagementFee(0, {"from": gov})
-    vault.setPerformanceFee(0, {"from": gov})
-    yield vault
 
 @pytest.fixture
-def strategy(vault, Strategy, gov, cloner, comet, weth, comp):
+def vault(create_vault, token, pm, prepared):
+    if prepared is not None:
+        yield pm(config["dependencies"][0]).Vault.at(prepared["vault"])
+    else:
+        yield create_vault(token)
+
+@pytest.fixture
+def weth_vault(create_vault, weth):
+    yield create_vault(weth)
+
+@pytest.fixture
+def strategy(vault, Strategy, gov, cloner, comet):
     strategy = Strategy.at(cloner.originalStrategy())
     vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
     chain.mine()
-    if strategy.baseToken() == weth:
-        # set reward price feed to be comp/eth
-        strategy.setPriceFeed(
-            comp,
-            "0x1B39Ee86Ec5979ba5C322b826B3ECb8C79991699",
-            {"from": strategy.strategist()},
-        )
-        # set want to non-scaled version
-        bad_feed = Contract(comet.getAssetInfoByAddress(strategy.want())["priceFeed"])
-        good_feed = bad_feed.stETHtoETHPriceFeed()
-        strategy.setPriceFeed(
-            strategy.want(),
-            good_feed,
-            {"from": strategy.strategist()},
-        )
+    set_strategy_price_feeds(strategy, comet)
     yield strategy
 
 @pytest.fixture
-def depositer(cloner, Depositer, gov, weth):
+def depositer(cloner, Depositer, gov):
     depositer = Depositer.at(cloner.originalDepositer())
-    if depositer.baseToken() == weth:
-        depositer.setPriceFeeds(
-            "0x5f4eC3Df9cbd43714FE2740f5E3616155c5b8419",
-            depositer.rewardTokenPriceFeed(),
-            {"from": gov}
-        )
+    set_depositer_price_feeds(depositer, gov)
     yield depositer
 
 @pytest.fixture
@@ -241,14 +475,101 @@ def cloner(
     comet,
     ethToWantFee,
     token,
+    prepared,
+):
+    if prepared is not None:
+        yield CompV3LenderBorrowerCloner.at(prepared["cloner"])
+    else:
+        yield deploy_cloner(strategist, CompV3LenderBorrowerCloner, vault, comet, ethToWantFee, token)
+
+
+@pytest.fixture
+def clone_strategy(
+    cloner,
+    Strategy,
+    Depositer,
+    strategist,
+    rewards,
+    keeper,
+    gov,
+    comet,
+    ethToWantFee,
+    token,
     baseToken,
 ):
-    cloner = strategist.deploy(
-        CompV3LenderBorrowerCloner,
+    # Clones a new strategy and depositer for `vault` and adds it with `debt_ratio`.
+    # With `depositer` the strategy uses that shared depositer instead of a new one
+    def clone_strategy(vault, debt_ratio=0, keeper=keeper, immutable_args=False, depositer=None):
+        args = [
+            vault,
+            strategist,
+            rewards,
+            keeper,
+            comet,
+            ethToWantFee,
+            f"Strategy{token.symbol()}Lender{baseToken.symbol()}Borrower",
+        ]
+        if depositer is not None:
+            tx = cloner.cloneCompV3LenderBorrowerWithDepositer(*args, depositer, {"from": gov})
+            strategy = Strategy.at(tx.return_value)
+        else:
+            clone = (
+                cloner.cloneCompV3LenderBorrowerWithImmutableArgs
+                if immutable_args
+                else cloner.cloneCompV3LenderBorrower
+            )
+            tx = clone(*args, {"from": strategist})
+            strategy = Strategy.at(tx.return_value["newStrategy"])
+        set_depositer_price_feeds(Depositer.at(strategy.depositer()), gov)
+        set_strategy_price_feeds(strategy, comet)
+        vault.addStrategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 0, {"from": gov})
+        return strategy
+
+    yield clone_strategy
+
+
+@pytest.fixture
+def shared_depositer(SharedDepositer, strategist, comet, cloner, gov):
+    # Strategies cloned with it as `depositer` all supply their base token through it, gov clones them onto it
+    yield strategist.deploy(SharedDepositer, comet, cloner, gov)
+
+
+# Vaults can only hold 20 strategies
+STRATEGIES_PER_VAULT = 20
+
+
+@pytest.fixture
+def create_fleet(create_vault, clone_strategy, token, token_whale, gov, amount):
+    # Clones `size` strategies spread over as many vaults as needed and funds them all
+    def create_fleet(size, keeper, force_harvest=True):
+        strategies = []
+        while len(strategies) < size:
+            vault = create_vault(token)
+            batch = min(STRATEGIES_PER_VAULT, size - len(strategies))
+            for _ in range(batch):
+                strategy = clone_strategy(vault, 10_000 // batch, keeper)
+                if force_harvest:
+                    strategy.setForceHarvestTriggerOnce(True, {"from": gov})
+                strategies.append(strategy)
+
+            token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+            vault.deposit(int(amount) * batch // size, {"from": token_whale})
+        chain.sleep(1)
+        return strategies
+
+    yield create_fleet
+
+
+@pytest.fixture
+def scenario_runner(vault, strategy, comet, token, baseToken, token_whale, borrow_whale, gov):
+    yield ScenarioRunner(
         vault,
+        strategy,
         comet,
-        ethToWantFee,
-        f"Strategy{token.symbol()}Lender{baseToken.symbol()}Borrower",
+        token,
+        baseToken,
+        token_whale,
+        borrow_whale,
+        gov,
+        gov,
     )
-
-    yield cloner
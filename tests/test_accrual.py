@@ -0,0 +1,57 @@
+from collections import Counter
+
+from brownie import chain
+
+from scripts.report import print_report
+
+DAY = 24 * 60 * 60
+
+
+def accruals(tx, comet):
+    """Accounts comet was asked to accrue in `tx`, by accrueAccount or by a claim with shouldAccrue."""
+    counts = Counter()
+    for call in tx.subcalls:
+        function = call.get("function", "")
+        inputs = call.get("inputs", {})
+        if call["to"] == comet.address and function.startswith("accrueAccount"):
+            counts[inputs["account"]] += 1
+        elif function.startswith("claim(") and inputs.get("shouldAccrue"):
+            counts[inputs["src"]] += 1
+    return counts
+
+
+def test_accrued_once_per_timestamp(vault, strategy, depositer, comet, token, token_whale, gov, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    rows = []
+    for action in ["harvest", "tend", "withdraw"]:
+        chain.sleep(DAY)
+        chain.mine(1)
+        if action == "withdraw":
+            tx = vault.withdraw(vault.balanceOf(token_whale) // 2, token_whale, 10_000, {"from": token_whale})
+        else:
+            tx = getattr(strategy, action)({"from": gov})
+
+        counts = accruals(tx, comet)
+        assert counts[strategy.address] <= 1
+        assert counts[depositer.address] <= 1
+        rows.append(
+            {
+                "action": action,
+                "gas": tx.gas_used,
+                "strategy accruals": counts[strategy.address],
+                "depositer accruals": counts[depositer.address],
+            }
+        )
+    print_report("Explicit accruals per transaction", rows)
+
+
+def test_accrued_comet_balance(depositer, comet, gov):
+    # a new timestamp always accrues first
+    chain.sleep(DAY)
+    tx = depositer.accruedCometBalance({"from": gov})
+    assert tx.return_value == comet.balanceOf(depositer)
+    assert accruals(tx, comet)[depositer.address] == 1
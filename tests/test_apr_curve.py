@@ -0,0 +1,46 @@
+import pytest
+
+from scripts.apr_curve import APR_SCALE, get_curve, get_curves, utilization_grid
+from scripts.report import print_report
+
+
+def test_curve_matches_point_getters(depositer, comet):
+    supply = comet.totalSupply()
+    amounts = [0, supply // 100, supply // 10, supply]
+    curve = get_curve(depositer, amounts, by="amount")
+
+    for i, amount in enumerate(amounts):
+        net_borrow = depositer.getNetBorrowApr(amount)
+        net_reward = depositer.getNetRewardApr(amount)
+        assert curve.supply_reward_aprs[i] == depositer.getRewardAprForSupplyBase(amount) / APR_SCALE
+        assert curve.borrow_reward_aprs[i] == depositer.getRewardAprForBorrowBase(amount) / APR_SCALE
+        assert curve.borrow_aprs[i] - curve.supply_aprs[i] == pytest.approx(net_borrow / APR_SCALE, abs=1e-12)
+        assert curve.net_aprs[i] == pytest.approx((net_reward - net_borrow) / APR_SCALE, abs=1e-12)
+
+    grid = utilization_grid(11)
+    curve = get_curve(depositer, grid)
+    for i, utilization in enumerate(grid):
+        assert curve.utilizations[i] == pytest.approx(utilization / APR_SCALE, abs=1e-12)
+        assert curve.supply_aprs[i] == depositer.getSupplyApr(utilization) / APR_SCALE
+        assert curve.borrow_aprs[i] == depositer.getBorrowApr(utilization) / APR_SCALE
+    # rates only go up with utilization
+    assert all(a <= b for a, b in zip(curve.borrow_aprs, curve.borrow_aprs[1:]))
+
+
+def test_curve_gas(depositer):
+    grid = utilization_grid(101)
+    curve_gas = depositer.getAprCurveAtUtilizations.estimate_gas(grid)
+    # what the same points cost one call at a time, without the 21k per transaction
+    point_gas = sum(
+        depositer.getSupplyApr.estimate_gas(u) + depositer.getBorrowApr.estimate_gas(u) - 2 * 21_000
+        for u in grid
+    )
+    # the whole curve costs less than half its points fetched one at a time
+    assert curve_gas < point_gas // 2
+
+    curve = get_curves([depositer], grid)[0]
+    print_report("APR curve", curve.rows()[::10])
+    print_report(
+        "APR curve gas",
+        [{"points": len(grid), "one call": curve_gas, "point getters": point_gas, "breakeven": curve.breakeven()}],
+    )
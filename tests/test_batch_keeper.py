@@ -0,0 +1,103 @@
+import pytest
+from brownie import chain, reverts, web3
+
+from scripts.report import print_report
+
+# Gas left over a first harvest of a funded clone, so a batch stops before one it can't finish
+MIN_GAS_LEFT = 1_500_000
+
+
+@pytest.fixture
+def batch_keeper(BatchKeeper, gov, keeper):
+    batch_keeper = gov.deploy(BatchKeeper)
+    batch_keeper.setKeeper(keeper, True, {"from": gov})
+    yield batch_keeper
+
+
+def test_work_only_needed(batch_keeper, create_fleet, keeper, gov):
+    strategies = create_fleet(3, batch_keeper)
+    # Harvest one strategy by hand so its trigger is off
+    strategies[0].harvest({"from": gov})
+
+    assert list(batch_keeper.workable(strategies, 0)) == [0, 1, 1]
+
+    tx = batch_keeper.work(strategies, 0, 0, {"from": keeper})
+    assert tx.return_value == (2, 3)
+    assert len(tx.events["Worked"]) == 2
+    for strategy in strategies:
+        assert strategy.estimatedTotalAssets() > 0
+
+
+def test_work_isolates_failures(batch_keeper, create_fleet, keeper, gov, strategist):
+    strategies = create_fleet(3, batch_keeper)
+    # The batch keeper is no longer authorized on the middle strategy so its harvest reverts
+    strategies[1].setKeeper(strategist, {"from": gov})
+
+    tx = batch_keeper.work(strategies, 0, 0, {"from": keeper})
+    assert tx.return_value == (2, 3)
+
+    results = {event["strategy"]: event["success"] for event in tx.events["Worked"]}
+    assert results == {
+        strategies[0].address: True,
+        strategies[1].address: False,
+        strategies[2].address: True,
+    }
+    assert strategies[1].estimatedTotalAssets() == 0
+
+
+def test_work_stops_at_gas_budget(batch_keeper, create_fleet, keeper):
+    strategies = create_fleet(3, batch_keeper)
+
+    tx = batch_keeper.work(strategies, 0, 10_000_000, {"from": keeper, "gas_limit": 9_000_000})
+    assert tx.return_value == (0, 0)
+    assert list(batch_keeper.workable(strategies, 0)) == [1, 1, 1]
+
+
+def test_work_access(batch_keeper, create_fleet, user):
+    strategies = create_fleet(1, batch_keeper)
+
+    with reverts("!authorized"):
+        batch_keeper.work(strategies, 0, 0, {"from": user})
+
+    with reverts("!authorized"):
+        batch_keeper.setKeeper(user, True, {"from": user})
+
+
+@pytest.mark.parametrize("size", [1, 5, 20, 50])
+def test_batch_gas(batch_keeper, create_fleet, keeper, gov, size):
+    strategies = create_fleet(size, batch_keeper)
+
+    # Baseline is a standalone harvest transaction of an identical strategy
+    single = create_fleet(1, batch_keeper)[0]
+    baseline = single.harvest({"from": gov}).gas_used
+
+    # Big fleets don't fit in one block, so send batches the way a keeper would: as many
+    # strategies as the block takes, then the rest from where the last batch stopped
+    gas_limit = web3.eth.get_block("latest")["gasLimit"]
+    txs = []
+    done = 0
+    while done < size:
+        tx = batch_keeper.work(strategies[done:], 0, MIN_GAS_LEFT, {"from": keeper, "gas_limit": gas_limit})
+        worked, checked = tx.return_value
+        # every batch makes progress and works every strategy it checked
+        assert checked > 0
+        assert worked == checked
+        done += checked
+        txs.append(tx)
+
+    total = sum(tx.gas_used for tx in txs)
+    per_strategy = total // size
+    print_report(
+        "Batch harvest gas",
+        [
+            {
+                "batch size": size,
+                "transactions": len(txs),
+                "total gas": total,
+                "gas per strategy": per_strategy,
+                "single harvest tx": baseline,
+                "saved per strategy": baseline - per_strategy,
+            }
+        ],
+    )
+    assert all(tx.gas_used <= gas_limit for tx in txs)
@@ -1,5 +1,7 @@
 import pytest
-from brownie import chain, Wei, reverts, Contract
+from brownie import chain, Wei, reverts, Contract, web3
+
+from scripts.report import print_report
 
 def test_clone(
     vault,
@@ -203,3 +205,107 @@ def print_strat_status(strat, v, decimal):
     print(f"made up of {strat.balanceOfDebt()/(10**decimal)} of debt owed")
     print(f"made up of {strat.balanceOfDepositer()/(10**decimal)} of yvault assets")
     print(f"For a total base token owed bal of {strat.baseTokenOwedBalance()/(10**decimal)}")
+
+
+def test_clone_with_immutable_args(
+    create_vault,
+    clone_strategy,
+    Depositer,
+    comet,
+    baseToken,
+    token,
+    token_whale,
+    gov,
+    amount,
+):
+    vault = create_vault(token)
+    strategy = clone_strategy(vault, 10_000, immutable_args=True)
+    depositer = Depositer.at(strategy.depositer())
+
+    # comet, baseToken and depositer live in the proxies' code, not in storage
+    assert len(web3.eth.get_code(strategy.address)) == 54 + 3 * 20
+    assert len(web3.eth.get_code(depositer.address)) == 54 + 2 * 20
+    assert strategy.comet() == comet
+    assert strategy.baseToken() == baseToken
+    assert depositer.comet() == comet
+    assert depositer.baseToken() == baseToken
+    assert depositer.strategy() == strategy
+
+    # should fail due to already initialized
+    with reverts():
+        strategy.initialize(vault, comet, 3000, depositer, "NameRevert", {"from": gov})
+    with reverts():
+        depositer.initialize(comet, {"from": gov})
+    with reverts():
+        depositer.cloneDepositerWithImmutableArgs(comet, {"from": gov})
+
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    assert strategy.balanceOfDebt() > 0
+    assert depositer.cometBalance() > 0
+
+    chain.sleep(60 * 60 * 24)
+    chain.mine(1)
+    strategy.harvest({"from": gov})
+    assert vault.strategies(strategy)["totalGain"] > 0
+    assert vault.strategies(strategy)["totalLoss"] == 0
+
+    vault.updateStrategyDebtRatio(strategy, 0, {"from": gov})
+    strategy.harvest({"from": gov})
+    assert strategy.balanceOfDebt() == 0
+    assert vault.strategies(strategy)["totalDebt"] == 0
+
+
+def test_immutable_args_gas(
+    create_vault,
+    clone_strategy,
+    cloner,
+    strategist,
+    rewards,
+    keeper,
+    comet,
+    ethToWantFee,
+    token,
+    token_whale,
+    gov,
+    amount,
+):
+    rows = []
+    for immutable_args in [False, True]:
+        clone = (
+            cloner.cloneCompV3LenderBorrowerWithImmutableArgs
+            if immutable_args
+            else cloner.cloneCompV3LenderBorrower
+        )
+        deploy_gas = clone(
+            create_vault(token), strategist, rewards, keeper, comet, ethToWantFee, "Gas", {"from": strategist}
+        ).gas_used
+
+        vault = create_vault(token)
+        strategy = clone_strategy(vault, 10_000, immutable_args=immutable_args)
+        token.approve(vault, amount, {"from": token_whale})
+        vault.deposit(amount, {"from": token_whale})
+        chain.sleep(1)
+        first_harvest = strategy.harvest({"from": gov}).gas_used
+
+        chain.sleep(60 * 60 * 24)
+        chain.mine(1)
+        rows.append(
+            {
+                "clone": "immutable args" if immutable_args else "EIP-1167",
+                "deploy": deploy_gas,
+                "harvestTrigger": strategy.harvestTrigger.estimate_gas(0),
+                "tendTrigger": strategy.tendTrigger.estimate_gas(0),
+                "estimatedTotalAssets": strategy.estimatedTotalAssets.estimate_gas(),
+                "first harvest": first_harvest,
+                "harvest": strategy.harvest({"from": gov}).gas_used,
+                "tend": strategy.tend({"from": gov}).gas_used,
+            }
+        )
+
+    print_report("Clone gas", rows)
+    # Every call skips the cold storage reads of comet, baseToken and depositer
+    assert rows[1]["harvest"] < rows[0]["harvest"]
+    assert rows[1]["tend"] < rows[0]["tend"]
@@ -0,0 +1,124 @@
+import pytest
+from brownie import chain
+
+from scripts.decisions import LOG_GAS, decode, from_tx, get_decisions
+from scripts.report import print_report
+
+
+def test_decode():
+    action = 1 | (2 | 4) << 8 | 5 * 10 ** 17 << 16 | 6 * 10 ** 17 << 80 | 123 << 144
+    decision = decode(action, 7 | 8 << 128)
+    assert decision.regime == "borrow"
+    assert decision.caps == ["protocol liquidity", "borrow apr"]
+    assert decision.ltv_before == 5 * 10 ** 17
+    assert decision.ltv_after == 6 * 10 ** 17
+    assert decision.amount == 123
+    assert decision.borrow_apr == 7
+    assert decision.reward_apr == 8
+
+    # withdrawals don't log LTVs
+    withdraw = decode(4 | 16 << 8 | 123 << 144, 0)
+    assert withdraw.regime == "withdraw"
+    assert withdraw.caps == ["max withdrawal"]
+    assert withdraw.ltv_before is None and withdraw.ltv_after is None
+    assert withdraw.amount == 123
+
+
+def test_borrow_and_withdraw_decisions(vault, strategy, token, token_whale, gov, amount):
+    start = chain.height
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+
+    tx = strategy.harvest({"from": gov})
+    (borrow,) = from_tx(tx)
+    print(borrow.explain())
+    assert borrow.regime == "borrow"
+    assert borrow.ltv_before == 0
+    assert borrow.ltv_after == strategy.getCurrentLTV()
+    assert borrow.amount == pytest.approx(strategy.balanceOfDebt(), abs=1)
+    assert borrow.reward_apr >= borrow.borrow_apr
+
+    # Target under and warning over the current LTV is the healthy range
+    strategy.setStrategyParams(5_000, 8_000, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    (hold,) = from_tx(strategy.tend({"from": gov}))
+    assert hold.regime == "hold"
+    assert hold.amount == 0
+
+    debt = strategy.balanceOfDebt()
+    tx = vault.withdraw(vault.balanceOf(token_whale) // 2, token_whale, 10_000, {"from": token_whale})
+    (withdraw,) = from_tx(tx)
+    print(withdraw.explain())
+    assert withdraw.regime == "withdraw"
+    assert withdraw.amount == pytest.approx(debt - strategy.balanceOfDebt(), rel=1e-3)
+
+    # The indexer path sees the same events from raw logs
+    logged = get_decisions([strategy], start + 1)
+    assert [d.regime for d in logged] == ["borrow", "hold", "withdraw"]
+    assert logged[0].amount == borrow.amount
+
+
+def test_repay_decision(vault, strategy, token, token_whale, gov, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    # Lower the warning LTV under the current one so the next tend repays
+    strategy.setStrategyParams(3_000, 4_000, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    (repay,) = from_tx(strategy.tend({"from": gov}))
+    assert repay.regime == "repay"
+    assert repay.amount > 0
+    assert repay.ltv_after < repay.ltv_before
+
+
+def test_decision_gas(
+    vault, strategy, depositer, StrategyWithoutDecisions, Depositer, create_vault, comet, ethToWantFee, token, baseToken,
+    comp, token_whale, strategist, gov, amount,
+):
+    # The same strategy without the events, on its own vault and depositer
+    other_vault = create_vault(token)
+    other_depositer = Depositer.at(depositer.cloneDepositer(comet, {"from": strategist}).return_value)
+    without = strategist.deploy(StrategyWithoutDecisions, other_vault, comet, ethToWantFee, other_depositer, "Without")
+    other_depositer.setStrategy(without, {"from": strategist})
+    without.setStrategyParams(
+        strategy.targetLTVMultiplier(), strategy.warningLTVMultiplier(), strategy.minToSell(), False,
+        strategy.maxGasPriceToTend(), {"from": gov},
+    )
+    for asset in (token, baseToken, comp):
+        without.setPriceFeed(asset, strategy.priceFeeds(asset), {"from": gov})
+    other_depositer.setPriceFeeds(depositer.baseTokenPriceFeed(), depositer.rewardTokenPriceFeed(), {"from": gov})
+    other_vault.addStrategy(without, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+
+    pairs = [(vault, strategy), (other_vault, without)]
+    for v, _ in pairs:
+        token.approve(v, 2 ** 256 - 1, {"from": token_whale})
+        v.deposit(amount // 2, {"from": token_whale})
+    chain.sleep(1)
+
+    steps = {
+        "harvest": lambda v, s: s.harvest({"from": gov}),
+        "tend": lambda v, s: s.tend({"from": gov}),
+        # everything is invested so this goes through liquidatePosition
+        "withdraw": lambda v, s: v.withdraw(v.balanceOf(token_whale) // 10, token_whale, 10_000, {"from": token_whale}),
+    }
+    rows = []
+    for name, step in steps.items():
+        logged, silent = [step(v, s) for v, s in pairs]
+        assert from_tx(silent) == []
+        rows.append(
+            {
+                "tx": name,
+                "events": len(from_tx(logged)),
+                "gas used": logged.gas_used,
+                "without events": silent.gas_used,
+                "overhead": logged.gas_used - silent.gas_used,
+            }
+        )
+    print_report("Decision event gas", rows)
+
+    overhead = {row["tx"]: row["overhead"] for row in rows}
+    # a vault withdrawal only pays for the log, no LTV reads
+    assert 0 < overhead["withdraw"] <= LOG_GAS + 1_000
+    # harvests and tends also read the LTV after
+    assert overhead["harvest"] > overhead["withdraw"]
@@ -0,0 +1,43 @@
+from brownie import Strategy, history
+
+from scripts.exit_planner import discover, execute, on_comet, plan
+from scripts.report import print_report
+
+
+def test_exit_fleet(create_fleet, cloner, comet, keeper, gov):
+    strategies = create_fleet(3, keeper)
+    for strategy in strategies:
+        strategy.harvest({"from": gov})
+    # bring one close to its warning LTV so it goes first
+    risky = strategies[1]
+    risky.setStrategyParams(7_000, 7_100, risky.minToSell(), False, risky.maxGasPriceToTend(), {"from": gov})
+
+    found = on_comet(comet, discover(cloner))
+    assert {s.address for s in strategies} <= {s.address for s in found}
+
+    sent_before = len(history)
+    plans = plan(strategies, gov)
+    print_report("Exit plan", [p.row() for p in plans])
+
+    assert plans[0].strategy == risky.address
+    for p in plans:
+        assert p.error is None
+        assert p.exit_gas > 0 and p.harvest_gas > 0
+        assert p.expected_freed > 0
+        assert p.liquidity_short == False
+    # simulating left no trace
+    assert not any(s.emergencyExit() for s in strategies)
+    assert len(history) == sent_before
+
+    sent = execute(plans, gov)
+    assert [p.strategy for p, _, _ in sent] == [p.strategy for p in plans]
+
+    # mined in rank order
+    positions = [(tx.block_number, tx.txindex) for _, _, tx in sent]
+    assert positions == sorted(positions)
+    for p, exit_tx, harvest_tx in sent:
+        strategy = Strategy.at(p.strategy)
+        assert exit_tx.status == 1 and harvest_tx.status == 1
+        assert strategy.emergencyExit()
+        assert strategy.estimatedTotalAssets() < p.assets // 100
+        assert harvest_tx.events["Harvested"]["debtPayment"] >= p.expected_freed * 0.99
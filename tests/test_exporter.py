@@ -0,0 +1,75 @@
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from brownie import chain
+
+from scripts.exporter import MetricsExporter, parse_metrics
+
+
+def scrape(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+
+def wait_for_block(exporter, block, timeout=30):
+    deadline = time.time() + timeout
+    while exporter.block != block:
+        assert time.time() < deadline, "exporter did not refresh"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def exporter(create_fleet, keeper):
+    strategies = create_fleet(3, keeper)
+    exporter = MetricsExporter(strategies, port=0, poll_interval=0.05)
+    exporter.start()
+    yield exporter
+    exporter.stop()
+
+
+def test_metrics(exporter, gov):
+    strategies = exporter.strategies
+    metrics = parse_metrics(scrape(exporter.url))
+
+    assert metrics[("compv3_exporter_block", None)] == chain.height
+    assert metrics[("compv3_exporter_refresh_seconds", None)] > 0
+    for strategy in strategies:
+        address = strategy.address
+        assert metrics[("compv3_strategy_harvest_trigger", address)] == 1
+        assert metrics[("compv3_strategy_ltv", address)] == 0
+        assert metrics[("compv3_strategy_target_ltv", address)] > 0
+        assert (
+            metrics[("compv3_strategy_warning_ltv", address)]
+            > metrics[("compv3_strategy_target_ltv", address)]
+        )
+
+    strategies[0].harvest({"from": gov})
+    wait_for_block(exporter, chain.height)
+    metrics = parse_metrics(scrape(exporter.url))
+
+    address = strategies[0].address
+    assert metrics[("compv3_strategy_harvest_trigger", address)] == 0
+    assert metrics[("compv3_strategy_ltv", address)] > 0
+    assert metrics[("compv3_strategy_debt", address)] > 0
+    assert metrics[("compv3_strategy_depositer_balance", address)] > 0
+    assert metrics[("compv3_strategy_estimated_total_assets", address)] > 0
+    assert metrics[("compv3_strategy_net_reward_apr", address)] > 0
+
+
+def test_one_refresh_per_block(exporter):
+    refreshes = exporter.refreshes
+    with ThreadPoolExecutor(8) as pool:
+        pages = list(pool.map(scrape, [exporter.url] * 32))
+
+    # Every scraper got the cached block, none caused a refresh
+    assert exporter.refreshes == refreshes
+    blocks = {parse_metrics(page)[("compv3_exporter_block", None)] for page in pages}
+    assert blocks == {exporter.block}
+    assert parse_metrics(scrape(exporter.url))[("compv3_exporter_scrapes_total", None)] == 33
+
+    chain.mine(3)
+    wait_for_block(exporter, chain.height)
+    # Polling may see the intermediate blocks or skip straight to the last one
+    assert refreshes < exporter.refreshes <= refreshes + 3
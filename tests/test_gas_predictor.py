@@ -0,0 +1,92 @@
+from brownie import chain
+
+from scripts.gas_predictor import FEATURES, GasModel, Snapshot, accuracy, branches, calibrate, predict_many
+from scripts.report import print_report
+
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+
+
+def make_snapshot(**kwargs):
+    values = dict(
+        strategy="0x0000000000000000000000000000000000000000",
+        want="0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599",
+        base_token="0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+        want_balance=0,
+        collateral=100,
+        debt=60,
+        depositer=60,
+        base_balance=0,
+        ltv=6 * 10 ** 17,
+        target_ltv=6 * 10 ** 17,
+        warning_ltv=7 * 10 ** 17,
+        idle_buffer_bps=0,
+        borrow_apr=1,
+        reward_apr=2,
+        comp=0,
+        min_to_sell=10,
+        rewards_in_want=0,
+        trade_factory=False,
+        emergency_exit=False,
+        total_debt=100,
+        debt_outstanding=0,
+        credit_available=0,
+    )
+    values.update(kwargs)
+    return Snapshot(**values)
+
+
+def ran(features):
+    return {name for name in FEATURES if features[name]}
+
+
+def test_branches():
+    # at target nothing but the call itself runs
+    assert ran(branches(make_snapshot(), "tend")) == {"tend"}
+    assert ran(branches(make_snapshot(ltv=5 * 10 ** 17), "tend")) == {"tend", "borrow"}
+    assert ran(branches(make_snapshot(ltv=8 * 10 ** 17), "tend")) == {"tend", "repay"}
+    assert ran(branches(make_snapshot(borrow_apr=3), "tend")) == {"tend", "repay", "withdraw"}
+
+    # rewards are sold through WETH unless want is WETH
+    features = branches(make_snapshot(comp=100, rewards_in_want=9), "harvest")
+    assert features["swaps"] == 2
+    assert branches(make_snapshot(comp=100, rewards_in_want=9, want=WETH), "harvest")["swaps"] == 1
+    assert branches(make_snapshot(comp=100, trade_factory=True), "harvest")["swaps"] == 0
+    # the vault takes the profit so nothing is supplied
+    assert ran(features) == {"harvest", "swaps"}
+
+    # paying the vault back pulls collateral and repays
+    features = branches(make_snapshot(debt_outstanding=50), "harvest")
+    assert features["withdraw"] and features["repay"]
+    assert ran(branches(make_snapshot(credit_available=50), "harvest")) == {"harvest", "supply", "borrow"}
+
+
+def test_calibrated_prediction(vault, strategy, token, token_whale, gov, amount):
+    samples = calibrate(vault, strategy, token_whale, gov, amount)
+    model = GasModel.fit(samples)
+    print(model.costs)
+
+    rows = [
+        {
+            "action": s.action,
+            "predicted": "+".join(sorted(ran(s.predicted))),
+            "ran": "+".join(sorted(ran(s.observed))),
+            "gas used": s.gas_used,
+            "prediction": model.gas(s.predicted),
+        }
+        for s in samples
+    ]
+    print_report("Calibration samples", rows)
+    accuracy_rows = accuracy(model, samples)
+    print_report("Gas predictor accuracy", accuracy_rows)
+
+    for row in accuracy_rows:
+        assert row["table error mean"] < 0.1
+        assert row["branches right"] >= 0.75
+
+    # the prediction from the current state is close to what estimate_gas simulates
+    vault.deposit(amount // 10, {"from": token_whale})
+    chain.sleep(1)
+    predicted = predict_many([strategy], model)[strategy.address]
+    estimated = strategy.harvest.estimate_gas({"from": gov})
+    print(f"harvest predicted {predicted['harvest']:,} estimated {estimated:,}")
+    assert abs(predicted["harvest"] - estimated) / estimated < 0.2
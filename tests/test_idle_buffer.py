@@ -0,0 +1,79 @@
+import pytest
+from brownie import chain, reverts
+
+from scripts.decisions import from_tx
+from scripts.report import print_report
+
+BUFFER_BPS = 1_000
+
+
+def invest(vault, strategy, token, token_whale, gov, amount, buffer_bps):
+    strategy.setIdleBuffer(buffer_bps, {"from": gov})
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+
+def test_buffer_serves_small_withdrawals(vault, strategy, token, token_whale, gov, amount, RELATIVE_APPROX):
+    invest(vault, strategy, token, token_whale, gov, amount, BUFFER_BPS)
+
+    buffer = strategy.balanceOfWant()
+    assert buffer == pytest.approx(amount * BUFFER_BPS / 10_000, rel=1e-3)
+    assert strategy.balanceOfDebt() > 0
+
+    # A withdrawal smaller than the buffer never reaches comet
+    collateral = strategy.balanceOfCollateral()
+    before = token.balanceOf(token_whale)
+    tx = vault.withdraw(vault.balanceOf(token_whale) // 20, token_whale, 10_000, {"from": token_whale})
+    assert from_tx(tx) == []
+    assert strategy.balanceOfCollateral() == collateral
+    assert token.balanceOf(token_whale) - before == pytest.approx(amount // 20, rel=RELATIVE_APPROX)
+    # over half the buffer is left
+    assert strategy.tendTrigger(0) == False
+
+    # Once it is drained below half the keeper is asked to refill it
+    vault.withdraw(vault.balanceOf(token_whale) // 20, token_whale, 10_000, {"from": token_whale})
+    assert strategy.balanceOfWant() < buffer // 2
+    assert strategy.tendTrigger(0) == True
+
+    # The next tend tops it back up from collateral, repaying the debt it backed first
+    debt = strategy.balanceOfDebt()
+    strategy.tend({"from": gov})
+    total = strategy.balanceOfWant() + strategy.balanceOfCollateral()
+    assert strategy.balanceOfWant() == pytest.approx(total * BUFFER_BPS / 10_000, rel=1e-3)
+    assert strategy.balanceOfCollateral() < collateral
+    assert strategy.balanceOfDebt() < debt
+
+
+def test_set_idle_buffer(strategy, gov, user):
+    with reverts():
+        strategy.setIdleBuffer(BUFFER_BPS, {"from": user})
+    with reverts():
+        strategy.setIdleBuffer(10_001, {"from": gov})
+
+    strategy.setIdleBuffer(BUFFER_BPS, {"from": gov})
+    assert strategy.idleBufferBps() == BUFFER_BPS
+
+
+@pytest.mark.parametrize("buffer_bps", [0, BUFFER_BPS])
+@pytest.mark.parametrize("withdraw_bps", [10, 100, 500, 2_000])
+def test_withdraw_gas(vault, strategy, token, token_whale, gov, amount, buffer_bps, withdraw_bps):
+    invest(vault, strategy, token, token_whale, gov, amount, buffer_bps)
+
+    shares = vault.balanceOf(token_whale) * withdraw_bps // 10_000
+    tx = vault.withdraw(shares, token_whale, 10_000, {"from": token_whale})
+
+    print_report(
+        "Withdrawal gas",
+        [
+            {
+                "buffer bps": buffer_bps,
+                "withdraw bps": withdraw_bps,
+                "gas": tx.gas_used,
+                "touched comet": len(from_tx(tx)) > 0,
+            }
+        ],
+    )
+    if withdraw_bps < buffer_bps:
+        assert from_tx(tx) == []
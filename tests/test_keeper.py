@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+from brownie import chain
+
+from scripts.fleet import Health, read_health
+from scripts.keeper import Keeper, next_check_delay
+
+
+def make_health(ltv):
+    return Health(
+        strategy="0x0000000000000000000000000000000000000000",
+        block=0,
+        collateral=1,
+        debt=1,
+        ltv=ltv,
+        liquidation_ltv=10 ** 18,
+        target_ltv=7 * 10 ** 17,
+        warning_ltv=8 * 10 ** 17,
+    )
+
+
+def test_next_check_delay():
+    # healthy or under levered positions wait the longest
+    assert next_check_delay(make_health(5 * 10 ** 17), 1, 100) == 100
+    assert next_check_delay(make_health(7 * 10 ** 17), 1, 100) == 100
+    # halfway between target and warning
+    assert next_check_delay(make_health(75 * 10 ** 16), 1, 100) == 50
+    # over warning is checked every block
+    assert next_check_delay(make_health(8 * 10 ** 17), 1, 100) == 1
+    assert next_check_delay(make_health(9 * 10 ** 17), 1, 100) == 1
+
+
+def test_keeper_end_to_end(create_fleet, create_vault, clone_strategy, keeper, token):
+    strategies = create_fleet(3, keeper)
+    # no debt ratio so neither trigger fires
+    idle = clone_strategy(create_vault(token), 0)
+
+    stop = threading.Event()
+
+    # the dev chain only mines on transactions so keep producing blocks
+    def mine():
+        while not stop.is_set():
+            chain.mine(1)
+            time.sleep(0.2)
+
+    miner = threading.Thread(target=mine, daemon=True)
+    miner.start()
+    daemon = Keeper(strategies + [idle], keeper, workers=2, max_blocks=5, poll_interval=0.1)
+    try:
+        asyncio.run(daemon.run(stop_block=chain.height + 10))
+    finally:
+        stop.set()
+        miner.join()
+
+    harvested = {address for address, action, _ in daemon.sent if action == "harvest"}
+    assert harvested == {s.address for s in strategies}
+    assert daemon.failed == []
+
+    for strategy in strategies:
+        assert strategy.estimatedTotalAssets() > 0
+        assert daemon.health[strategy.address].headroom > 0
+    assert idle.estimatedTotalAssets() == 0
+
+    # positions are levered up to target after the harvest
+    for health in read_health(strategies):
+        assert health.ltv > 0
+        assert health.ltv < health.warning_ltv
@@ -0,0 +1,44 @@
+from scripts.load_test import HOUR, LoadProfile, LoadTest
+from scripts.scenario import Deposit, Harvest, Tend
+
+
+def test_schedule():
+    profile = LoadProfile(users=10, days=2, deposits_per_hour=4, withdrawals_per_hour=2, seed=1)
+    events = profile.schedule()
+    # the same seed replays the same arrivals
+    assert events == profile.schedule()
+
+    times = [at for at, _, _ in events]
+    assert times == sorted(times)
+    assert 0 <= times[0] and times[-1] <= 2 * 24 * HOUR
+    assert sum(isinstance(step, Harvest) for _, _, step in events) == 2
+    # the tend check is skipped when the keeper harvests
+    assert sum(isinstance(step, Tend) for _, _, step in events) == 2 * 24 - 2
+    assert all(0 <= user < 10 for _, user, step in events if isinstance(step, Deposit))
+
+
+def test_load(vault, strategy, token, token_whale, gov, amount):
+    profile = LoadProfile(
+        users=20,
+        days=2,
+        deposits_per_hour=1,
+        withdrawals_per_hour=0.5,
+        deposit_size=amount // 100,
+        tend_interval=6 * HOUR,
+        seed=1,
+    )
+    test = LoadTest(vault, strategy, token, token_whale, gov, profile)
+    test.create_users()
+    test.run()
+    test.report()
+
+    rows = {row["operation"]: row for row in test.operation_rows()}
+    assert rows["Deposit"]["reverted"] == 0
+    assert rows["Harvest"]["count"] == 2
+    assert rows["Harvest"]["mean gas"] > 0
+    summary = test.summary()
+    assert summary["operations"] == len(test.records)
+    # once invested, withdrawals bigger than what is idle go through liquidatePosition
+    assert summary["withdrawals from strategy"] > 0
+    # no fees, so every share is held by a user
+    assert sum(vault.balanceOf(user) for user in test.users) == vault.totalSupply()
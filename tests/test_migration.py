@@ -56,3 +56,108 @@ def test_migration(
     assert vault.strategies(strategy).dict()["totalDebt"] == 0
     assert vault.strategies(strategy2).dict()["totalDebt"] > 0
     assert vault.strategies(strategy2).dict()["debtRatio"] == old_debt_ratio
+
+
+def clone_new_strategy(Strategy, cloner, vault, strategist, comet, ethToWantFee):
+    return Strategy.at(
+        cloner.cloneCompV3LenderBorrower(
+            vault,
+            strategist,
+            strategist,
+            strategist,
+            comet,
+            ethToWantFee,
+            "name",
+        ).return_value["newStrategy"]
+    )
+
+
+def test_migration_transfers_position(
+    vault,
+    strategy,
+    Strategy,
+    gov,
+    token,
+    token_whale,
+    baseToken,
+    borrow_whale,
+    depositer,
+    cloner,
+    strategist,
+    amount,
+    comet,
+    ethToWantFee,
+    RELATIVE_APPROX,
+):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    chain.sleep(60 * 60 * 24 * 2)
+    chain.mine(1)
+
+    strategy2 = clone_new_strategy(Strategy, cloner, vault, strategist, comet, ethToWantFee)
+    old_debt_ratio = vault.strategies(strategy).dict()["debtRatio"]
+    collateral = strategy.balanceOfCollateral()
+    assert strategy.balanceOfDebt() > 0
+
+    # only the interest the depositer has not covered needs to be airdropped, no unwinding
+    shortfall = strategy.balanceOfDebt() - depositer.cometBalance()
+    if shortfall > 0:
+        baseToken.transfer(strategy, shortfall + 10, {"from": borrow_whale})
+
+    tx = vault.migrateStrategy(strategy, strategy2, {"from": gov})
+
+    # the collateral moved inside comet without being withdrawn or swapped
+    assert "Swap" not in tx.events
+    assert strategy.balanceOfCollateral() == 0
+    assert strategy.balanceOfDebt() == 0
+    assert strategy2.balanceOfCollateral() == collateral
+    assert token.balanceOf(strategy2) == 0
+
+    # a single harvest borrows back up to the target
+    vault.updateStrategyDebtRatio(strategy2, old_debt_ratio, {"from": gov})
+    chain.sleep(1)
+    strategy2.harvest({"from": gov})
+    assert strategy2.balanceOfDebt() > 0
+    assert strategy2.getCurrentLTV() == pytest.approx(
+        strategy2.getLiquidateCollateralFactor() * strategy2.targetLTVMultiplier() // 10_000, rel=RELATIVE_APPROX
+    )
+    assert vault.strategies(strategy).dict()["totalDebt"] == 0
+    assert vault.strategies(strategy2).dict()["totalDebt"] >= amount * 0.999
+
+
+def test_migration_with_debt_left(
+    vault,
+    strategy,
+    Strategy,
+    gov,
+    token,
+    token_whale,
+    depositer,
+    cloner,
+    strategist,
+    amount,
+    comet,
+    ethToWantFee,
+):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    # take base out of the depositer so the debt can't be repaid, and leave room over the target LTV
+    depositer.manualWithdraw({"from": gov})
+    strategy.setStrategyParams(8_000, 9_000, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    collateral = strategy.balanceOfCollateral()
+
+    strategy2 = clone_new_strategy(Strategy, cloner, vault, strategist, comet, ethToWantFee)
+    debt = strategy.balanceOfDebt()
+    vault.migrateStrategy(strategy, strategy2, {"from": gov})
+
+    # only what is over the target LTV is moved, the debt stays with the old strategy
+    assert strategy.balanceOfDebt() == debt
+    assert strategy.balanceOfCollateral() > 0
+    assert strategy2.balanceOfCollateral() > 0
+    assert strategy.balanceOfCollateral() + strategy2.balanceOfCollateral() == collateral
+    assert comet.isLiquidatable(strategy) == False
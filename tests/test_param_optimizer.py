@@ -0,0 +1,42 @@
+from scripts.param_optimizer import Candidate, Market, grid, optimize, pareto_front
+from scripts.report import print_report
+
+OBJECTIVES = ["net apr", "liquidation probability", "time above warning", "keeper gas usd"]
+
+
+def test_strategy_params(strategy, gov):
+    candidate = Candidate(6_000, 8_000, 1_000, 50)
+    strategy.setStrategyParams(*candidate.strategy_params(comp_usd=50), {"from": gov})
+
+    assert strategy.targetLTVMultiplier() == 6_000
+    assert strategy.warningLTVMultiplier() == 8_000
+    assert strategy.minToSell() == 20 * 10 ** 18
+    assert strategy.maxGasPriceToTend() == 50 * 10 ** 9
+
+    market = Market.from_strategy(strategy)
+    assert 0 < market.liquidation_ltv < 1
+    assert market.borrow_slope_high > market.borrow_slope_low
+
+
+def test_optimizer():
+    candidates = grid(targets=[5_000, 8_500], warnings=[8_800, 9_000], min_to_sell=[10, 10_000], max_gas_gwei=[20, 150])
+    rows = optimize(Market(volatility=1.0), candidates, days=60, paths=128, workers=2)
+    assert len(rows) == len(candidates)
+
+    front = pareto_front(rows)
+    print_report("Pareto frontier", front)
+    assert front
+    for row in front:
+        assert not any(
+            all(other[k] >= row[k] for k in OBJECTIVES[:1]) and all(other[k] <= row[k] for k in OBJECTIVES[1:])
+            and any(other[k] != row[k] for k in OBJECTIVES)
+            for other in rows
+        )
+
+    def mean(target, key):
+        values = [r[key] for r in rows if r["target_multiplier"] == target]
+        return sum(values) / len(values)
+
+    # borrowing closer to liquidation gets liquidated more and sits above the warning longer
+    assert mean(8_500, "liquidation probability") >= mean(5_000, "liquidation probability")
+    assert mean(8_500, "time above warning") > mean(5_000, "time above warning")
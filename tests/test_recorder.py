@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from brownie import chain
+
+from scripts.recorder import HEADER_SIZE, RECORD, Recorder, Ring
+
+
+def record(block):
+    value = np.zeros((), RECORD)
+    value["block"] = block
+    value["debt"] = block * 2
+    return value
+
+
+def test_ring(tmp_path):
+    path = tmp_path / "strategy.ring"
+    ring = Ring(path, 8)
+    for block in range(100, 105):
+        ring.append(record(block))
+
+    # not wrapped yet: everything is a view into the file
+    assert ring.view()["block"].tolist() == list(range(100, 105))
+    assert np.shares_memory(ring.range(101, 103), ring.records)
+    assert ring.at(102)["debt"] == 204
+
+    for block in range(105, 113):
+        ring.append(record(block))
+    assert len(ring) == 8
+    assert ring.view()["block"].tolist() == list(range(105, 113))
+    # the oldest blocks were overwritten
+    assert ring.at(104) is None
+    assert ring.at(200)["block"] == 112
+    assert ring.range(106, 108)["block"].tolist() == [106, 107, 108]
+    assert ring.downsample(105, 112, 3)["block"].tolist() == [105, 108, 111]
+
+    # another process sees the same records and the file never grows
+    ring.flush()
+    assert Ring(path).view()["block"].tolist() == list(range(105, 113))
+    assert path.stat().st_size == HEADER_SIZE + 8 * RECORD.itemsize
+    with pytest.raises(ValueError):
+        Ring(path, 16)
+
+
+def test_recorder(vault, strategy, token, token_whale, gov, amount, tmp_path):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+
+    recorder = Recorder([strategy], tmp_path, capacity=16)
+    recorder.catch_up()
+    start = recorder.block
+
+    strategy.harvest({"from": gov})
+    harvested = chain.height
+    for _ in range(5):
+        chain.sleep(60 * 60)
+        chain.mine(1)
+    # lower the target so the tend repays
+    strategy.setStrategyParams(5_000, 6_000, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    strategy.tend({"from": gov})
+    recorder.catch_up()
+
+    ring = recorder.ring(strategy)
+    blocks = ring.view()["block"]
+    # every block was sampled once
+    assert blocks.tolist() == list(range(start, chain.height + 1))
+
+    # the position at a past block is a file read
+    before, after = ring.at(harvested - 1), ring.at(harvested)
+    assert before["debt"] == 0
+    # float64 keeps 15 significant digits of the raw values
+    assert after["debt"] == pytest.approx(strategy.balanceOfDebt(block_identifier=harvested), rel=1e-12)
+    assert after["collateral"] == pytest.approx(strategy.balanceOfCollateral(block_identifier=harvested), rel=1e-12)
+    assert after["ltv"] == pytest.approx(strategy.getCurrentLTV(block_identifier=harvested), rel=1e-12)
+    assert after["want_price"] > 0 and after["base_price"] > 0
+    assert ring.at(chain.height)["ltv"] < after["ltv"]
+
+    # keep going past the capacity, disk use stays the same
+    size = ring.path.stat().st_size
+    for _ in range(20):
+        chain.mine(1)
+    recorder.catch_up()
+    recorder.flush()
+    assert len(ring) == 16
+    assert ring.view()["block"][-1] == chain.height
+    assert ring.path.stat().st_size == size
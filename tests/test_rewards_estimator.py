@@ -0,0 +1,58 @@
+import pytest
+from brownie import chain, web3
+
+from scripts.rewards_estimator import RewardsEstimator
+
+
+@pytest.fixture
+def invested(vault, strategy, token, token_whale, gov, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+
+def accrue(comet, depositer, strategy, gov):
+    comet.accrueAccount(depositer, {"from": gov})
+    tx = comet.accrueAccount(strategy, {"from": gov})
+    return web3.eth.get_block(tx.block_number)["timestamp"]
+
+
+@pytest.mark.parametrize("days", [1, 10, 60])
+def test_estimate_matches_rewards_owed(invested, depositer, strategy, comet, gov, days):
+    estimator = RewardsEstimator(depositer)
+    estimator.sync()
+    # The estimate includes what is not yet accrued on chain
+    assert estimator.estimate() >= depositer.getRewardsOwed()
+
+    chain.sleep(days * 24 * 60 * 60)
+    chain.mine(1)
+    # Extrapolated without any new reads
+    synced_block = estimator.synced_block
+    timestamp = accrue(comet, depositer, strategy, gov)
+    estimate = estimator.estimate(timestamp)
+    assert estimator.synced_block == synced_block
+
+    owed = depositer.getRewardsOwed()
+    print(f"{days} days: estimate {estimate} vs owed {owed}")
+    assert owed > 0
+    assert estimate == pytest.approx(owed, rel=1e-4)
+    assert estimator.rate() > 0
+
+
+def test_poll_resyncs_on_principal_change(invested, depositer, strategy, gov):
+    estimator = RewardsEstimator(depositer)
+    assert estimator.poll()
+    assert estimator.syncs == 1
+
+    # Nothing happened to our accounts
+    chain.sleep(60 * 60)
+    chain.mine(5)
+    assert not estimator.poll()
+    assert estimator.syncs == 1
+
+    # A harvest claims rewards and changes principal
+    strategy.harvest({"from": gov})
+    assert estimator.poll()
+    assert estimator.syncs == 2
+    assert estimator.synced_block == chain.height
@@ -0,0 +1,100 @@
+import pytest
+from brownie import MockTradeFactory, chain, reverts
+
+from scripts.report import print_report
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def invested(vault, strategy, token, token_whale, gov, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+
+def full_rewards(strategy, depositer, comet, gov):
+    # recompute with both accounts accrued, the way the view does without a snapshot
+    comet.accrueAccount(depositer, {"from": gov})
+    comet.accrueAccount(strategy, {"from": gov})
+    window = strategy.rewardsSnapshotWindow()
+    strategy.setRewardsSnapshotWindow(0, {"from": gov})
+    rewards = strategy.rewardsInWant()
+    strategy.setRewardsSnapshotWindow(window, {"from": gov})
+    return rewards
+
+
+def test_extrapolated_rewards(invested, strategy, depositer, comet, gov, user):
+    with reverts():
+        strategy.setRewardsSnapshotWindow(DAY, {"from": user})
+    strategy.setRewardsSnapshotWindow(DAY, {"from": gov})
+    full_gas = strategy.estimatedTotalAssets.estimate_gas()
+    # no snapshot yet so it recomputes
+    full = full_rewards(strategy, depositer, comet, gov)
+    assert strategy.rewardsInWant() == full
+    # the snapshot is taken by the next tend
+    strategy.tend({"from": gov})
+
+    chain.sleep(DAY // 2)
+    chain.mine(1)
+    snapshot_gas = strategy.estimatedTotalAssets.estimate_gas()
+    extrapolated = strategy.rewardsInWant()
+    full = full_rewards(strategy, depositer, comet, gov)
+    print_report(
+        "estimatedTotalAssets view gas",
+        [
+            {"rewards": "recomputed", "gas": full_gas, "rewards in want": full},
+            {"rewards": "extrapolated", "gas": snapshot_gas, "rewards in want": extrapolated},
+        ],
+    )
+    assert snapshot_gas < full_gas
+    assert extrapolated > 0
+    assert extrapolated == pytest.approx(full, rel=0.05)
+
+    # past the window it recomputes
+    chain.sleep(DAY)
+    chain.mine(1)
+    full = full_rewards(strategy, depositer, comet, gov)
+    assert strategy.rewardsInWant() == full
+
+
+def test_no_snapshot_by_default(invested, strategy, gov):
+    assert strategy.rewardsSnapshotWindow() == 0
+    strategy.tend({"from": gov})
+    chain.sleep(DAY)
+    chain.mine(1)
+    gas = strategy.estimatedTotalAssets.estimate_gas()
+    strategy.setRewardsSnapshotWindow(2 * DAY, {"from": gov})
+    # no snapshot was taken so it still recomputes
+    assert strategy.estimatedTotalAssets.estimate_gas() == gas
+
+
+def test_withdraw_drops_snapshot(invested, vault, strategy, depositer, comet, token, token_whale, gov):
+    strategy.setRewardsSnapshotWindow(DAY, {"from": gov})
+    strategy.tend({"from": gov})
+    chain.sleep(DAY // 4)
+    chain.mine(1)
+
+    # liquidatePosition unwinds most of the position, the rate snapshotted at the tend would overstate it
+    vault.withdraw(vault.balanceOf(token_whale) * 3 // 4, token_whale, 10_000, {"from": token_whale})
+    chain.sleep(DAY // 2)
+    chain.mine(1)
+    # the withdrawal only dropped the snapshot so it recomputes until the next tend
+    full = full_rewards(strategy, depositer, comet, gov)
+    assert strategy.rewardsInWant() == full
+    gas = strategy.estimatedTotalAssets.estimate_gas()
+    strategy.tend({"from": gov})
+    assert strategy.estimatedTotalAssets.estimate_gas() < gas
+
+
+def test_trade_factory_drops_snapshot(invested, strategy, depositer, comet, gov):
+    strategy.setRewardsSnapshotWindow(DAY, {"from": gov})
+    strategy.tend({"from": gov})
+    # the trade factory can sell the COMP the snapshot counts at any time
+    strategy.setTradeFactory(MockTradeFactory.deploy({"from": gov}), {"from": gov})
+    strategy.tend({"from": gov})
+    chain.sleep(DAY // 2)
+    chain.mine(1)
+    full = full_rewards(strategy, depositer, comet, gov)
+    assert strategy.rewardsInWant() == full
@@ -0,0 +1,134 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scripts.rpc_cache import MISS_CODE, RECORD, REPLAY, UPSTREAM_CODE, CachingProxy, RpcCache
+
+BLOCK = 16_000_000
+
+
+@pytest.fixture
+def upstream():
+    # a node that answers every call with its method and params, and counts them
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(request["method"])
+            body = json.dumps(
+                {"jsonrpc": "2.0", "id": request["id"], "result": f"{request['method']}:{request['params']}"}
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}", calls
+    server.shutdown()
+    server.server_close()
+
+
+def rpc(proxy, method, params, id=1):
+    return requests.post(proxy.url, json={"jsonrpc": "2.0", "id": id, "method": method, "params": params}).json()
+
+
+def test_record_and_replay(upstream, tmp_path):
+    url, calls = upstream
+    path = tmp_path / "fork.json.gz"
+    slot = ["0xc3d688B66703497DAA19211EEdff47f25384cdc3", "0x0", hex(BLOCK)]
+
+    proxy = CachingProxy(RpcCache(path, BLOCK), RECORD, url)
+    proxy.start()
+    assert proxy.fork_url.endswith(f"@{BLOCK}")
+    first = rpc(proxy, "eth_getStorageAt", slot)
+    # the second one is served from the cache
+    assert rpc(proxy, "eth_getStorageAt", slot, id=2) == {**first, "id": 2}
+    batch = requests.post(
+        proxy.url,
+        json=[
+            {"jsonrpc": "2.0", "id": 3, "method": "eth_getCode", "params": slot[::2]},
+            {"jsonrpc": "2.0", "id": 4, "method": "eth_getStorageAt", "params": slot},
+        ],
+    ).json()
+    proxy.stop()
+    assert calls == ["eth_getStorageAt", "eth_getCode"]
+    assert [r["id"] for r in batch] == [3, 4]
+
+    # replaying answers the same without the upstream and reports what it did not have
+    cache = RpcCache(path)
+    assert cache.block == BLOCK
+    proxy = CachingProxy(cache, REPLAY)
+    proxy.start()
+    assert rpc(proxy, "eth_getStorageAt", slot) == first
+    assert rpc(proxy, "eth_getCode", slot[::2])["result"] == batch[0]["result"]
+    miss = rpc(proxy, "eth_getBalance", slot[::2])
+    proxy.stop()
+
+    assert miss["error"]["code"] == MISS_CODE
+    assert cache.hits == 2
+    assert len(cache.misses) == 1
+    assert proxy.upstream_requests == 0
+    assert len(calls) == 2
+
+    with pytest.raises(ValueError):
+        RpcCache(path, BLOCK + 1)
+
+
+@pytest.fixture
+def flaky_upstream():
+    # fails every other call, with an HTTP error, a JSON-RPC error or a page that isn't JSON
+    failures = [
+        (429, b"rate limited"),
+        (200, b'{"jsonrpc": "2.0", "id": 1, "error": {"code": -32005, "message": "limit exceeded"}}'),
+        (502, b"<html>bad gateway</html>"),
+    ]
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls.append(request["method"])
+            if len(calls) % 2:
+                status, body = failures[len(calls) // 2 % len(failures)]
+            else:
+                status = 200
+                body = json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": request["method"]}).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}", calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_errors_are_not_cached(flaky_upstream, tmp_path):
+    url, calls = flaky_upstream
+    proxy = CachingProxy(RpcCache(tmp_path / "fork.json.gz", BLOCK), RECORD, url)
+    proxy.start()
+    for method, code in [("eth_chainId", UPSTREAM_CODE), ("eth_getCode", -32005), ("eth_getBalance", UPSTREAM_CODE)]:
+        # the failure is passed on, and the retry goes upstream again and is cached
+        assert rpc(proxy, method, [])["error"]["code"] == code
+        assert rpc(proxy, method, [])["result"] == method
+        assert rpc(proxy, method, [])["result"] == method
+    proxy.stop()
+
+    assert len(calls) == 6
+    assert sorted(RpcCache(tmp_path / "fork.json.gz").responses) == ["eth_chainId[]", "eth_getBalance[]", "eth_getCode[]"]
@@ -0,0 +1,79 @@
+import pytest
+from brownie import chain
+
+from scripts.fleet import read_health
+from scripts.report import print_report
+
+# Deposit sizes as multiples of `amount`. "cap" overshoots the room left under want's supply cap
+SIZES = [1e-4, 1e-2, 1, 10, 100, "cap"]
+# Harvests or tends we allow to reach the target LTV or to fully exit
+MAX_ROUNDS = 10
+
+
+def fund(token, token_whale, bal_vault, size):
+    missing = size - token.balanceOf(token_whale)
+    if missing <= 0:
+        return
+    if token.balanceOf(bal_vault) < missing:
+        pytest.skip(f"not enough {token.symbol()} on the fork for {size}")
+    token.transfer(token_whale, missing, {"from": bal_vault})
+
+
+@pytest.mark.parametrize("multiplier", SIZES)
+def test_scaling(vault, strategy, token, token_whale, bal_vault, comet, gov, amount, multiplier):
+    if multiplier == "cap":
+        room = comet.getAssetInfoByAddress(token)["supplyCap"] - comet.totalsCollateral(token)[
+            "totalSupplyAsset"
+        ]
+        size = room * 11 // 10
+    else:
+        size = int(amount * multiplier)
+    fund(token, token_whale, bal_vault, size)
+
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(size, {"from": token_whale})
+    chain.sleep(1)
+
+    # Build up: one harvest, then tend until we reach the target LTV or stop making progress
+    harvest_gas = [strategy.harvest({"from": gov}).gas_used]
+    health = read_health([strategy])[0]
+    tends = 0
+    while health.ltv < health.target_ltv * 99 // 100 and tends < MAX_ROUNDS:
+        strategy.tend({"from": gov})
+        tends += 1
+        last = health.ltv
+        health = read_health([strategy])[0]
+        if health.ltv <= last:
+            break
+    reached = health.ltv >= health.target_ltv * 99 // 100
+    idle = strategy.balanceOfWant()
+
+    # Full exit
+    vault.updateStrategyDebtRatio(strategy, 0, {"from": gov})
+    exits = 0
+    while vault.strategies(strategy)["totalDebt"] > 0 and exits < MAX_ROUNDS:
+        chain.sleep(1)
+        harvest_gas.append(strategy.harvest({"from": gov}).gas_used)
+        exits += 1
+
+    scale = 10 ** token.decimals()
+    print_report(
+        f"Scaling {token.symbol()} x{multiplier}",
+        [
+            {
+                "size": size / scale,
+                "gas per harvest": sum(harvest_gas) // len(harvest_gas),
+                "tends to target": tends,
+                "reached target": reached,
+                "ltv / target": health.ltv / health.target_ltv if health.target_ltv else 0.0,
+                "idle want": idle / scale,
+                "harvests to exit": exits,
+                "left after exit": strategy.estimatedTotalAssets() / scale,
+                "loss": vault.strategies(strategy)["totalLoss"] / scale,
+            }
+        ],
+    )
+
+    # Whatever the size, the strategy must be able to get out
+    assert vault.strategies(strategy)["totalDebt"] == 0
+    assert strategy.balanceOfDebt() == 0
@@ -0,0 +1,72 @@
+import pytest
+from brownie import chain
+
+from scripts.report import print_report
+from scripts.scenario import (
+    DAY,
+    DebtRatio,
+    Deposit,
+    Harvest,
+    PriceMove,
+    Tend,
+    UtilizationMove,
+    Withdraw,
+)
+
+
+def test_profitable_lifecycle(scenario_runner, amount, RELATIVE_APPROX):
+    metrics = scenario_runner.run(
+        [
+            (0, Deposit(amount)),
+            (1, Harvest()),
+            (50 * DAY, Harvest()),
+            (60 * DAY, Harvest()),
+            (90 * DAY, Harvest()),
+        ]
+    )
+    print_report("Profitable lifecycle", metrics)
+
+    assert pytest.approx(metrics[1]["estimatedTotalAssets"], rel=RELATIVE_APPROX) == amount
+    assert metrics[-1]["pricePerShare"] > metrics[1]["pricePerShare"]
+    # 90 days took a single time jump per idle period
+    assert metrics[-1]["block"] - metrics[0]["block"] < 10
+    assert metrics[-1]["day"] == 90
+
+
+def test_branching_lifecycle(scenario_runner, amount, baseToken, token):
+    prefix = [
+        (0, Deposit(amount)),
+        (1, Harvest()),
+        (30 * DAY, Harvest()),
+    ]
+    branches = {
+        "price drop": [(31 * DAY, PriceMove(-2_000)), (31 * DAY, Tend())],
+        "price rise": [(31 * DAY, PriceMove(5_000)), (31 * DAY, Tend())],
+        "rates up": [
+            (31 * DAY, UtilizationMove(1_000_000 * 10 ** baseToken.decimals())),
+            (45 * DAY, Harvest()),
+        ],
+        "debt ratio cut": [(31 * DAY, DebtRatio(5_000)), (31 * DAY, Harvest())],
+        "full exit": [(31 * DAY, DebtRatio(0)), (31 * DAY, Harvest()), (32 * DAY, Withdraw())],
+    }
+    results = scenario_runner.run_branches(prefix, branches)
+    for name, metrics in results.items():
+        print_report(name, metrics)
+
+    at_prefix = results["price drop"][2]
+
+    warning = scenario_runner.strategy.getLiquidateCollateralFactor() / 1e18 * (
+        scenario_runner.strategy.warningLTVMultiplier() / 10_000
+    )
+    # price drop pushes LTV up and the tend brings it back under warning
+    assert results["price drop"][3]["ltv"] > at_prefix["ltv"]
+    assert results["price drop"][4]["ltv"] < warning
+    # price rise lets the tend borrow more
+    assert results["price rise"][4]["debt"] > at_prefix["debt"]
+    # debt ratio cut roughly halves the position
+    assert results["debt ratio cut"][-1]["estimatedTotalAssets"] < at_prefix["estimatedTotalAssets"] * 0.6
+    assert results["full exit"][-1]["estimatedTotalAssets"] < 10 ** (token.decimals() // 2)
+
+    # the chain is back at the end of the prefix
+    assert chain.height == at_prefix["block"]
+    assert scenario_runner.strategy.balanceOfDebt() == pytest.approx(at_prefix["debt"], rel=1e-3)
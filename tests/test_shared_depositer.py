@@ -0,0 +1,143 @@
+import pytest
+from brownie import ZERO_ADDRESS, chain, reverts, web3
+
+from scripts.report import print_report
+
+# Strategies on the market for the gas comparison
+FLEET_SIZES = [1, 2, 5, 10]
+REWARD_CLAIMED_TOPIC = web3.keccak(text="RewardClaimed(address,address,address,uint256)")
+
+
+def fund(vault, token, token_whale, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+
+
+def test_shared_accounting(
+    create_vault,
+    clone_strategy,
+    shared_depositer,
+    cloner,
+    comet,
+    ethToWantFee,
+    token,
+    token_whale,
+    gov,
+    user,
+    amount,
+    RELATIVE_APPROX,
+):
+    vaults = [create_vault(token) for _ in range(2)]
+    first, second = [clone_strategy(vault, 10_000, depositer=shared_depositer) for vault in vaults]
+    assert shared_depositer.strategy() == first
+    assert shared_depositer.strategiesLength() == 2
+    assert first.depositer() == second.depositer() == shared_depositer
+
+    fund(vaults[0], token, token_whale, amount)
+    fund(vaults[1], token, token_whale, amount // 3)
+    first.harvest({"from": gov})
+    second.harvest({"from": gov})
+
+    # each strategy sees its own part of the one comet account
+    assert first.balanceOfDepositer() == pytest.approx(first.balanceOfDebt(), rel=1e-4)
+    assert second.balanceOfDepositer() == pytest.approx(second.balanceOfDebt(), rel=1e-4)
+    assert first.balanceOfDepositer() + second.balanceOfDepositer() == pytest.approx(
+        comet.balanceOf(shared_depositer), abs=2
+    )
+    with reverts("!authorized"):
+        shared_depositer.withdraw(1, {"from": user})
+    # only the cloner adds strategies, and only when the depositer's governance clones them
+    with reverts("!cloner"):
+        shared_depositer.setStrategy(first, {"from": user})
+    with reverts("!governance"):
+        cloner.cloneCompV3LenderBorrowerWithDepositer(
+            vaults[0], user, user, user, comet, ethToWantFee, "fake", shared_depositer, {"from": user}
+        )
+    # the first deposit locked the dead shares
+    assert shared_depositer.shares(ZERO_ADDRESS) == shared_depositer.DEAD_SHARES()
+
+    # rewards are split by shares
+    chain.sleep(7 * 24 * 60 * 60)
+    chain.mine(1)
+    owed_first = shared_depositer.getRewardsOwedFor(first)
+    owed_second = shared_depositer.getRewardsOwedFor(second)
+    assert owed_first > owed_second > 0
+
+    # one claim from comet pays both
+    tx_first = first.claimRewards({"from": gov})
+    tx_second = second.claimRewards({"from": gov})
+    claims = [
+        log for tx in (tx_first, tx_second) for log in tx.logs
+        if log["topics"][0] == REWARD_CLAIMED_TOPIC
+        and log["topics"][1].hex().lower().endswith(shared_depositer.address[2:].lower())
+    ]
+    assert len(claims) == 1
+
+    # leaving does not touch the other strategy's part
+    before = second.balanceOfDepositer()
+    vaults[0].updateStrategyDebtRatio(first, 0, {"from": gov})
+    chain.sleep(1)
+    first.harvest({"from": gov})
+    assert first.balanceOfDebt() == 0
+    assert shared_depositer.shares(first) == 0
+    assert second.balanceOfDepositer() >= before
+    assert second.balanceOfDepositer() == pytest.approx(comet.balanceOf(shared_depositer), rel=RELATIVE_APPROX)
+
+    vaults[1].updateStrategyDebtRatio(second, 0, {"from": gov})
+    chain.sleep(1)
+    second.harvest({"from": gov})
+    assert second.balanceOfDebt() == 0
+    # only the dead shares are left
+    assert shared_depositer.totalShares() == shared_depositer.DEAD_SHARES()
+
+
+def test_manual_withdraw(create_vault, clone_strategy, shared_depositer, comet, baseToken, token, token_whale, gov, amount):
+    vaults = [create_vault(token) for _ in range(2)]
+    strategies = [clone_strategy(vault, 10_000, depositer=shared_depositer) for vault in vaults]
+    for vault, strategy in zip(vaults, strategies):
+        fund(vault, token, token_whale, amount)
+        strategy.harvest({"from": gov})
+
+    before = baseToken.balanceOf(gov)
+    supplied = comet.balanceOf(shared_depositer)
+    with reverts("!authorized"):
+        shared_depositer.manualWithdraw({"from": token_whale})
+    shared_depositer.manualWithdraw({"from": gov})
+    assert baseToken.balanceOf(gov) - before >= supplied
+    assert comet.balanceOf(shared_depositer) == 0
+    # emptied, so the next deposit starts over instead of dividing by an empty balance
+    assert shared_depositer.totalShares() == 0
+    assert shared_depositer.shares(ZERO_ADDRESS) == 0
+
+    vault = create_vault(token)
+    strategy = clone_strategy(vault, 10_000, depositer=shared_depositer)
+    fund(vault, token, token_whale, amount)
+    strategy.harvest({"from": gov})
+    assert shared_depositer.balanceOfStrategy(strategy) == pytest.approx(strategy.balanceOfDebt(), rel=1e-4)
+
+
+def test_harvest_gas_by_fleet_size(
+    create_vault, clone_strategy, SharedDepositer, strategist, cloner, comet, token, token_whale, gov, amount
+):
+    rows = []
+    for size in FLEET_SIZES:
+        row = {"strategies": size}
+        for mode in ["separate", "shared"]:
+            depositer = strategist.deploy(SharedDepositer, comet, cloner, gov) if mode == "shared" else None
+            vault = create_vault(token)
+            strategies = [clone_strategy(vault, 10_000 // size, depositer=depositer) for _ in range(size)]
+            fund(vault, token, token_whale, amount)
+            for strategy in strategies:
+                strategy.harvest({"from": gov})
+
+            # a harvest cycle with rewards to claim and interest to accrue
+            chain.sleep(24 * 60 * 60)
+            chain.mine(1)
+            gas = [strategy.harvest({"from": gov}).gas_used for strategy in strategies]
+            row[f"{mode} gas per harvest"] = sum(gas) // size
+        rows.append(row)
+
+    print_report("Harvest gas, a depositer per strategy vs one shared", rows)
+    # past the first strategy the shared account is already accrued and claimed for
+    assert rows[-1]["shared gas per harvest"] < rows[-1]["separate gas per harvest"]
@@ -0,0 +1,63 @@
+import pytest
+from brownie import chain, reverts
+
+from scripts.report import print_report
+from scripts.tend_sim import Position, sweep
+
+DAY = 24 * 60 * 60
+
+
+def under_levered(vault, strategy, token, token_whale, gov, amount):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    # raise the target by less than the fixed 10p.p. band
+    strategy.setStrategyParams(7_500, 8_000, strategy.minToSell(), False, strategy.maxGasPriceToTend(), {"from": gov})
+    if strategy.getNetRewardApr(0) <= strategy.getNetBorrowApr(0):
+        pytest.skip("borrowing does not pay at this block")
+
+
+def test_fixed_band_by_default(vault, strategy, token, token_whale, gov, amount):
+    under_levered(vault, strategy, token, token_whale, gov, amount)
+
+    assert strategy.tendPaybackWindow() == 0
+    assert strategy.tendTrigger(0) == False
+
+
+def test_payback_window(vault, strategy, token, token_whale, gov, amount, user):
+    under_levered(vault, strategy, token, token_whale, gov, amount)
+
+    with reverts():
+        strategy.setTendPaybackWindow(30 * DAY, {"from": user})
+    strategy.setTendPaybackWindow(30 * DAY, {"from": gov})
+
+    # the extra rewards over the window pay for a cheap tend but not an expensive one
+    assert strategy.tendTrigger(0) == True
+    assert strategy.tendTrigger(10 ** 24) == False
+
+    debt = strategy.balanceOfDebt()
+    strategy.tend({"from": gov})
+    assert strategy.balanceOfDebt() > debt
+    assert strategy.tendTrigger(0) == False
+
+
+def test_tend_simulation():
+    rows = sweep(
+        Position(collateral_usd=1),
+        sizes=[10_000, 1_000_000, 50_000_000],
+        gas_prices=[5, 200],
+        windows=[7 * DAY, 30 * DAY],
+        days=90,
+        paths=64,
+    )
+    print_report("Tends and net APR, fixed band vs payback window", rows)
+
+    # a large position with cheap gas re-levers more often and earns more than on the fixed band
+    fixed, weekly = [r for r in rows if r["collateral usd"] == 50_000_000 and r["gas gwei"] == 5][:2]
+    assert weekly["tends"] > fixed["tends"]
+    assert weekly["net apr"] > fixed["net apr"]
+    # a small position with expensive gas tends less and loses less
+    fixed, weekly = [r for r in rows if r["collateral usd"] == 10_000 and r["gas gwei"] == 200][:2]
+    assert weekly["tends"] < fixed["tends"]
+    assert weekly["net apr"] > fixed["net apr"]
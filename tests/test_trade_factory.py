@@ -0,0 +1,88 @@
+import pytest
+from brownie import MockTradeFactory, chain, reverts
+
+from scripts.report import print_report
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def trade_factory(gov):
+    yield MockTradeFactory.deploy({"from": gov})
+
+
+def comp_rate(strategy, comet, comp, token):
+    # want paid per COMP by the trade factory, scaled by 1e18, at the prices the strategy reads
+    comp_price = comet.getPrice(strategy.priceFeeds(comp))
+    want_price = comet.getPrice(comet.getAssetInfoByAddress(token)["priceFeed"])
+    return comp_price * 10 ** token.decimals() // want_price
+
+
+def test_trade_factory_harvest(create_fleet, trade_factory, comet, comp, token, token_whale, gov, keeper):
+    strategies = create_fleet(3, keeper)
+    for strategy in strategies:
+        strategy.harvest({"from": gov})
+        strategy.setTradeFactory(trade_factory, {"from": gov})
+        assert comp.allowance(strategy, trade_factory) == 2 ** 256 - 1
+        assert trade_factory.enabled(strategy, comp, token)
+
+    chain.sleep(10 * DAY)
+    chain.mine(1)
+    for strategy in strategies:
+        before = token.balanceOf(strategy)
+        strategy.harvest({"from": gov})
+        # the COMP is left for the trade factory and still counted in estimatedTotalAssets
+        assert comp.balanceOf(strategy) > 0
+        assert strategy.rewardsInWant() > 0
+        assert token.balanceOf(strategy) == before
+
+    # one batch sells the COMP of every strategy
+    rate = comp_rate(strategies[0], comet, comp, token)
+    sold = [comp.balanceOf(s) * rate // 10 ** 18 for s in strategies]
+    token.transfer(trade_factory, sum(sold), {"from": token_whale})
+    trade_factory.execute(strategies, comp, token, rate, {"from": keeper})
+
+    # and the want is counted as profit on the next harvest
+    for strategy, proceeds in zip(strategies, sold):
+        assert comp.balanceOf(strategy) == 0
+        tx = strategy.harvest({"from": gov})
+        assert tx.events["Harvested"]["profit"] >= proceeds * 0.99
+
+
+@pytest.mark.parametrize("mode", ["uniswap", "trade factory"])
+def test_harvest_gas(vault, strategy, trade_factory, comp, token, token_whale, gov, amount, mode):
+    token.approve(vault, 2 ** 256 - 1, {"from": token_whale})
+    vault.deposit(amount, {"from": token_whale})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    if mode == "trade factory":
+        strategy.setTradeFactory(trade_factory, {"from": gov})
+
+    chain.sleep(10 * DAY)
+    chain.mine(1)
+    tx = strategy.harvest({"from": gov})
+
+    print_report(
+        "Harvest gas",
+        [{"mode": mode, "gas": tx.gas_used, "comp left": comp.balanceOf(strategy)}],
+    )
+    if mode == "uniswap":
+        assert comp.balanceOf(strategy) <= strategy.minToSell()
+
+
+def test_remove_trade_factory(strategy, trade_factory, comp, token, gov, user):
+    with reverts():
+        strategy.setTradeFactory(trade_factory, {"from": user})
+    strategy.setTradeFactory(trade_factory, {"from": gov})
+
+    with reverts():
+        strategy.removeTradeFactoryPermissions({"from": user})
+    strategy.removeTradeFactoryPermissions({"from": gov})
+
+    assert strategy.tradeFactory() == "0x0000000000000000000000000000000000000000"
+    assert comp.allowance(strategy, trade_factory) == 0
+    assert trade_factory.enabled(strategy, comp, token) == False
+
+    # removing again with none set is a no-op
+    strategy.removeTradeFactoryPermissions({"from": gov})
+    assert strategy.tradeFactory() == "0x0000000000000000000000000000000000000000"
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+import pytest
+from brownie import Contract
+from eth_abi.packed import encode_abi_packed
+
+from scripts.uniswap_sim import WETH, load_route
+
+QUOTER = "0xb27308f9F90D607463bb33eA1BeBb41C27CE5AB6"
+QUOTER_ABI = [
+    {
+        "name": name,
+        "type": "function",
+        "stateMutability": "nonpayable",
+        "inputs": [{"name": "path", "type": "bytes"}, {"name": "amount", "type": "uint256"}],
+        "outputs": [{"name": "", "type": "uint256"}],
+    }
+    for name in ["quoteExactInput", "quoteExactOutput"]
+]
+
+
+@pytest.fixture
+def quoter():
+    yield Contract.from_abi("Quoter", QUOTER, QUOTER_ABI)
+
+
+def encode_path(strategy, tokens):
+    types, values = [], []
+    for token_in, token_out in zip(tokens, tokens[1:]):
+        types += ["address", "uint24"]
+        values += [token_in, strategy.uniFees(token_in, token_out)]
+    return encode_abi_packed(types + ["address"], values + [tokens[-1]])
+
+
+def routes(token, baseToken, comp):
+    # (from, to, amounts in from's units) for the swaps the strategy makes
+    return {
+        "comp to base": (comp, baseToken, [1e17, 1e19, 1e21]),
+        "comp to want": (comp, token, [1e17, 1e19, 1e21]),
+        "want to base": (token, baseToken, [10 ** token.decimals() // d for d in (1000, 10, 1)]),
+        "weth to base": (Contract(WETH), baseToken, [1e16, 1e18, 1e20]),
+    }
+
+
+@pytest.mark.parametrize("name", ["comp to base", "comp to want", "want to base", "weth to base"])
+def test_matches_quoter(strategy, quoter, token, baseToken, comp, name):
+    token_in, token_out, amounts = routes(token, baseToken, comp)[name]
+    if token_in == token_out:
+        pytest.skip("same token")
+    route = load_route(strategy, token_in, token_out)
+    tokens = route.tokens
+    assert tokens[0] == token_in and tokens[-1] == token_out
+
+    simulated = route.exact_input(amounts)
+    for amount, out in zip(amounts, simulated):
+        quoted = quoter.quoteExactInput.call(encode_path(strategy, tokens), int(amount))
+        assert out == pytest.approx(quoted, rel=1e-6)
+
+        # exactOutput takes the path reversed
+        needed = route.exact_output([quoted])[0]
+        quoted_in = quoter.quoteExactOutput.call(encode_path(strategy, tokens[::-1]), quoted)
+        assert needed == pytest.approx(quoted_in, rel=1e-6)
+
+
+def test_sizes_per_second(strategy, token, baseToken, comp):
+    route = load_route(strategy, comp, baseToken)
+    sizes = np.geomspace(1e15, 1e22, 10_000)
+
+    start = time.perf_counter()
+    out = route.exact_input(sizes)
+    impact = route.price_impact_bps(sizes)
+    elapsed = time.perf_counter() - start
+    print(f"{sizes.size / elapsed:,.0f} sizes per second")
+    assert elapsed < 1
+
+    # Bigger sales get a worse price
+    finite = np.isfinite(out)
+    assert np.all(np.diff(impact[finite]) >= -1e-6)
+    assert impact[0] < 1
+    # Largest sale that stays inside the strategy's 5% buffer
+    assert route.max_amount_in(500, 1e15, 1e22) > 0